@@ -0,0 +1,31 @@
+"""add compiled_programs
+
+Create Date: 2026-10-17 10:12:44.318209
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "5f2e8c4b7a91"
+down_revision: Union[str, None] = "c793be362bfa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "compiled_programs",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("compiler_version", sa.String(length=40), nullable=False),
+        sa.Column("bytecode", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash", "compiler_version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("compiled_programs")
@@ -0,0 +1,54 @@
+"""Benchmarks for the probotics language implementation.
+
+Each benchmark module can be run directly, e.g.:
+
+    python -m probots.benchmarks.parser_benchmark
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).parents[2]
+
+# Programs used as benchmark inputs: the sample program used by the tests, and
+# the fixture programs that are loaded into a dev database
+SAMPLE_PATH = BACKEND_DIR / "probots" / "test" / "probotics_tests" / "sample.probot"
+FIXTURE_PATHS = sorted((BACKEND_DIR / "fixtures").glob("*.probot"))
+
+
+def format_table(
+    columns: Sequence[tuple[str, str]],
+    rows: Iterable[Sequence[Any]],
+    times: Optional[Mapping[str, float]] = None,
+) -> list[str]:
+    """The lines of a table of results, for printing: the headers, and a line for
+    each row (including any totals). Each column is a header and the format spec
+    of its values, e.g. ("ms", ">10.2f"). A value of None leaves its cell blank,
+    and a row can leave out its last cells. With times (the total seconds of
+    each backend), it ends with the speedup of each backend over the first one."""
+    headers = [header for header, _ in columns]
+    specs = [spec for _, spec in columns]
+    text_specs = [text_spec(spec) for spec in specs]
+
+    lines = [" ".join(map(format, headers, text_specs)).rstrip()]
+    for row in rows:
+        cells = [
+            format("", blank) if value is None else format(value, spec)
+            for value, spec, blank in zip(row, specs, text_specs, strict=False)
+        ]
+        lines.append(" ".join(cells).rstrip())
+
+    if times:
+        baseline, *others = times
+        for backend in others:
+            speedup = times[baseline] / times[backend]
+            lines.append(f"{backend} speedup over {baseline}: {speedup:.1f}x")
+    return lines
+
+
+def text_spec(spec: str) -> str:
+    """The alignment and width of a format spec, for text in the same column"""
+    match = re.match(r"([<>^]?)[-+ ]?(\d*)", spec)
+    assert match is not None
+    return match[1] + match[2]
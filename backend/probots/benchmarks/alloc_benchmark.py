@@ -0,0 +1,133 @@
+"""Measure how much the interpreter allocates while executing programs.
+
+python -m probots.benchmarks.alloc_benchmark [--operations N] [--backend NAME]
+
+Each program is run (see interpreter_benchmark) until it finishes or has executed
+the given number of operations, and the results are scaled to 1M operations:
+
+- the Primitive and StackFrame objects that were created -- the values and
+  frames that executing an operation can allocate
+- the peak of the memory traced by tracemalloc while running, over what was
+  traced before starting
+
+tracemalloc only keeps track of memory that is still allocated, so it can't tell
+how many short-lived objects were created; those are counted directly.
+"""
+
+import argparse
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from ..probotics.compiler import ProboticsCompiler
+from ..probotics.interpreter import EXECUTION_BACKENDS, ExecutionContext
+from ..probotics.ops.all import Operation, Primitive, ScopeVars, StackFrame
+from ..probotics.optimizer import PeepholeOptimizer
+from . import FIXTURE_PATHS
+from .interpreter_benchmark import PROGRAMS, stub_builtins, with_handlers
+
+# Programs that mostly produce small values, which can be shared
+ALLOC_PROGRAMS = {
+    "compare": """
+        i := 0
+        n := 0
+        while i < 20000 { if i > 10 and not (i == 50) { n := n + 1 }
+          i := i + 1 }
+        n
+    """,
+    "me": """
+        i := 0
+        far := 0
+        while i < 20000 { if me.x + me.y > 5 { far := far + 1 }
+          i := i + 1 }
+        far
+    """,
+}
+
+COUNTED: tuple[type, ...] = (Primitive, StackFrame)
+
+
+def counting(cls: type, counts: Counter) -> Callable[..., None]:
+    """An __init__ for the class that counts the instances created"""
+    init = cls.__init__
+
+    def __init__(self: Any, *args: Any, **kwargs: Any) -> None:
+        counts[cls] += 1
+        init(self, *args, **kwargs)
+
+    __init__.original = init  # type: ignore[attr-defined]
+    return __init__
+
+
+def measure(
+    operations: list[Operation],
+    backend: str,
+    max_operations: int,
+    builtins: Optional[ScopeVars] = None,
+) -> tuple[int, Counter, int]:
+    """How many operations were executed, the objects created, and the peak of
+    the traced memory, in bytes. The builtins are stub_builtins() by default"""
+    counts: Counter = Counter()
+    context = ExecutionContext(
+        operations=operations,
+        builtins=builtins if builtins is not None else stub_builtins(),
+        backend=backend,
+    )
+
+    for cls in COUNTED:
+        cls.__init__ = counting(cls, counts)
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        while not context.execute_next():
+            if context.total_operations >= max_operations:
+                break
+            context.resume()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        for cls in COUNTED:
+            cls.__init__ = cls.__init__.original
+
+    return context.total_operations, counts, peak - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--backend", choices=EXECUTION_BACKENDS, default="ops")
+    args = parser.parse_args()
+
+    compiler = ProboticsCompiler(resolve=True, optimizer=PeepholeOptimizer())
+    programs = {**PROGRAMS, **ALLOC_PROGRAMS}
+    for path in FIXTURE_PATHS:
+        programs[path.stem] = with_handlers(path.read_text())
+
+    print(
+        f"{'program':<20} {'ops':>9} {'primitives/Mop':>15} {'frames/Mop':>12}"
+        f" {'peak KiB':>10}"
+    )
+    totals: Counter = Counter()
+    total_operations = 0
+    for name, source in programs.items():
+        executed, counts, peak = measure(
+            compiler.compile(source), args.backend, args.operations
+        )
+        totals.update(counts)
+        total_operations += executed
+
+        scale = 1e6 / max(executed, 1)
+        print(
+            f"{name:<20} {executed:>9} {counts[Primitive] * scale:>15.0f}"
+            f" {counts[StackFrame] * scale:>12.0f} {peak / 1024:>10.1f}"
+        )
+
+    scale = 1e6 / max(total_operations, 1)
+    print(
+        f"{'total':<20} {total_operations:>9} {totals[Primitive] * scale:>15.0f}"
+        f" {totals[StackFrame] * scale:>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Compare the throughput of the execution backends of ExecutionContext.
+
+python -m probots.benchmarks.interpreter_benchmark [--repeat N] [--operations N]
+
+Besides a few small programs, this runs the event handlers of the fixture
+programs, with stand-ins for the game's builtins (see stub_builtins). Most of
+the handlers loop for as long as the probot is alive, so every program is run
+until it finishes or has executed the given number of operations.
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+from ..probotics.compiler import ProboticsCompiler
+from ..probotics.interpreter import EXECUTION_BACKENDS, ExecutionContext
+from ..probotics.ops.all import Operation, Primitive, ScopeVars
+from ..probotics.ops.native import DirectFunc
+from ..probotics.optimizer import PeepholeOptimizer
+from . import FIXTURE_PATHS, format_table
+
+PROGRAMS = {
+    "fib": """
+        fib := { (n) if n < 2 { return n }
+          fib(n - 1) + fib(n - 2) }
+        fib(20)
+    """,
+    "calls": """
+        inc := { (x) x + 1 }
+        i := 0
+        while i < 20000 { i := inc(i) }
+        i
+    """,
+    "loop": """
+        sum := { (n) i := 0
+          total := 0
+          while i < n { total := total + i * 2
+            i := i + 1 }
+          total }
+        sum(20000)
+    """,
+}
+
+# The event handlers of a program (see the fixtures), and their arguments
+HANDLER = re.compile(r"^(on_\w+)\s*:=\s*\{\s*(?:\(([^)]*)\))?", re.MULTILINE)
+
+
+def with_handlers(source: str) -> str:
+    """The program, followed by calls to each of its event handlers"""
+    calls = []
+    for name, args in HANDLER.findall(source):
+        num_args = len([arg for arg in args.split(",") if arg.strip()])
+        calls.append(f"{name}({', '.join([repr('someone')] * num_args)})")
+    return source + "\n" + "\n".join(calls) + "\n"
+
+
+def stub_builtins() -> ScopeVars:
+    """Stand-ins for the builtins of the game (see services/game/builtin), which
+    return plausible values without a game. Like the real ones, `wait`, `move`
+    and `turn` stop the context until it is resumed"""
+
+    def stub(name: str, func: DirectFunc, *arg_names: str) -> Primitive:
+        return Primitive.native(func, name=name, arg_names=list(arg_names))
+
+    def returning(value: object) -> DirectFunc:
+        return lambda context, args: Primitive.of(value)
+
+    def stopping(context, args) -> None:
+        context.stop()
+
+    def to_str(context, args) -> Primitive:
+        return Primitive.of(str(args[0].value))
+
+    def length(context, args) -> Primitive:
+        return Primitive.of(len(args[0].value))
+
+    def new_list(context, args) -> Primitive:
+        return Primitive.of(list(args))
+
+    probot = {"name": "other", "x": 3, "y": 4, "orientation": "S"}
+    return {
+        "me": Primitive.of(
+            {
+                "name": "me",
+                "x": 3,
+                "y": 3,
+                "orientation": "N",
+                "energy": 300,
+                "crystals": 100,
+            }
+        ),
+        "print": stub("print", returning(None), "what"),
+        "str": stub("str", to_str, "value"),
+        "len": stub("len", length, "value"),
+        "list": stub("list", new_list),
+        "random": stub("random", returning(1), "max"),
+        "is_idle": stub("is_idle", returning(True)),
+        "collect": stub("collect", returning(False)),
+        "give": stub("give", returning(True), "amount", "to"),
+        "say": stub("say", returning(True), "what", "to"),
+        "players": stub("players", returning([probot])),
+        "inspect": stub("inspect", returning({**probot, "probot": probot}), "name"),
+        "spawn_bot": stub("spawn_bot", returning(None), "name", "profile"),
+        "move": stub("move", stopping, "dir"),
+        "turn": stub("turn", stopping, "dir"),
+        "wait": stub("wait", stopping, "ticks"),
+        "left": Primitive.of("left"),
+        "right": Primitive.of("right"),
+        "none": Primitive.of(None),
+        "None": Primitive.of(None),
+    }
+
+
+def time_execute(
+    operations: list[Operation],
+    backend: str,
+    max_operations: int,
+    repeat: int,
+    builtins: Optional[ScopeVars] = None,
+) -> tuple[float, ExecutionContext, Optional[Exception]]:
+    """Best time, in seconds, to execute the operations, the context of the last
+    run (for how many operations and frames were executed), and the error that
+    stopped the program, if any. The builtins are stub_builtins() by default"""
+    best = float("inf")
+    errors: list[Exception] = []
+    for _ in range(repeat):
+        context = ExecutionContext(
+            operations=operations,
+            builtins=builtins if builtins is not None else stub_builtins(),
+            backend=backend,
+            on_exception=lambda ex, context, frame: errors.append(ex),
+        )
+
+        start = time.perf_counter()
+        while not context.execute_next():
+            if context.total_operations >= max_operations:
+                break
+            context.resume()
+        best = min(best, time.perf_counter() - start)
+
+    return best, context, errors[0] if errors else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    compiler = ProboticsCompiler(resolve=True, optimizer=PeepholeOptimizer())
+    programs = dict(PROGRAMS)
+    paths: list[Path] = FIXTURE_PATHS
+    for path in paths:
+        programs[path.stem] = with_handlers(path.read_text())
+
+    columns = [("program", "<20"), ("ops", ">9")]
+    for backend in EXECUTION_BACKENDS:
+        columns += [(backend + " ms", ">13.2f"), (backend + " Mops/s", ">15.2f")]
+    columns.append(("", ""))
+
+    rows = []
+    totals = dict.fromkeys(EXECUTION_BACKENDS, 0.0)
+    for name, source in programs.items():
+        operations = compiler.compile(source)
+
+        row: list[object] = [name]
+        for backend in EXECUTION_BACKENDS:
+            elapsed, context, error = time_execute(
+                operations, backend, args.operations, args.repeat
+            )
+            executed = context.total_operations
+            totals[backend] += elapsed
+            if backend == EXECUTION_BACKENDS[0]:
+                row.append(executed)
+            row += [elapsed * 1000, executed / elapsed / 1e6]
+        if error is not None:
+            row.append(f" ({type(error).__name__}: {error})")
+        rows.append(row)
+
+    row = ["total", None]
+    for backend in EXECUTION_BACKENDS:
+        row += [totals[backend] * 1000, None]
+    rows.append(row)
+
+    print("\n".join(format_table(columns, rows, totals)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Count the most common sequences of operations (n-grams) in compiled programs,
+to find the ones worth fusing into superinstructions (see ops/superinstructions.py).
+
+python -m probots.benchmarks.op_ngrams [-n N] [--top N] [--dynamic] [--fused]
+
+By default, the sequences are counted in the operations of the fixture programs
+(and of the blocks in them) as compiled for the game. With --dynamic, the event
+handlers of the programs are run instead (see interpreter_benchmark), and each
+sequence is counted as many times as it was executed, from start to end without
+a jump. With --fused, the programs are compiled with superinstructions, to see
+what is left.
+
+Operations are named by their class, and the ones whose arguments matter to
+fusing them by their arguments too (e.g. JumpIf(sense=False)).
+"""
+
+import argparse
+from collections import Counter
+from typing import Iterator, Sequence
+
+from ..probotics.compiler import ProboticsCompiler
+from ..probotics.interpreter import ExecutionContext
+from ..probotics.ops.all import (
+    Call,
+    Immediate,
+    JumpIf,
+    Operation,
+    Primitive,
+)
+from ..probotics.optimizer import PeepholeOptimizer
+from . import FIXTURE_PATHS
+from .interpreter_benchmark import stub_builtins, with_handlers
+
+# The builtins that are constants or state, as in the game (see Programming and
+# Move.CONSTANTS)
+CONSTANTS = ("forward", "backward", "left", "right")
+STATE_BUILTINS = ("is_idle", "me")
+WAIT_BUILTINS = ("wait",)
+STATE_PROPERTIES = {"me": ("state", "x", "y", "orientation", "energy", "crystals")}
+
+
+def name_of(op: Operation) -> str:
+    cls = type(op).__name__
+    if isinstance(op, JumpIf):
+        return f"{cls}(sense={op.sense})"
+    if isinstance(op, Call):
+        return f"{cls}({op.num_args})"
+    if isinstance(op, Immediate) and op.value.is_block:
+        return f"{cls}(block)"
+    return cls
+
+
+def all_operations(operations: Sequence[Operation]) -> Iterator[Sequence[Operation]]:
+    """The operations, and those of every block in them"""
+    yield operations
+    for op in operations:
+        if isinstance(op, Immediate) and op.value.is_block:
+            yield from all_operations(op.value.value.operations)
+
+
+def static_ngrams(operations: Sequence[Operation], n: int) -> Counter:
+    counts: Counter = Counter()
+    for ops in all_operations(operations):
+        names = [name_of(op) for op in ops]
+        for i in range(len(names) - n + 1):
+            counts[tuple(names[i : i + n])] += 1
+    return counts
+
+
+def dynamic_ngrams(
+    operations: Sequence[Operation], n: int, max_operations: int
+) -> Counter:
+    """Run the operations an operation at a time, counting each sequence of
+    operations that executed one after another in the same frame"""
+    counts: Counter = Counter()
+    context = ExecutionContext(operations=operations, builtins=stub_builtins(), quantum=1)
+
+    # The latest operations executed in each frame, by their index
+    latest: dict[int, list[tuple[int, str]]] = {}
+    while context.total_operations < max_operations:
+        frame = context.current_frame
+        if frame is not None and frame.op_index < len(frame.operations):
+            index = frame.op_index
+            executed = latest.setdefault(id(frame), [])
+            if executed and executed[-1][0] != index - 1:
+                # Jumped here
+                executed.clear()
+            executed.append((index, name_of(frame.operations[index])))
+            if len(executed) > n:
+                del executed[0]
+            if len(executed) == n:
+                counts[tuple(name for _, name in executed)] += 1
+
+        if context.execute_next():
+            break
+        if context.stopped:
+            context.resume()
+        if context.current_frame is not frame:
+            # Entered or exited a frame, which may be reused for another call
+            latest.pop(id(frame), None)
+            if context.current_frame is not None:
+                latest.pop(id(context.current_frame), None)
+
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=2, help="length of the sequences")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--dynamic", action="store_true")
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--operations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    optimizer = PeepholeOptimizer(
+        constants={name: Primitive.of(name) for name in CONSTANTS},
+        state_builtins=STATE_BUILTINS,
+        wait_builtins=WAIT_BUILTINS,
+        superinstructions=args.fused,
+        state_properties=STATE_PROPERTIES,
+    )
+    compiler = ProboticsCompiler(resolve=True, optimizer=optimizer)
+
+    counts: Counter = Counter()
+    for path in FIXTURE_PATHS:
+        if args.dynamic:
+            operations = compiler.compile(with_handlers(path.read_text()))
+            counts.update(dynamic_ngrams(operations, args.n, args.operations))
+        else:
+            operations = compiler.compile(path.read_text())
+            counts.update(static_ngrams(operations, args.n))
+
+    total = sum(counts.values())
+    print(f"{'count':>8} {'share':>6}  sequence")
+    for sequence, count in counts.most_common(args.top):
+        print(f"{count:>8} {count / total:>6.1%}  {', '.join(sequence)}")
+
+
+if __name__ == "__main__":
+    main()
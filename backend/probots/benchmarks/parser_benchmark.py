@@ -0,0 +1,61 @@
+"""Compare the throughput of the parser backends of ProboticsCompiler.
+
+python -m probots.benchmarks.parser_benchmark [--repeat N]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from ..probotics.compiler import PARSER_BACKENDS, ProboticsCompiler
+from . import FIXTURE_PATHS, SAMPLE_PATH, format_table
+
+
+def time_compile(compiler: ProboticsCompiler, source: str, repeat: int) -> float:
+    """Best time, in seconds, to parse and generate code for the source"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compiler.compile_uncached(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    compilers = {
+        backend: ProboticsCompiler(backend=backend) for backend in PARSER_BACKENDS
+    }
+    paths: list[Path] = [SAMPLE_PATH, *FIXTURE_PATHS]
+
+    columns = [("program", "<20"), ("bytes", ">7")]
+    for backend in PARSER_BACKENDS:
+        columns += [(backend + " ms", ">10.2f"), (backend + " KB/s", ">12.1f")]
+
+    rows = []
+    totals = dict.fromkeys(PARSER_BACKENDS, 0.0)
+    total_bytes = 0
+    for path in paths:
+        source = path.read_text()
+        total_bytes += len(source)
+
+        row: list[object] = [path.name, len(source)]
+        for backend, compiler in compilers.items():
+            elapsed = time_compile(compiler, source, args.repeat)
+            totals[backend] += elapsed
+            row += [elapsed * 1000, len(source) / 1024 / elapsed]
+        rows.append(row)
+
+    row = ["total", total_bytes]
+    for backend in PARSER_BACKENDS:
+        row += [totals[backend] * 1000, total_bytes / 1024 / totals[backend]]
+    rows.append(row)
+
+    print("\n".join(format_table(columns, rows, totals)))
+
+
+if __name__ == "__main__":
+    main()
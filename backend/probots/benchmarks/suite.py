@@ -0,0 +1,217 @@
+"""Micro-benchmarks of the interpreter, with machine-readable results, for
+comparing one version with another.
+
+python -m probots.benchmarks.suite [--repeat N] [--operations N] [--backend NAME]
+    [--workload NAME] [--output FILE] [--compare FILE]
+
+Each workload is compiled as it is for the game (see Programming), and run by
+an ExecutionContext directly -- without the game -- with stand-ins for the
+game's builtins (see interpreter_benchmark.stub_builtins), until it finishes or
+has executed the given number of operations. The workloads are arithmetic
+loops, calls and deep recursion, reading properties of an object whose values
+come from callbacks (like `me` in the game, see CallbackDict), building lists,
+and the event handlers of the fixture programs.
+
+For each workload and backend, the results are written as JSON: operations and
+frames per second (the best of the repeated runs), and the objects allocated per
+operation (counted in a separate run, see alloc_benchmark). With --compare, the
+operations per second are also compared with the results of an earlier run.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from typing import Any, Callable, Optional
+
+from ..probotics.compiler import ProboticsCompiler
+from ..probotics.interpreter import EXECUTION_BACKENDS
+from ..probotics.ops.all import Primitive, ScopeVars, StackFrame
+from ..probotics.optimizer import PeepholeOptimizer
+from ..utils.callback_dict import CallbackDict
+from . import FIXTURE_PATHS, format_table
+from .alloc_benchmark import measure
+from .interpreter_benchmark import PROGRAMS, stub_builtins, time_execute, with_handlers
+from .op_ngrams import CONSTANTS, STATE_BUILTINS, STATE_PROPERTIES, WAIT_BUILTINS
+
+WORKLOADS = {
+    "arithmetic": PROGRAMS["loop"],
+    "calls": PROGRAMS["calls"],
+    "fib": PROGRAMS["fib"],
+    "deep_recursion": """
+        depth := { (n) if n == 0 { return 0 }
+          depth(n - 1) + 1 }
+        i := 0
+        total := 0
+        while i < 10 { total := total + depth(2000)
+          i := i + 1 }
+        total
+    """,
+    "me_properties": """
+        i := 0
+        far := 0
+        while i < 5000 { if me.x + me.y > 5 and me.energy > 100 { far := far + 1 }
+          i := i + 1 }
+        far
+    """,
+    "list_building": """
+        items := list()
+        i := 0
+        while i < 10000 { items[i] := i * 2
+          i := i + 1 }
+        len(items)
+    """,
+}
+
+for path in FIXTURE_PATHS:
+    WORKLOADS[path.stem] = with_handlers(path.read_text())
+
+
+def callback_me() -> Primitive:
+    """`me`, with its values computed by callbacks when they are read, like the
+    game's (see builtin/me.py)"""
+    probot = {"x": 3, "y": 3, "orientation": "N", "energy": 300, "crystals": 100}
+    get: dict[str, Callable[[], Any]] = {
+        "name": lambda: "me",
+        **{key: (lambda key=key: probot[key]) for key in probot},
+    }
+
+    def on_get(key: str, default: Optional[Any] = None) -> Primitive:
+        handler = get.get(key, None)
+        return Primitive.of(handler() if handler else default)
+
+    def on_set(key: str, value: Any) -> None:
+        raise KeyError(f"Not settable: {key}")
+
+    return Primitive.of(
+        CallbackDict(
+            on_get=on_get,
+            on_set=on_set,
+            on_delete=on_set,
+            on_iter=lambda: iter(get),
+        )
+    )
+
+
+def builtins_for_suite() -> ScopeVars:
+    return {**stub_builtins(), "me": callback_me()}
+
+
+def game_compiler() -> ProboticsCompiler:
+    """The compiler, configured as the game's (see Programming)"""
+    optimizer = PeepholeOptimizer(
+        constants={name: Primitive.of(name) for name in CONSTANTS},
+        state_builtins=STATE_BUILTINS,
+        wait_builtins=WAIT_BUILTINS,
+        superinstructions=True,
+        state_properties=STATE_PROPERTIES,
+    )
+    return ProboticsCompiler(
+        backend="pratt", resolve=True, optimizer=optimizer, tail_calls=True
+    )
+
+
+def run_workload(
+    source: str, backend: str, max_operations: int, repeat: int
+) -> dict[str, Any]:
+    operations = game_compiler().compile(source)
+    seconds, context, error = time_execute(
+        operations, backend, max_operations, repeat, builtins_for_suite()
+    )
+    executed = context.total_operations
+    frames = context.total_frames
+
+    counted, counts, _ = measure(
+        game_compiler().compile(source), backend, max_operations, builtins_for_suite()
+    )
+    allocs = sum(counts.values())
+    per_op = 1 / max(counted, 1)
+
+    return {
+        "backend": backend,
+        "operations": executed,
+        "frames": frames,
+        "seconds": seconds,
+        "ops_per_sec": executed / seconds if seconds else 0.0,
+        "frames_per_sec": frames / seconds if seconds else 0.0,
+        "allocs_per_op": allocs * per_op,
+        "primitives_per_op": counts[Primitive] * per_op,
+        "stack_frames_per_op": counts[StackFrame] * per_op,
+        "error": f"{type(error).__name__}: {error}" if error is not None else None,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Lines comparing the operations per second of each workload and backend
+    with the baseline's"""
+    before = {
+        (result["workload"], result["backend"]): result for result in baseline["results"]
+    }
+    columns = [
+        ("workload", "<20"),
+        ("backend", "<9"),
+        ("Mops/s", ">8.2f"),
+        ("before", ">8.2f"),
+        ("change", ">+8.1%"),
+    ]
+    rows = []
+    for result in results["results"]:
+        old = before.get((result["workload"], result["backend"]), None)
+        now = result["ops_per_sec"] / 1e6
+        then = old["ops_per_sec"] / 1e6 if old is not None else 0.0
+        rows.append(
+            [
+                result["workload"],
+                result["backend"],
+                now,
+                then or None,
+                now / then - 1 if then else None,
+            ]
+        )
+    return format_table(columns, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument(
+        "--backend", choices=EXECUTION_BACKENDS, action="append", dest="backends"
+    )
+    parser.add_argument(
+        "--workload", choices=WORKLOADS, action="append", dest="workloads"
+    )
+    parser.add_argument("--output", help="write the results to the file, not stdout")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "max_operations": args.operations,
+        "results": [],
+    }
+    for name in args.workloads or WORKLOADS:
+        for backend in args.backends or EXECUTION_BACKENDS:
+            result = run_workload(WORKLOADS[name], backend, args.operations, args.repeat)
+            results["results"].append({"workload": name, **result})
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)
+        print("\n".join(compare(results, baseline)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from .compiled_program import CompiledProgram
 from .game.all import *
 from .message import Message
 from .mixins.pydantic_base import BaseSchema
@@ -0,0 +1,47 @@
+from datetime import UTC, datetime
+from typing import Optional
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db import DB
+
+LOGGER = structlog.get_logger(__name__)
+
+
+class CompiledProgram(DB.Model):
+    """The compiled (serialized) operations of a program, so that saved programs
+    don't have to be parsed again after a restart. Keyed by the hash of the
+    program content, and the version of the compiler that compiled it -- a
+    different compiler version can't use them."""
+
+    __tablename__ = "compiled_programs"
+
+    content_hash: Mapped[str] = mapped_column(DB.String(64), primary_key=True)
+    compiler_version: Mapped[str] = mapped_column(DB.String(40), primary_key=True)
+
+    bytecode: Mapped[bytes] = mapped_column(DB.LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DB.DateTime, nullable=False, default=lambda: datetime.now(tz=UTC)
+    )
+
+    @classmethod
+    def lookup(cls, content_hash: str, compiler_version: str) -> Optional[bytes]:
+        stmt = select(cls.bytecode).where(
+            cls.content_hash == content_hash,
+            cls.compiler_version == compiler_version,
+        )
+        return DB.session.scalar(stmt)
+
+    @classmethod
+    def store(cls, content_hash: str, compiler_version: str, bytecode: bytes) -> None:
+        DB.session.merge(
+            cls(
+                content_hash=content_hash,
+                compiler_version=compiler_version,
+                bytecode=bytecode,
+            )
+        )
+        DB.session.commit()
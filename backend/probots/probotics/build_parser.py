@@ -0,0 +1,39 @@
+"""Generate the static Probotics parser module from the grammar.
+
+Compiling the grammar with tatsu at runtime is slow, so the generated parser
+module is checked in alongside the grammar. Whenever the grammar changes,
+regenerate it with:
+
+    python -m probots.probotics.build_parser
+"""
+
+import hashlib
+from pathlib import Path
+
+import tatsu
+
+GRAMMAR_PATH = Path(__file__).with_name("probotics-grammar.ebnf")
+GENERATED_PATH = Path(__file__).with_name("generated_parser.py")
+
+
+def grammar_digest(grammar: str) -> str:
+    """Identifies the version of the grammar a parser was generated from"""
+    return hashlib.sha256(grammar.encode("utf-8")).hexdigest()
+
+
+def generate(grammar: str) -> str:
+    """Generate the python source for a parser of the grammar. The digest of
+    the grammar is recorded in the module, so that a stale module can be
+    detected when it is loaded"""
+    source = tatsu.to_python_sourcecode(grammar)
+    return f'{source}\n\nGRAMMAR_DIGEST = "{grammar_digest(grammar)}"\n'
+
+
+def main() -> None:
+    grammar = GRAMMAR_PATH.read_text()
+    GENERATED_PATH.write_text(generate(grammar))
+    print(f"Generated {GENERATED_PATH.name} from {GRAMMAR_PATH.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, TypeAlias
+
+from .ops.all import Immediate, Operation, SourceMap, source_map_of
+
+CompiledOperations: TypeAlias = tuple[Operation, ...]
+
+
+class FrozenMappedOperations(tuple[Operation, ...]):
+    """Frozen MappedOperations: the operations of a program with a source map
+    for its top level"""
+
+    source_map: Optional[SourceMap] = None
+
+
+class CompiledProgramCache:
+    """Bounded LRU cache of compiled operations, keyed by a hash of the source text.
+
+    The cached operation lists are frozen (tuples, including the operations of any
+    nested blocks) so that the same compiled program can safely be shared between
+    every caller that compiles the same source -- e.g. many bots spawned from the
+    same profile.
+
+    The cache may be used from several threads (websocket handlers and the game
+    thread), so access is serialized with a lock.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict[str, CompiledOperations] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(source: str) -> str:
+        """Content address of the source text"""
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CompiledOperations]:
+        with self.lock:
+            operations = self.entries.get(key, None)
+            if operations is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return operations
+
+    def put(self, key: str, operations: Sequence[Operation]) -> CompiledOperations:
+        """Freeze and store the operations, evicting the least recently used
+        entries if the cache is full. Returns the frozen operations."""
+        frozen = freeze(operations)
+
+        with self.lock:
+            self.entries[key] = frozen
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        return frozen
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def freeze(operations: Sequence[Operation]) -> CompiledOperations:
+    """Convert a list of operations into a tuple, recursively doing the same for
+    the operations of any nested blocks. A source map of the top level is kept
+    (see FrozenMappedOperations)"""
+    for op in operations:
+        if isinstance(op, Immediate) and op.value.is_block:
+            block = op.value.value
+            if not isinstance(block.operations, tuple):
+                block.operations = freeze(block.operations)
+                block.arg_names = tuple(block.arg_names)
+
+    if isinstance(operations, tuple):
+        return operations
+
+    source_map = source_map_of(operations)
+    if source_map is None:
+        return tuple(operations)
+
+    frozen = FrozenMappedOperations(operations)
+    frozen.source_map = source_map
+    return frozen
+
+
+# Shared by everything in the process that compiles player programs
+PROGRAM_CACHE = CompiledProgramCache()
@@ -0,0 +1,616 @@
+"""Closure-compiled execution of operations -- the "closures" backend of
+ExecutionContext, an alternative to calling each operation's execute() in turn.
+
+The operations of a block are compiled (the first time it is called) into a
+list of steps, one for each operation: a closure specialized for it (e.g. the
+step for an Immediate just appends its value), or else its own execute(). The
+loop calls the steps, and transfers control between frames the same way as the
+"ops" backend (see ExecutionContext.transfer).
+
+Hot code -- a block that loops, or that has been called HOT_CALLS times -- is
+compiled further. Each run of straight-line operations (up to and including a
+jump, or the end of a loop iteration) is generated as the source of a single
+Python function, in which the values on the stack are Python variables rather
+than pushed to and popped from the frame. A run is only ever entered at its
+start, and calls and other transfers of control end a run, so every place a
+program can yield (the end of a loop iteration, `wait`, the quantum being used
+up) is still between steps.
+"""
+
+import sys
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence, TypeAlias
+
+from .ops.all import (
+    Addition,
+    Assignment,
+    BinaryOperator,
+    Catch,
+    CompareEqual,
+    CompareGreaterThan,
+    CompareGreaterThanOrEqual,
+    CompareJump,
+    CompareLessThan,
+    CompareLessThanOrEqual,
+    CompareNotEqual,
+    Control,
+    Division,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
+    GetIndex,
+    GetLocal,
+    GetProperty,
+    GetValue,
+    Immediate,
+    Index,
+    Jump,
+    JumpIf,
+    LoadProperty,
+    LogicalAnd,
+    LogicalNot,
+    LogicalOr,
+    Multiplication,
+    Operation,
+    Primitive,
+    PrimitiveType,
+    Property,
+    SetGlobal,
+    SetLocal,
+    StackFrame,
+    Subtraction,
+    UndefinedSymbol,
+)
+from .ops.superinstructions import COMPARISONS
+
+if TYPE_CHECKING:
+    from .interpreter import ExecutionContext
+
+Step: TypeAlias = Callable[[StackFrame], Optional[Control]]
+
+# How many times a block is called before its runs of operations are generated
+# as Python functions
+HOT_CALLS = 10
+
+# The file name of generated functions, in tracebacks
+GENERATED_FILENAME = "<probotics>"
+
+# Operations that only ever continue with the next operation, so can be part
+# of a run
+STRAIGHT_LINE: tuple[type[Operation], ...] = (
+    Immediate,
+    GetValue,
+    Assignment,
+    SetLocal,
+    SetGlobal,
+    BinaryOperator,
+    LogicalNot,
+    Property,
+    GetProperty,
+    Index,
+    GetIndex,
+    EnterLoop,
+    ExitLoop,
+    LoadProperty,
+)
+
+# Operations that can end a run
+END_OF_RUN: tuple[type[Operation], ...] = (Jump, JumpIf, CompareJump, EndIteration)
+
+# The raw values of immediates that can be used directly in generated code
+PLAIN_VALUES = (int, float, str, bool, type(None))
+
+# The expression each binary operator computes from the raw values of its
+# operands (see arithmetic.py, comparison.py and logical.py)
+BINARY_EXPRESSIONS: dict[type[BinaryOperator], str] = {
+    Addition: "({}) + ({})",
+    Subtraction: "({}) - ({})",
+    Multiplication: "({}) * ({})",
+    Division: "({}) / ({})",
+    CompareEqual: "({}) == ({})",
+    CompareNotEqual: "({}) != ({})",
+    CompareLessThan: "({}) < ({})",
+    CompareLessThanOrEqual: "({}) <= ({})",
+    CompareGreaterThan: "({}) > ({})",
+    CompareGreaterThanOrEqual: "({}) >= ({})",
+    LogicalAnd: "bool({}) and bool({})",
+    LogicalOr: "bool({}) or bool({})",
+}
+
+
+class Code:
+    """The steps that execute a list of operations: the step for the operation at
+    each index, and how many operations it executes (more than one for a run)"""
+
+    __slots__ = ("operations", "steps", "costs", "calls", "generated")
+
+    operations: Sequence[Operation]
+    steps: list[Step]
+    costs: list[int]
+
+    # How many times the block has been called
+    calls: int
+
+    # Whether the runs of operations have been generated as Python functions
+    generated: bool
+
+    def __init__(self, operations: Sequence[Operation]) -> None:
+        operations = list(operations)
+        self.operations = operations
+        self.steps = [step_for(op, i, len(operations)) for i, op in enumerate(operations)]
+        self.costs = [1] * len(operations)
+        self.calls = 0
+        self.generated = False
+
+        if any(type(op) is EnterLoop for op in operations):
+            self.generate()
+
+    def called(self) -> None:
+        if not self.generated:
+            self.calls += 1
+            if self.calls >= HOT_CALLS:
+                self.generate()
+
+    def generate(self) -> None:
+        """Replace the steps of the runs of straight-line operations with
+        generated functions"""
+        self.generated = True
+        runs = find_runs(self.operations)
+        if not runs:
+            return
+
+        generator = RunGenerator(self.operations)
+        functions = generator.generate(runs)
+        for (start, end), function in zip(runs, functions, strict=True):
+            self.steps[start] = function
+            self.costs[start] = end - start
+
+
+def execute_closures(
+    context: "ExecutionContext", frame: StackFrame
+) -> Optional[StackFrame]:
+    """Execute the compiled steps of the frame's operations (see
+    ExecutionContext.execute_operations, which this mirrors). Returns the frame to
+    continue with the next time, or None when the program is done"""
+    code = code_of(frame)
+    steps = code.steps
+    costs = code.costs
+    quantum = context.quantum or sys.maxsize
+    executed = 0
+    try:
+        while executed < quantum:
+            index = frame.op_index
+            if index < len(steps):
+                cost = costs[index]
+                if executed + cost > quantum and executed:
+                    # A run that would go over the quantum waits for the next one
+                    break
+                frame.op_index = index + 1
+                control = steps[index](frame)
+                executed += cost
+                if control is None:
+                    continue
+            else:
+                control = Control.EXIT
+
+            if control is Control.YIELD:
+                return frame
+
+            frame = context.transfer(frame, control)
+            if frame is None:
+                return None
+
+            code = code_of(frame)
+            if control is Control.ENTER:
+                code.called()
+                if frame.results is None:
+                    frame.results = []
+            steps = code.steps
+            costs = code.costs
+
+        # Used up the quantum: continue from here the next time
+        context.preemptions += 1
+        return frame
+
+    except Exception as ex:
+        locate_error(frame, ex.__traceback__)
+        raise
+
+    finally:
+        context.latest_operations = executed
+        context.total_operations += executed
+
+
+def code_of(frame: StackFrame) -> Code:
+    """The compiled operations of the frame -- of its block, or of the top level
+    of the program"""
+    block = frame.block
+    if block is not None:
+        code = block.code
+        if code is None:
+            code = block.code = Code(block.operations)
+        return code
+
+    context = frame.context
+    if frame.operations is context.operations:
+        if context.code is None:
+            context.code = Code(context.operations)
+        return context.code
+
+    return Code(frame.operations)
+
+
+def locate_error(frame: StackFrame, tb: Optional[TracebackType]) -> None:
+    """When an operation in a generated run fails, point the frame at that
+    operation (rather than the start of the run), for describing where the error
+    happened"""
+    index = None
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename == GENERATED_FILENAME:
+            index = tb.tb_frame.f_globals["LINES"].get(tb.tb_lineno, index)
+        tb = tb.tb_next
+
+    if index is not None:
+        frame.op_index = index + 1
+
+
+#
+# Steps for single operations
+#
+
+
+def step_for(op: Operation, index: int, length: int) -> Step:
+    """The step that executes the operation, at the index in a list of operations
+    of the length"""
+    cls = type(op)
+
+    if cls is Immediate:
+        value = op.value
+
+        def immediate(frame: StackFrame) -> None:
+            frame.results.append(value)
+
+        return immediate
+
+    if cls is GetLocal:
+        slot = op.slot
+        get_value = op.execute
+
+        def get_local(frame: StackFrame) -> Optional[Control]:
+            value = frame.slots[slot]
+            if value is None:
+                return get_value(frame)
+            frame.results.append(value)
+
+        return get_local
+
+    if cls is Jump or cls is JumpIf:
+        target = index + 1 + op.jump
+        if not 0 <= target <= length:
+            # Fails when executed
+            return op.execute
+
+        if cls is Jump:
+
+            def jump(frame: StackFrame) -> None:
+                frame.op_index = target
+
+            return jump
+
+        sense = op.sense
+
+        def jump_if(frame: StackFrame) -> None:
+            if frame.results.pop().is_true is sense:
+                frame.op_index = target
+
+        return jump_if
+
+    if isinstance(op, BinaryOperator):
+        compute = op._execute
+
+        def binary(frame: StackFrame) -> None:
+            results = frame.results
+            right = results.pop()
+            results[-1] = compute(results[-1], right)
+
+        return binary
+
+    return op.execute
+
+
+#
+# Generated runs of operations
+#
+
+
+def find_runs(operations: Sequence[Operation]) -> list[tuple[int, int]]:
+    """The runs of straight-line operations worth generating functions for, as
+    (start, end) indices. A run can end with a jump, but nothing jumps into the
+    middle of one"""
+    length = len(operations)
+    targets = set()
+    for i, op in enumerate(operations):
+        if isinstance(op, Catch):
+            targets.update(i + jump for jump in op.jumps.values())
+        elif isinstance(op, Jump):
+            targets.add(i + 1 + op.jump)
+
+    def ends_run(i: int) -> bool:
+        op = operations[i]
+        if type(op) in (Jump, JumpIf, CompareJump):
+            return 0 <= i + 1 + op.jump <= length
+        return isinstance(op, EndIteration)
+
+    runs = []
+    start = 0
+    while start < length:
+        end = start
+        while end < length and isinstance(operations[end], STRAIGHT_LINE):
+            end += 1
+            if end in targets:
+                break
+        if end < length and end not in targets and ends_run(end):
+            end += 1
+
+        if end - start > 1:
+            runs.append((start, end))
+        start = max(end, start + 1)
+
+    return runs
+
+
+class Value:
+    """A value on the stack of a generated run: the variable holding it as a
+    Primitive (None until it is needed), and an expression for its raw value"""
+
+    __slots__ = ("primitive", "raw", "maybe_block")
+
+    def __init__(self, primitive: Optional[str], raw: str, maybe_block: bool) -> None:
+        self.primitive = primitive
+        self.raw = raw
+        self.maybe_block = maybe_block
+
+
+class RunGenerator:
+    """Generates a function for each run of operations, in which the operations'
+    values are kept in variables (see Value) until they are needed on the frame's
+    stack"""
+
+    def __init__(self, operations: Sequence[Operation]) -> None:
+        self.operations = operations
+        self.namespace: dict[str, Any] = {
+            "of": Primitive.of,
+            "BLOCK": PrimitiveType.BLOCK,
+            "YIELD": Control.YIELD,
+            "get_value": get_value,
+            "get_builtin": get_builtin,
+            "cannot_assign": cannot_assign,
+        }
+        self.constants: dict[int, str] = {}
+
+        # The source of all the functions, and the operation each line is for
+        self.lines: list[str] = []
+        self.line_ops: dict[int, int] = {}
+
+    def generate(self, runs: list[tuple[int, int]]) -> list[Step]:
+        names = [self.generate_run(start, end) for start, end in runs]
+
+        self.namespace["LINES"] = self.line_ops
+        source = "\n".join(self.lines) + "\n"
+        exec(compile(source, GENERATED_FILENAME, "exec"), self.namespace)
+        return [self.namespace[name] for name in names]
+
+    def generate_run(self, start: int, end: int) -> str:
+        self.stack: list[Value] = []
+        self.body: list[tuple[int, str]] = []
+        self.temps = 0
+        self.uses: set[str] = set()
+
+        for index in range(start, end):
+            self.index = index
+            self.generate_op(self.operations[index], end)
+
+        name = f"run_{start}"
+        self.lines.append(f"def {name}(frame):")
+        self.lines.append("    results = frame.results")
+        for local in sorted(self.uses):
+            self.lines.append(f"    {local} = frame.{local}")
+        for index, line in self.body:
+            self.lines.append(f"    {line}")
+            self.line_ops[len(self.lines)] = index
+        self.lines.append("")
+        return name
+
+    def generate_op(self, op: Operation, end: int) -> None:
+        cls = type(op)
+
+        if cls is Immediate:
+            value = op.value
+            primitive = self.constant(value)
+            if isinstance(value.value, PLAIN_VALUES):
+                raw = self.constant(value.value)
+            else:
+                raw = f"{primitive}.value"
+            self.stack.append(Value(primitive, raw, value.is_block))
+
+        elif cls is GetLocal:
+            self.uses.add("slots")
+            temp = self.temp()
+            name = self.constant(op.name)
+            self.emit(f"{temp} = slots[{op.slot}]")
+            self.emit(f"if {temp} is None: {temp} = get_value(frame, {name})")
+            self.push_primitive(temp)
+
+        elif cls is GetValue:
+            temp = self.temp()
+            self.emit(f"{temp} = get_value(frame, {self.constant(op.name)})")
+            self.push_primitive(temp)
+
+        elif cls is GetGlobal:
+            self.uses.add("global_vars")
+            temp = self.temp()
+            name = self.constant(op.name)
+            self.emit(f"{temp} = global_vars.get({name})")
+            self.emit(f"if {temp} is None: {temp} = get_builtin(frame, {name})")
+            self.push_primitive(temp)
+
+        elif cls is SetLocal:
+            self.uses.add("slots")
+            value = self.pop()
+            primitive = self.primitive(value)
+            name = self.constant(op.name)
+            self.emit(
+                f"if slots[{op.slot}] is None and frame.get({name}) is not None: "
+                f"frame.set({name}, {primitive})"
+            )
+            self.emit(f"else: slots[{op.slot}] = {primitive}")
+            self.push_assigned(value)
+
+        elif cls is SetGlobal:
+            self.uses.update(("global_vars", "builtins"))
+            value = self.pop()
+            primitive = self.primitive(value)
+            name = self.constant(op.name)
+            self.emit(
+                f"if {name} not in global_vars and {name} in builtins: "
+                f"cannot_assign({name})"
+            )
+            self.emit(f"global_vars[{name}] = {primitive}")
+            self.push_assigned(value)
+
+        elif cls in BINARY_EXPRESSIONS:
+            right = self.pop()
+            left = self.pop()
+            temp = self.temp()
+            expression = BINARY_EXPRESSIONS[cls].format(left.raw, right.raw)
+            self.emit(f"{temp} = {expression}")
+            self.stack.append(Value(None, temp, False))
+
+        elif isinstance(op, BinaryOperator):
+            right = self.primitive(self.pop())
+            left = self.primitive(self.pop())
+            temp = self.temp()
+            self.emit(f"{temp} = {self.constant(op._execute)}({left}, {right})")
+            self.push_primitive(temp)
+
+        elif cls is LogicalNot:
+            value = self.pop()
+            temp = self.temp()
+            self.emit(f"{temp} = not ({value.raw})")
+            self.stack.append(Value(None, temp, False))
+
+        elif cls is Jump:
+            self.flush()
+            self.emit(f"frame.op_index = {self.index + 1 + op.jump}")
+            return
+
+        elif cls is JumpIf or cls is CompareJump:
+            if cls is CompareJump:
+                right = self.pop()
+                left = self.pop()
+                comparison = BINARY_EXPRESSIONS[COMPARISONS[op.comparison][0]]
+                condition = Value(None, comparison.format(left.raw, right.raw), False)
+            else:
+                condition = self.pop()
+            self.flush()
+            test = condition.raw if op.sense else f"not ({condition.raw})"
+            self.emit(f"if {test}: frame.op_index = {self.index + 1 + op.jump}")
+            self.emit(f"else: frame.op_index = {end}")
+            return
+
+        elif isinstance(op, EndIteration):
+            self.flush()
+            self.emit(f"frame.op_index = {end}")
+            self.emit(f"return {self.constant(op.execute)}(frame)")
+            return
+
+        else:
+            # Anything else works on the frame's stack itself
+            self.flush()
+            self.emit(f"{self.constant(op.execute)}(frame)")
+
+        if self.index == end - 1:
+            self.flush()
+            self.emit(f"frame.op_index = {end}")
+
+    def emit(self, line: str) -> None:
+        self.body.append((self.index, line))
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"t{self.temps}"
+
+    def constant(self, value: Any) -> str:
+        """The name of a variable in the generated code with the value"""
+        name = self.constants.get(id(value), None)
+        if name is None:
+            name = f"k{len(self.constants)}"
+            self.constants[id(value)] = name
+            self.namespace[name] = value
+        return name
+
+    def pop(self) -> Value:
+        if self.stack:
+            return self.stack.pop()
+
+        temp = self.temp()
+        self.emit(f"{temp} = results.pop()")
+        return Value(temp, f"{temp}.value", True)
+
+    def primitive(self, value: Value) -> str:
+        """The variable holding the value as a Primitive, creating it if needed"""
+        if value.primitive is None:
+            temp = self.temp()
+            self.emit(f"{temp} = of({value.raw})")
+            value.primitive = temp
+        return value.primitive
+
+    def push_primitive(self, temp: str) -> None:
+        self.stack.append(Value(temp, f"{temp}.value", True))
+
+    def push_assigned(self, value: Value) -> None:
+        """Assignment leaves the value on the stack, unless it's a block"""
+        if value.maybe_block:
+            self.flush()
+            primitive = value.primitive
+            self.emit(f"if {primitive}.type != BLOCK: results.append({primitive})")
+        else:
+            self.stack.append(value)
+
+    def flush(self) -> None:
+        """Push the values that are only in variables onto the frame's stack"""
+        if not self.stack:
+            return
+        primitives = [self.primitive(value) for value in self.stack]
+        self.stack = []
+        if len(primitives) == 1:
+            self.emit(f"results.append({primitives[0]})")
+        else:
+            self.emit(f"results.extend(({', '.join(primitives)},))")
+
+
+#
+# Helpers for generated code, with the same behavior as the operations
+#
+
+
+def get_value(frame: StackFrame, name: str) -> Primitive:
+    """See GetValue"""
+    value = frame.get(name)
+    if value is None:
+        raise UndefinedSymbol(f"undefined: {name}")
+    return value
+
+
+def get_builtin(frame: StackFrame, name: str) -> Primitive:
+    """See GetGlobal"""
+    value = frame.builtins.get(name)
+    if value is None:
+        raise UndefinedSymbol(f"undefined: {name}")
+    return value
+
+
+def cannot_assign(name: str) -> None:
+    """See SetGlobal"""
+    raise ValueError(f"Cannot assign to builtin: {name}")
@@ -1,4 +1,7 @@
+import re
 from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
 import structlog
 from tatsu.model import Node
@@ -17,7 +20,12 @@ from .ops.all import (
     CompareLessThanOrEqual,
     CompareNotEqual,
     Division,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
     GetIndex,
+    GetLocal,
     GetProperty,
     GetValue,
     Immediate,
@@ -35,25 +43,138 @@ from .ops.all import (
     PrimitiveType,
     Property,
     Return,
+    SetGlobal,
+    SetLocal,
+    SourceMap,
     Subtraction,
+    TailCall,
 )
+from .tokenizer import line_starts, locate
 
 LOGGER = structlog.get_logger(__name__)
 
+# Names of extra arguments passed to a block, beyond the ones it declares
+EXTRA_ARG_NAME = re.compile(r"arg[0-9]+")
+
+# What the Catch after a call catches (outside of loops, see walk_WhileLoop):
+# the call returning, which continues after the Catch
+CALL_CATCHES = {"return": 1, "wait": 1}
+
+
+@dataclass
+class LoopLabels:
+    """Operations in a loop body whose jumps are set when the loop is complete,
+    by their index"""
+
+    breaks: list[int] = field(default_factory=list)
+    nexts: list[int] = field(default_factory=list)
+
+    # The Catch operations after calls
+    calls: list[int] = field(default_factory=list)
+
 
 class ProboticsCodeGenerator(NodeWalker):
     """Walks a parsed AST of probotics code and gencaerates executable bits that
     can be run by the interpreter.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        resolve: bool = False,
+        source: Optional[str] = None,
+        tail_calls: bool = False,
+    ) -> None:
         self.operations: list[Operation] = []
         self.context = []
 
+        # Given the source, the position in it of the node each operation was
+        # generated for is recorded, as [index, pos] whenever it changes, to build
+        # the source maps of the top level and of each block -- see walk()
+        self.line_starts = line_starts(source) if source is not None else None
+        self.positions: Optional[list[list[int]]] = [] if source is not None else None
+        self.position: Optional[int] = None
+
+        # The while loops that the code being generated is directly in
+        self.loops: list[LoopLabels] = []
+
+        # When resolving, variables are accessed with GetGlobal / SetGlobal at the
+        # top level, and with GetLocal / SetLocal by slot for the arguments and
+        # locals of a block -- see resolve_variables
+        self.resolve = resolve
+
+        # The variable operations in the block being generated, by index
+        self.variables: list[int] = []
+
+        # Whether calls in tail position reuse the calling frame -- see
+        # mark_tail_calls
+        self.tail_calls = tail_calls
+
     def mark(self):
         """Mark the current position in the operations list."""
         return len(self.operations)
 
+    def walk(self, node: Any, *args, **kwargs) -> Any:
+        if self.positions is None:
+            return super().walk(node, *args, **kwargs)
+
+        pos = self.node_position(node)
+        if pos is None:
+            return super().walk(node, *args, **kwargs)
+
+        # The operations generated for the node are at its position, except for
+        # those generated for nodes inside it
+        outer = self.position
+        self.set_position(pos)
+        try:
+            return super().walk(node, *args, **kwargs)
+        finally:
+            self.set_position(outer)
+
+    @staticmethod
+    def node_position(node: Any) -> Optional[int]:
+        """Where a node starts in the source: the hand-written parser's nodes
+        have a `pos`, tatsu's have parseinfo (when it is enabled)"""
+        pos = getattr(node, "pos", None)
+        if pos is None:
+            parseinfo = getattr(node, "parseinfo", None)
+            pos = parseinfo.pos if parseinfo is not None else None
+        return pos
+
+    def set_position(self, pos: Optional[int]) -> None:
+        """Operations from here on are at the position"""
+        self.position = pos
+        if pos is None:
+            return
+
+        index = len(self.operations)
+        positions = self.positions
+        if positions and positions[-1][0] == index:
+            # Nothing was generated at the previous position
+            positions.pop()
+        if not positions or positions[-1][1] != pos:
+            positions.append([index, pos])
+
+    def take_source_map(self, start: int = 0) -> Optional[SourceMap]:
+        """Remove the positions of the operations from the start (which are
+        being moved into a block), and return their source map"""
+        if self.positions is None:
+            return None
+
+        taken = [entry for entry in self.positions if entry[0] >= start]
+        del self.positions[len(self.positions) - len(taken) :]
+
+        # (Positions after the last operation don't apply to anything)
+        end = len(self.operations)
+        return SourceMap(
+            (index - start, *locate(self.line_starts, pos))
+            for index, pos in taken
+            if index < end
+        )
+
+    def source_map(self) -> Optional[SourceMap]:
+        """The source map of the top-level operations"""
+        return self.take_source_map(0)
+
     @contextmanager
     def in_context(self, name: str):
         self.context.append(name)
@@ -64,6 +185,61 @@ class ProboticsCodeGenerator(NodeWalker):
     def is_in_context(self, name: str) -> bool:
         return name in self.context
 
+    @contextmanager
+    def in_function(self):
+        """The statements of a block are called as a function, so aren't directly
+        in any loop that the block is defined in"""
+        loops, variables = self.loops, self.variables
+        self.loops, self.variables = [], []
+        yield
+        self.loops, self.variables = loops, variables
+
+    def resolve_variables(self, arg_names: list[str]) -> int:
+        """Resolve the variables of the block that was just generated to slots in
+        its frame: the arguments come first, then any other names that are
+        assigned in the block, which are its locals. Everything else is a global
+        (or builtin). Returns the number of slots."""
+        slots = {name: slot for slot, name in enumerate(arg_names)}
+        num_slots = len(arg_names)
+        for index in self.variables:
+            op = self.operations[index]
+            if isinstance(op, SetGlobal) and op.name not in slots:
+                slots[op.name] = num_slots
+                num_slots += 1
+
+        for index in self.variables:
+            op = self.operations[index]
+            slot = slots.get(op.name, None)
+            if slot is not None:
+                if isinstance(op, SetGlobal):
+                    self.operations[index] = SetLocal(slot, op.name)
+                else:
+                    self.operations[index] = GetLocal(slot, op.name)
+            elif EXTRA_ARG_NAME.fullmatch(op.name):
+                # Could be an extra argument, which can only be looked up by name
+                self.operations[index] = GetValue(op.name)
+
+        return num_slots
+
+    def get_value(self, name: str) -> None:
+        """Add the operation to get the value of a variable"""
+        if self.resolve:
+            self.variables.append(self.mark())
+            self.operations.append(GetGlobal(name))
+        else:
+            self.operations.append(GetValue(name))
+
+    @staticmethod
+    def variable_name(target: Node) -> Optional[str]:
+        """The name of the variable that is the target of an assignment, if it is
+        a simple variable (not a property or index)"""
+        children = target.children()
+        if len(children) == 1 and type(children[0]).__name__ == "Symbol":
+            symbol = children[0]
+            if type(symbol.ast) is not tuple:
+                return symbol.ast.name
+        return None
+
     #
     # Catch-all
     #
@@ -151,7 +327,7 @@ class ProboticsCodeGenerator(NodeWalker):
             self.operations.append(Immediate(Primitive.symbol(symbol_name)))
         else:
             # Otherwise, we want the value of the symbol in the current scope
-            self.operations.append(GetValue(symbol_name))
+            self.get_value(symbol_name)
 
     def walk_Property(self, properties: tuple[str, ...]):
         # This will be a left-associative list of properties, object properties.
@@ -162,7 +338,7 @@ class ProboticsCodeGenerator(NodeWalker):
             self.operations.append(GetProperty())
         else:
             symbol_name = left.name
-            self.operations.append(GetValue(symbol_name))
+            self.get_value(symbol_name)
 
         symbol_name = right.name
         self.operations.append(Property(symbol_name))
@@ -239,6 +415,19 @@ class ProboticsCodeGenerator(NodeWalker):
     #
 
     def walk_Assignment(self, node: Node):
+        name = self.variable_name(node.target) if self.resolve else None
+        if name is not None:
+            # The variable is resolved along with the others in the block
+            with self.in_context("Assignment"):
+                self.walk(node.value)
+            self.variables.append(self.mark())
+            self.operations.append(SetGlobal(name))
+
+            if isinstance(self.operations[-2], Immediate):
+                if self.operations[-2].value.is_block:
+                    self.operations[-2].value.value.name = name
+            return
+
         with self.in_context("Assignment"):
             self.walk(node.target)
             self.walk(node.value)
@@ -268,28 +457,52 @@ class ProboticsCodeGenerator(NodeWalker):
 
     def walk_Block(self, node: Node):
         before = self.mark()
-        with self.in_context("Block"):
+        with self.in_context("Block"), self.in_function():
             self.walk(node.statements)
+            num_slots = self.resolve_variables([]) if self.resolve else None
+            if self.tail_calls:
+                self.mark_tail_calls(before)
 
+        source_map = self.take_source_map(before)
         operations = self.operations[before:]
         self.operations[before:] = []
+        self.set_position(self.position)
 
-        block = Primitive.block(operations, name=self.context[-1])
+        block = Primitive.block(
+            operations,
+            name=self.context[-1],
+            num_slots=num_slots,
+            source_map=source_map,
+        )
         self.operations.append(Immediate(block))
 
     def walk_BlockWithArgs(self, node: Node):
         before = self.mark()
-        with self.in_context("Block"):
+        arg_names = [name.name for name in node.arg_names]
+        with self.in_context("Block"), self.in_function():
             self.walk(node.statements)
+            num_slots = self.resolve_variables(arg_names) if self.resolve else None
+            if self.tail_calls:
+                self.mark_tail_calls(before)
 
-        arg_names = [name.name for name in node.arg_names]
+        source_map = self.take_source_map(before)
         operations = self.operations[before:]
         self.operations[before:] = []
-
-        block = Primitive.block(operations, name=self.context[-1], arg_names=arg_names)
+        self.set_position(self.position)
+
+        block = Primitive.block(
+            operations,
+            name=self.context[-1],
+            arg_names=arg_names,
+            num_slots=num_slots,
+            source_map=source_map,
+        )
         self.operations.append(Immediate(block))
 
     def walk_IfStatement(self, node: Node):
+        # The bodies of the if and else are inlined: their statements run in
+        # the same frame as the if statement itself.
+
         # This JumpIf is used to skip to the else block, if the condition is false.
         jump_to_else = JumpIf(jump=0, sense=False)
 
@@ -301,17 +514,16 @@ class ProboticsCodeGenerator(NodeWalker):
             self.operations.append(jump_to_else)
             after_if = self.mark()
 
-            self.walk(node.block)
-            self.operations.append(
-                Call(0, local=True)
-            )  # TODO: maybe inline block instead of call
+            self.walk(node.block.statements)
             self.operations.append(jump_past_else)
             after_block = self.mark()
 
             with self.in_context("ElseStatement"):
-                self.walk(node.else_chain)
                 if node.else_block is not None:
-                    self.operations.append(Call(0, local=True))
+                    self.walk(node.else_block.statements)
+                else:
+                    # Either nothing, or another if statement
+                    self.walk(node.else_chain)
                 after_else = self.mark()
 
         # Set the jump targets for the if statement
@@ -322,10 +534,15 @@ class ProboticsCodeGenerator(NodeWalker):
             # If there is no else block, skip the jump
             self.operations.pop()
             jump_to_else.jump -= 1
+            if self.positions:
+                self.take_source_map(self.mark())
 
     def walk_WhileLoop(self, node: Node):
-        # This Jump is used to jump back to the top of the loop
-        jump_to_top = Jump(jump=0)
+        # The body of the loop is inlined, and `break` and `next` in it are jumps
+        # to the end of the loop / the end of the iteration. When the body calls
+        # a function that breaks out of the loop (e.g. a helper that does
+        # `break`), the Catch after the call handles it.
+        self.operations.append(EnterLoop())
 
         # This JumpIf is used to skip the loop if the condition is false
         jump_past_loop = JumpIf(jump=0, sense=False)
@@ -336,17 +553,29 @@ class ProboticsCodeGenerator(NodeWalker):
             self.operations.append(jump_past_loop)
             after_cond = self.mark()
 
-            self.walk(node.block)
-            self.operations.append(
-                Call(0, local=True)
-            )  # TODO: maybe inline block instead of call
-            self.operations.append(Catch({"break": 2, "next": 1, "wait": 1}))
-            self.operations.append(jump_to_top)
-            after_block = self.mark()
+            loop = LoopLabels()
+            self.loops.append(loop)
+            self.walk(node.block.statements)
+            self.loops.pop()
+
+            end_iteration = self.mark()
+            self.operations.append(EndIteration())
+            self.operations.append(Jump(jump=before_cond - (end_iteration + 2)))
+
+            exit_loop = self.mark()
+            self.operations.append(ExitLoop())
 
         # Set the jump targets
-        jump_to_top.jump = before_cond - after_block  # This will be negative
-        jump_past_loop.jump = after_block - after_cond
+        jump_past_loop.jump = exit_loop - after_cond
+        for index in loop.breaks:
+            self.operations[index] = Jump(jump=exit_loop - (index + 1))
+        for index in loop.nexts:
+            self.operations[index] = Jump(jump=end_iteration - (index + 1))
+        for index in loop.calls:
+            catch = self.operations[index]
+            self.operations[index] = Catch(
+                {**catch.jumps, "break": exit_loop - index, "next": end_iteration - index}
+            )
 
     def walk_Return(self, node: Node):
         before = self.mark()
@@ -356,10 +585,20 @@ class ProboticsCodeGenerator(NodeWalker):
         self.operations.append(Return(with_value=after > before))
 
     def walk_Break(self, node: Node):
-        self.operations.append(Break())
+        if self.loops:
+            # Jump to the end of the loop, once it is known
+            self.loops[-1].breaks.append(self.mark())
+            self.operations.append(Jump(jump=0))
+        else:
+            # Not directly in a loop: unwind to the caller
+            self.operations.append(Break())
 
     def walk_Next(self, node: Node):
-        self.operations.append(Next())
+        if self.loops:
+            self.loops[-1].nexts.append(self.mark())
+            self.operations.append(Jump(jump=0))
+        else:
+            self.operations.append(Next())
 
     #
     # Function calls
@@ -372,8 +611,48 @@ class ProboticsCodeGenerator(NodeWalker):
 
         num_args = len(node.args)
 
-        self.operations.append(Call(num_args, local=False))
-        self.operations.append(Catch({"return": 1, "wait": 1}))
+        self.operations.extend(self.call_operations(num_args))
+        if self.loops:
+            # The Catch following the call also handles break and next
+            self.loops[-1].calls.append(self.mark() - 1)
+
+    @staticmethod
+    def call_operations(num_args: int) -> list[Operation]:
+        """The operations that make a call, once the callable and its arguments
+        have been pushed onto the stack"""
+        return [Call(num_args, local=False), Catch(dict(CALL_CATCHES))]
+
+    def mark_tail_calls(self, start: int) -> None:
+        """Replace the calls in tail position in the block just generated (its
+        operations from start on) with TailCall: the calls whose value is the
+        value of the block, by `return` or by being the last thing it does. A
+        call in a loop isn't one, since the Catch after it also catches `break`
+        and `next`."""
+        operations = self.operations
+        end = len(operations)
+        for i in range(start, end - 1):
+            op = operations[i]
+            catch = operations[i + 1]
+            if (
+                type(op) is Call
+                and type(catch) is Catch
+                and catch.jumps == CALL_CATCHES
+                and self.returns_from(i + 2, end)
+            ):
+                operations[i] = TailCall(op.num_args)
+
+    def returns_from(self, index: int, end: int) -> bool:
+        """Whether execution from the index returns the value on top of the
+        stack, without doing anything else -- after any unconditional jumps"""
+        operations = self.operations
+        seen = set()
+        while index < end and type(operations[index]) is Jump and index not in seen:
+            seen.add(index)
+            index += 1 + operations[index].jump
+        if index == end:
+            return True
+        op = operations[index]
+        return type(op) is Return and op.with_value
 
     def walk_BareCommand(self, node: Node):  # NOT IMPLEMENTED
         len_before = len(self.operations)
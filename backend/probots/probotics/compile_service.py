@@ -0,0 +1,105 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional, Sequence
+
+from .compiler import ProboticsCompiler
+from .ops.all import Operation
+from .serialize import dumps
+from .tokenizer import ProboticsSyntaxError
+
+
+class CompileError(Exception):
+    """An error compiling a program in a worker process, which couldn't be sent
+    back as the original exception"""
+
+
+class CompilationService:
+    """Compiles programs on a pool of worker threads, returning futures, so that
+    the thread that needs a program -- e.g. the game thread -- doesn't wait while
+    it is parsed.
+
+    Threads share the compiler's cache and store, but parsing holds the GIL, so
+    with `processes`, whatever isn't cached is parsed and compiled in a pool of
+    worker processes (each with its own compiler with the same options), and
+    sent back serialized. That way compiling scales across cores, and doesn't
+    compete with the game thread.
+
+    Compiling the same program more than once at the same time (e.g. spawning
+    many bots with the same profile) is only done once.
+    """
+
+    def __init__(
+        self,
+        compiler: ProboticsCompiler,
+        workers: Optional[int] = None,
+        processes: bool = False,
+    ) -> None:
+        self.compiler = compiler
+        self.workers = workers
+
+        self.threads = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="compile"
+        )
+        self.processes: Optional[ProcessPoolExecutor] = None
+        if processes:
+            # Workers are spawned rather than forked: the game process has threads
+            self.processes = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(compiler.options(),),
+            )
+
+        # Compiles that haven't finished, by source and `persist`. (The lock is
+        # reentrant because a future's done callback runs immediately when it is
+        # added, if the future is already done)
+        self.pending: dict[tuple[str, bool], Future[Sequence[Operation]]] = {}
+        self.lock = threading.RLock()
+
+    def submit(self, code: str, persist: bool = False) -> Future[Sequence[Operation]]:
+        """Start compiling the code (see ProboticsCompiler.compile). The future's
+        result is the operations, or it raises the compile error"""
+        key = (code, persist)
+        with self.lock:
+            future = self.pending.get(key, None)
+            if future is None:
+                future = self.threads.submit(self.compile, code, persist)
+                self.pending[key] = future
+                future.add_done_callback(lambda _: self.done(key))
+        return future
+
+    def compile(self, code: str, persist: bool = False) -> Sequence[Operation]:
+        """Compile the code on the calling thread (using the worker processes, if
+        there are any)"""
+        return self.compiler.compile(code, persist=persist, executor=self.processes)
+
+    def done(self, key: tuple[str, bool]) -> None:
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def shutdown(self) -> None:
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+
+# The compiler of a worker process
+WORKER_COMPILER: Optional[ProboticsCompiler] = None
+
+
+def init_worker(options: dict[str, Any]) -> None:
+    global WORKER_COMPILER
+    WORKER_COMPILER = ProboticsCompiler(**options)
+
+
+def compile_in_worker(input: str) -> bytes:
+    """Compile the input in a worker process, returning the serialized operations"""
+    assert WORKER_COMPILER is not None
+    try:
+        return dumps(WORKER_COMPILER.compile_uncached(input))
+    except ProboticsSyntaxError:
+        raise
+    except Exception as ex:
+        # e.g. a tatsu parse error, which can't be pickled
+        raise CompileError(str(ex)) from None
@@ -1,25 +1,331 @@
+import functools
+import hashlib
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Any, Optional, Sequence
 
+import structlog
 import tatsu
+from tatsu.semantics import ModelBuilderSemantics
 
+from .build_parser import GRAMMAR_PATH, grammar_digest
+from .cache import CompiledProgramCache
 from .codegen import ProboticsCodeGenerator
-from .ops.all import Operation
+from .ops.all import (
+    GetGlobal,
+    GetValue,
+    Immediate,
+    MappedOperations,
+    Operation,
+    Primitive,
+    SourceMap,
+    source_map_of,
+)
+from .optimizer import PeepholeOptimizer
+from .pratt_parser import PrattParser
+from .serialize import BYTECODE_FORMAT, BytecodeStore, dumps, loads
+from .tokenizer import line_starts, locate, top_level_chunks
+
+LOGGER = structlog.get_logger(__name__)
+
+
+class GeneratedParser:
+    """Adapts the generated parser module (see build_parser.py) to the same
+    interface as a grammar compiled by tatsu at runtime"""
+
+    def __init__(self, parser_class: type) -> None:
+        self.parser_class = parser_class
+
+    def parse(self, input: str, trace: bool = False, parseinfo: bool = True) -> Any:
+        # The generated parser keeps its state while parsing, so a new one is
+        # used for each parse -- compilers are shared between threads
+        parser = self.parser_class(parseinfo=parseinfo)
+        return parser.parse(input, semantics=ModelBuilderSemantics(), trace=trace)
+
+
+@functools.cache
+def load_parser(grammar: str) -> Any:
+    """Load the parser for the grammar. The pre-generated parser module is used
+    when it was generated from this version of the grammar, otherwise fall
+    back to compiling the grammar at runtime (slow)"""
+    try:
+        from . import generated_parser
+    except Exception as ex:
+        LOGGER.warning("Generated parser not loadable", exception=str(ex))
+    else:
+        if generated_parser.GRAMMAR_DIGEST == grammar_digest(grammar):
+            return GeneratedParser(generated_parser.ProboticsParser)
+
+        LOGGER.warning(
+            "Generated parser is out of date, compiling grammar at runtime. "
+            "Run `python -m probots.probotics.build_parser` to regenerate it"
+        )
+
+    return tatsu.compile(grammar, asmodel=True)
+
+
+@functools.cache
+def code_digest() -> str:
+    """Digest of the code that determines what operations a program compiles to:
+    the grammar, code generation, optimization, and the operations themselves"""
+    package = Path(__file__).parent
+    paths = [
+        GRAMMAR_PATH,
+        package / "codegen.py",
+        package / "optimizer.py",
+        package / "serialize.py",
+        *sorted(package.joinpath("ops").glob("*.py")),
+    ]
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+# The parsers a compiler can use. Both produce the same model for codegen:
+# - tatsu: generated from the grammar, the definition of the language
+# - pratt: hand-written, much faster (see pratt_parser.py)
+PARSER_BACKENDS = ("tatsu", "pratt")
 
 
 class ProboticsCompiler:
-    def __init__(self) -> None:
-        self.grammar = Path(__file__).with_name("probotics-grammar.ebnf").read_text()
-        self.parser = tatsu.compile(self.grammar, asmodel=True)
+    def __init__(
+        self,
+        cache: Optional[CompiledProgramCache] = None,
+        backend: str = "tatsu",
+        incremental: bool = False,
+        optimizer: Optional[PeepholeOptimizer] = None,
+        resolve: bool = False,
+        store: Optional[BytecodeStore] = None,
+        lean: bool = False,
+        tail_calls: bool = False,
+    ) -> None:
+        if backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend: {backend}")
+
+        self.backend = backend
+        self.grammar = GRAMMAR_PATH.read_text()
+        if backend == "pratt":
+            self.parser = PrattParser()
+        else:
+            self.parser = load_parser(self.grammar)
+
+        # When a cache is given, compiled programs are looked up by the hash of
+        # their source, and the (frozen) cached operations are returned
+        self.cache = cache
+
+        # In incremental mode (which needs a cache), a program that isn't cached
+        # is compiled in chunks of top-level statements, and only the chunks
+        # that aren't cached are parsed -- so recompiling a program after an edit
+        # costs about the size of the edit, not the size of the program
+        self.incremental = incremental
+
+        # When an optimizer is given, it rewrites the generated operations. (A
+        # cache should only be shared by compilers with the same optimizer and
+        # resolve setting)
+        self.optimizer = optimizer
+
+        # When resolving, variables are resolved at compile time to the slots of
+        # arguments and locals, or to globals, instead of being looked up by name
+        # in each scope at runtime (see ProboticsCodeGenerator.resolve_variables)
+        self.resolve = resolve
+
+        # Lean mode is for production: the parse model doesn't carry tatsu's
+        # parseinfo, and instead the operations of the top level and of each
+        # block get a compact source map (see SourceMap), which is all that is
+        # needed to report where runtime errors happen
+        self.lean = lean
+
+        # With tail calls, a call whose value a block returns reuses the block's
+        # frame, rather than entering a new one (see TailCall)
+        self.tail_calls = tail_calls
+
+        # When a store is given (which needs a cache), programs compiled with
+        # `persist` are saved to it in serialized form, and loaded from it rather
+        # than compiled the next time -- e.g. after a restart. Stored programs are
+        # only used by a compiler with the same version
+        self.store = store
+        self.version = self.compiler_version()
+
+        # Shared operations for calls made by compile_call, by (name, num_args)
+        self.call_templates: dict[tuple[str, int], tuple[Operation, ...]] = {}
+
+    def compiler_version(self) -> str:
+        """Identifies the operations this compiler generates: the serialized
+        format, the code that generates them, and the options that affect them"""
+        constants = None
+        if self.optimizer is not None:
+            constants = (
+                sorted(
+                    (name, repr(value))
+                    for name, value in self.optimizer.constants.items()
+                ),
+                sorted(self.optimizer.state_builtins),
+                sorted(
+                    (name, sorted(properties))
+                    for name, properties in self.optimizer.state_properties.items()
+                ),
+                sorted(self.optimizer.wait_builtins),
+                self.optimizer.superinstructions,
+            )
+        options = repr(
+            (
+                self.resolve,
+                self.lean,
+                self.tail_calls,
+                self.optimizer is not None,
+                constants,
+            )
+        )
+        digest = hashlib.sha256(f"{code_digest()}{options}".encode("utf-8"))
+        return f"{BYTECODE_FORMAT}.{digest.hexdigest()[:16]}"
+
+    def options(self) -> dict[str, Any]:
+        """The arguments for creating a compiler that generates the same
+        operations as this one (without its cache or store)"""
+        return {
+            "backend": self.backend,
+            "optimizer": self.optimizer,
+            "resolve": self.resolve,
+            "lean": self.lean,
+            "tail_calls": self.tail_calls,
+        }
+
+    def compile(
+        self,
+        input: str,
+        trace: bool = False,
+        persist: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Sequence[Operation]:
+        """Compile the input. With `persist`, the program is saved to / loaded
+        from the store, if there is one -- for programs that are saved, rather
+        than e.g. commands entered in the terminal.
 
-    def compile(self, input: str, trace: bool = False) -> list[Operation]:
+        With an `executor` (the process pool of a CompilationService), whatever
+        isn't cached is parsed and compiled by one of its worker processes."""
+        if self.cache is None or trace:
+            return self.compile_new(input, trace=trace, executor=executor)
+
+        key = self.cache.key(input)
+        operations = self.cache.get(key)
+        if operations is None:
+            persist = persist and self.store is not None
+            compiled = self.load(key) if persist else None
+            if compiled is None:
+                if self.incremental:
+                    compiled = self.compile_chunks(input, executor=executor)
+                else:
+                    compiled = self.compile_new(input, executor=executor)
+                if persist:
+                    self.save(key, compiled)
+            operations = self.cache.put(key, compiled)
+        return operations
+
+    def load(self, key: str) -> Optional[list[Operation]]:
+        """Load the operations of a program from the store, if they were saved by
+        a compiler of the same version"""
+        assert self.store is not None
+        try:
+            bytecode = self.store.load(key, self.version)
+            if bytecode is None:
+                return None
+            return loads(bytecode)
+        except Exception as ex:
+            # Compile it instead
+            LOGGER.warning("Stored program not loaded", key=key, exception=str(ex))
+            return None
+
+    def save(self, key: str, operations: Sequence[Operation]) -> None:
+        assert self.store is not None
+        try:
+            self.store.save(key, self.version, dumps(operations))
+        except Exception as ex:
+            # It will just be compiled again next time
+            LOGGER.warning("Compiled program not stored", key=key, exception=str(ex))
+
+    def compile_chunks(
+        self, input: str, executor: Optional[Executor] = None
+    ) -> list[Operation]:
+        """Compile the input one chunk of top-level statements at a time (see
+        top_level_chunks), using the cached operations for any chunks that have
+        been compiled before"""
+        assert self.cache is not None
+
+        chunks = top_level_chunks(input)
+        if len(chunks) <= 1:
+            return self.compile_new(input, executor=executor)
+
+        operations: list[Operation] = []
+        source_map = SourceMap() if self.lean else None
+        starts = line_starts(input) if self.lean else None
+        end = 0
+        try:
+            for chunk in chunks:
+                key = self.cache.key(chunk)
+                chunk_operations = self.cache.get(key)
+                if chunk_operations is None:
+                    compiled = self.compile_new(chunk, executor=executor)
+                    chunk_operations = self.cache.put(key, compiled)
+
+                if source_map is not None:
+                    # The chunk's positions are relative to the chunk
+                    start = input.index(chunk, end)
+                    end = start + len(chunk)
+                    line, col = locate(starts, start)
+                    chunk_operations = shift_source_maps(chunk_operations, line, col)
+                    source_map.extend(source_map_of(chunk_operations), len(operations))
+
+                operations.extend(chunk_operations)
+        except Exception:
+            # Compile the whole input to report the error relative to it, rather
+            # than to the chunk
+            return self.compile_new(input, executor=executor)
+
+        if source_map is not None:
+            return MappedOperations(operations, source_map)
+        return operations
+
+    def compile_new(
+        self, input: str, trace: bool = False, executor: Optional[Executor] = None
+    ) -> list[Operation]:
+        """Compile input that isn't cached -- in a worker process of the executor,
+        if given (see compile_in_worker)"""
+        if executor is None or trace:
+            return self.compile_uncached(input, trace=trace)
+
+        from .compile_service import compile_in_worker
+
+        return loads(executor.submit(compile_in_worker, input).result())
+
+    def compile_call(self, name: str, args: Sequence[Primitive]) -> list[Operation]:
+        """Build the operations for calling a function by name with arguments that
+        are already evaluated. This is equivalent to compiling `name(arg1, ...)`,
+        but without going through the parser, so it is cheap enough to do every
+        time an event is dispatched."""
+        template = self.call_templates.get((name, len(args)), None)
+        if template is None:
+            template = (
+                GetGlobal(name) if self.resolve else GetValue(name),
+                *ProboticsCodeGenerator.call_operations(len(args)),
+            )
+            self.call_templates[(name, len(args))] = template
+
+        get_value, *call = template
+        return [get_value, *(Immediate(arg) for arg in args), *call]
+
+    def compile_uncached(self, input: str, trace: bool = False) -> list[Operation]:
         model = self.parse(input, trace=trace)
-        operations = self.codegen(model)
+        operations = self.codegen(model, source=input if self.lean else None)
+        if self.optimizer is not None:
+            operations = self.optimizer.optimize(operations)
         return operations
 
     def parse(self, input: str, trace: bool = False):
-        """Parse an input string into a tatsu model -- which is essentially a list of
-        instances of objects. Each object is going to be something in the tatsu.synth
-        module, which are a bunch of dynamically-defined dataclasses.
+        """Parse an input string into a model. With the tatsu backend, this is a
+        tatsu model -- which is essentially a list of instances of objects. Each
+        object is going to be something in the tatsu.synth module, which are a
+        bunch of dynamically-defined dataclasses.
 
         The model classes are named according to the annotated types in the grammar.
         For example:
@@ -27,16 +333,65 @@ class ProboticsCompiler:
         will result in an model class Expression being defined, and instances of the
         Expression class will be used to represent the parsed items.
 
+        The pratt backend builds instances of its own classes with the same names
+        and attributes (see pratt_parser.py).
+
         This object model is intended to be used by codegen()
         """
+        if self.backend == "tatsu" and self.lean:
+            return self.parser.parse(input, trace=trace, parseinfo=False)
         model = self.parser.parse(input, trace=trace)
         return model
 
-    def codegen(self, model) -> list[Operation]:
+    def codegen(self, model, source: Optional[str] = None) -> list[Operation]:
         """Takes an object model returned by parse() and turns it into executable
         operations. The ProboticsCodeGenerator will walk the parse tree and generate
         corresponding operations, which are the final instructions that can be
-        evaluated by the interpreter"""
-        codegen = ProboticsCodeGenerator()
+        evaluated by the interpreter.
+
+        Given the source the model was parsed from, the operations have a source
+        map (see MappedOperations), as do the blocks"""
+        codegen = ProboticsCodeGenerator(
+            resolve=self.resolve, source=source, tail_calls=self.tail_calls
+        )
         codegen.walk(model)
+        if source is not None:
+            return MappedOperations(codegen.operations, codegen.source_map())
         return codegen.operations
+
+
+def shift_source_maps(
+    operations: Sequence[Operation], line: int, col: int
+) -> Sequence[Operation]:
+    """Operations with source maps (of the top level and of any blocks) for where
+    their source starts at the line and column of a larger source"""
+    if (line, col) == (0, 0):
+        return operations
+
+    source_map = source_map_of(operations)
+    if source_map is not None:
+        source_map = source_map.shifted(line, col)
+    return MappedOperations(shift_blocks(operations, line, col), source_map)
+
+
+def shift_blocks(operations: Sequence[Operation], line: int, col: int) -> list[Operation]:
+    """Copies of the blocks in the operations, with shifted source maps. The other
+    operations are shared"""
+    shifted: list[Operation] = []
+    for op in operations:
+        if isinstance(op, Immediate) and op.value.is_block:
+            block = op.value.value
+            source_map = block.source_map
+            if source_map is not None:
+                source_map = source_map.shifted(line, col)
+            op = Immediate(
+                Primitive.block(
+                    shift_blocks(block.operations, line, col),
+                    name=block.name,
+                    arg_names=block.arg_names,
+                    num_slots=block.num_slots,
+                    source_map=source_map,
+                )
+            )
+        shifted.append(op)
+    return shifted
@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+
+# WARNING: CAVEAT UTILITOR
+#
+#  This file was automatically generated by TatSu.
+#
+#     https://pypi.python.org/pypi/tatsu/
+#
+#  Any changes you make to it will be overwritten the next time
+#  the file is generated.
+
+# ruff: noqa: C405, COM812, I001, F401, PLR1702, PLC2801, SIM117
+
+import sys
+from pathlib import Path
+
+from tatsu.buffering import Buffer
+from tatsu.parsing import Parser
+from tatsu.parsing import tatsumasu
+from tatsu.parsing import leftrec, nomemo, isname
+from tatsu.infos import ParserConfig
+from tatsu.util import re, generic_main
+
+
+KEYWORDS: set[str] = {
+    'and',
+    'break',
+    'else',
+    'False',
+    'false',
+    'if',
+    'is',
+    'next',
+    'None',
+    'none',
+    'not',
+    'null',
+    'or',
+    'return',
+    'True',
+    'true',
+    'while',
+}
+
+
+class ProboticsBuffer(Buffer):
+    def __init__(self, text, /, config: ParserConfig | None = None, **settings):
+        config = ParserConfig.new(
+            config,
+            owner=self,
+            whitespace=None,
+            nameguard=None,
+            ignorecase=False,
+            namechars='',
+            parseinfo=True,
+            comments='\\/\\*(?s:.*?)\\*\\/',
+            eol_comments='(#|\\/\\/)[^\\n]*$',
+            keywords=KEYWORDS,
+            start='start',
+        )
+        config = config.replace(**settings)
+
+        super().__init__(text, config=config)
+
+
+class ProboticsParser(Parser):
+    def __init__(self, /, config: ParserConfig | None = None, **settings):
+        config = ParserConfig.new(
+            config,
+            owner=self,
+            whitespace=None,
+            nameguard=None,
+            ignorecase=False,
+            namechars='',
+            parseinfo=True,
+            comments='\\/\\*(?s:.*?)\\*\\/',
+            eol_comments='(#|\\/\\/)[^\\n]*$',
+            keywords=KEYWORDS,
+            start='start',
+        )
+        config = config.replace(**settings)
+
+        super().__init__(config=config)
+
+    @tatsumasu()
+    @nomemo
+    def _start_(self):
+
+        def block0():
+            with self._choice():
+                with self._option():
+                    self._statement_()
+                with self._option():
+                    self._comment_()
+                self._error(
+                    'expecting one of: '
+                    '<comment> <statement>'
+                )
+        self._closure(block0)
+        self._check_eof()
+
+    @tatsumasu('Statement')
+    @nomemo
+    def _statement_(self):
+        with self._choice():
+            with self._option():
+                self._if_statement_()
+            with self._option():
+                self._while_loop_()
+            with self._option():
+                self._break_()
+            with self._option():
+                self._next_()
+            with self._option():
+                self._return_()
+            with self._option():
+                self._expression_()
+            self._error(
+                'expecting one of: '
+                "'break' 'if' 'next' 'return' 'while'"
+                '<addition> <assignment> <expression>'
+                '<if_statement> <logical> <negative>'
+                '<subtraction> <term> <while_loop>'
+            )
+
+    @tatsumasu('Expression')
+    @leftrec
+    def _expression_(self):
+        with self._choice():
+            with self._option():
+                self._assignment_()
+            with self._option():
+                self._logical_()
+            with self._option():
+                self._negative_()
+            with self._option():
+                self._addition_()
+            with self._option():
+                self._subtraction_()
+            with self._option():
+                self._term_()
+            self._error(
+                'expecting one of: '
+                "'not' <addition> <assignable>"
+                '<assignment> <condition> <division>'
+                '<expression> <factor> <logical>'
+                '<multiplication> <negative>'
+                '<subtraction> <term>'
+            )
+
+    @tatsumasu('Assignment')
+    def _assignment_(self):
+        self._assignable_()
+        self.name_last_node('target')
+        self._token(':=')
+        self._cut()
+        with self._group():
+            with self._choice():
+                with self._option():
+                    self._block_with_args_()
+                with self._option():
+                    self._block_()
+                with self._option():
+                    self._expression_()
+                self._error(
+                    'expecting one of: '
+                    '<block> <block_with_args> <expression>'
+                )
+        self.name_last_node('value')
+        self._define(['target', 'value'], [])
+
+    @tatsumasu('Assignable')
+    def _assignable_(self):
+        with self._choice():
+            with self._option():
+                self._index_()
+            with self._option():
+                self._symbol_()
+            self._error(
+                'expecting one of: '
+                '<index> <name> <symbol>'
+            )
+
+    @tatsumasu('Logical')
+    @nomemo
+    def _logical_(self):
+        self._expression_()
+        self.name_last_node('left')
+        self._logical_op_()
+        self.name_last_node('op')
+        self._cut()
+        self._expression_()
+        self.name_last_node('right')
+        self._define(['left', 'op', 'right'], [])
+
+    @tatsumasu('LogicalNot')
+    def _negative_(self):
+        self._token('not')
+        self._cut()
+        self._expression_()
+        self.name_last_node('right')
+        self._define(['right'], [])
+
+    @tatsumasu('Addition')
+    @nomemo
+    def _addition_(self):
+        self._expression_()
+        self.name_last_node('left')
+        self._token('+')
+        self.name_last_node('op')
+        self._cut()
+        self._term_()
+        self.name_last_node('right')
+        self._define(['left', 'op', 'right'], [])
+
+    @tatsumasu('Subtraction')
+    @nomemo
+    def _subtraction_(self):
+        self._expression_()
+        self.name_last_node('left')
+        self._token('-')
+        self.name_last_node('op')
+        self._cut()
+        self._term_()
+        self.name_last_node('right')
+        self._define(['left', 'op', 'right'], [])
+
+    @tatsumasu('Term')
+    @leftrec
+    def _term_(self):
+        with self._choice():
+            with self._option():
+                self._multiplication_()
+            with self._option():
+                self._division_()
+            with self._option():
+                self._condition_()
+            with self._option():
+                self._factor_()
+            self._error(
+                'expecting one of: '
+                '<atom> <call> <condition> <division>'
+                '<factor> <index> <multiplication>'
+                '<subexpression> <symbol> <term>'
+            )
+
+    @tatsumasu('Multiplication')
+    @nomemo
+    def _multiplication_(self):
+        self._term_()
+        self.name_last_node('left')
+        self._token('*')
+        self._cut()
+        self._factor_()
+        self.name_last_node('right')
+        self._define(['left', 'right'], [])
+
+    @tatsumasu('Division')
+    @nomemo
+    def _division_(self):
+        self._term_()
+        self.name_last_node('left')
+        self._token('/')
+        self._cut()
+        self._factor_()
+        self.name_last_node('right')
+        self._define(['left', 'right'], [])
+
+    @tatsumasu('Factor')
+    def _factor_(self):
+        with self._choice():
+            with self._option():
+                self._subexpression_()
+            with self._option():
+                self._atom_()
+            with self._option():
+                self._call_()
+            with self._option():
+                self._index_()
+            with self._option():
+                self._symbol_()
+            self._error(
+                'expecting one of: '
+                "'(' <atom> <bool> <call> <index> <name>"
+                '<null> <number> <string> <subexpression>'
+                '<symbol>'
+            )
+
+    @tatsumasu()
+    def _subexpression_(self):
+        self._token('(')
+        self._cut()
+        self._expression_()
+        self.name_last_node('@')
+        self._token(')')
+
+    @tatsumasu('Atom')
+    def _atom_(self):
+        with self._choice():
+            with self._option():
+                self._bool_()
+            with self._option():
+                self._null_()
+            with self._option():
+                self._number_()
+            with self._option():
+                self._string_()
+            self._error(
+                'expecting one of: '
+                "'False' 'None' 'True' 'false' 'none'"
+                '\'null\' \'true\' ("[^\\"]*"|\'[^\\\']*\')'
+                '(0|[1-9][0-9]*)(\\.[0-9]+)? <bool>'
+                '<number> <string>'
+            )
+
+    @tatsumasu('Number')
+    def _number_(self):
+        self._pattern('(0|[1-9][0-9]*)(\\.[0-9]+)?')
+
+    @tatsumasu('String')
+    def _string_(self):
+        self._pattern('("[^\\"]*"|\'[^\\\']*\')')
+
+    @tatsumasu('Bool')
+    def _bool_(self):
+        with self._choice():
+            with self._option():
+                self._token('true')
+            with self._option():
+                self._token('True')
+            with self._option():
+                self._token('False')
+            with self._option():
+                self._token('false')
+            self._error(
+                'expecting one of: '
+                "'False' 'True' 'false' 'true'"
+            )
+
+    @tatsumasu('Null')
+    def _null_(self):
+        with self._choice():
+            with self._option():
+                self._token('null')
+            with self._option():
+                self._token('none')
+            with self._option():
+                self._token('None')
+            self._error(
+                'expecting one of: '
+                "'None' 'none' 'null'"
+            )
+
+    @tatsumasu('Symbol')
+    def _symbol_(self):
+
+        def sep0():
+            self._token('.')
+
+        def block1():
+            self._name_()
+        self._left_join(block1, sep0)
+
+    @tatsumasu('Name')
+    def _name_(self):
+        self._pattern('[a-zA-Z_][a-zA-Z0-9_]*')
+        self.name_last_node('name')
+
+    @tatsumasu('Call')
+    def _call_(self):
+        self._symbol_()
+        self.name_last_node('command')
+        self._LPAREN_()
+        self._cut()
+
+        def sep0():
+            self._token(',')
+
+        def block1():
+            self._expression_()
+        self._gather(block1, sep0)
+        self.name_last_node('args')
+        self._rparen_()
+        self._define(['args', 'command'], [])
+
+    @tatsumasu()
+    def _LPAREN_(self):
+        self._token('(')
+
+    @tatsumasu()
+    def _rparen_(self):
+        self._token(')')
+
+    @tatsumasu('IfStatement')
+    def _if_statement_(self):
+        self._token('if')
+        self._cut()
+        self._expression_()
+        self.name_last_node('condition')
+        self._block_()
+        self.name_last_node('block')
+        with self._optional():
+            self._token('else')
+            self._cut()
+            with self._group():
+                with self._choice():
+                    with self._option():
+                        self._block_()
+                        self.name_last_node('else_block')
+                    with self._option():
+                        self._if_statement_()
+                    self._error(
+                        'expecting one of: '
+                        '<block> <if_statement>'
+                    )
+            self._define(['else_block'], [])
+        self.name_last_node('else_chain')
+        self._define(['block', 'condition', 'else_block', 'else_chain'], [])
+
+    @tatsumasu('WhileLoop')
+    def _while_loop_(self):
+        self._token('while')
+        self._cut()
+        self._expression_()
+        self.name_last_node('condition')
+        self._block_()
+        self.name_last_node('block')
+        self._define(['block', 'condition'], [])
+
+    @tatsumasu('Block')
+    def _block_(self):
+        self._token('{')
+        self._cut()
+
+        def block0():
+            with self._choice():
+                with self._option():
+                    self._statement_()
+                with self._option():
+                    self._comment_()
+                self._error(
+                    'expecting one of: '
+                    '<comment> <statement>'
+                )
+        self._closure(block0)
+        self.name_last_node('statements')
+        self._token('}')
+        self._define(['statements'], [])
+
+    @tatsumasu('BlockWithArgs')
+    def _block_with_args_(self):
+        self._token('{')
+        self._token('(')
+        self._cut()
+
+        def sep0():
+            self._token(',')
+
+        def block1():
+            self._name_()
+        self._positive_gather(block1, sep0)
+        self.name_last_node('arg_names')
+        self._token(')')
+
+        def block2():
+            with self._choice():
+                with self._option():
+                    self._statement_()
+                with self._option():
+                    self._comment_()
+                self._error(
+                    'expecting one of: '
+                    '<comment> <statement>'
+                )
+        self._closure(block2)
+        self.name_last_node('statements')
+        self._token('}')
+        self._define(['arg_names', 'statements'], [])
+
+    @tatsumasu('Condition')
+    @nomemo
+    def _condition_(self):
+        self._term_()
+        self.name_last_node('left')
+        self._comparison_op_()
+        self.name_last_node('op')
+        self._cut()
+        self._factor_()
+        self.name_last_node('right')
+        self._define(['left', 'op', 'right'], [])
+
+    @tatsumasu()
+    def _comparison_op_(self):
+        with self._choice():
+            with self._option():
+                self._token('is')
+            with self._option():
+                self._pattern('={2,3}')
+            with self._option():
+                self._pattern('!={1,2}')
+            with self._option():
+                self._token('<=')
+            with self._option():
+                self._token('>=')
+            with self._option():
+                self._token('<')
+            with self._option():
+                self._token('>')
+            self._error(
+                'expecting one of: '
+                "!={1,2} '<' '<=' '>' '>=' 'is' ={2,3}"
+            )
+
+    @tatsumasu()
+    def _logical_op_(self):
+        with self._choice():
+            with self._option():
+                self._token('and')
+            with self._option():
+                self._token('or')
+            self._error(
+                'expecting one of: '
+                "'and' 'or'"
+            )
+
+    @tatsumasu('Return')
+    def _return_(self):
+        self._token('return')
+        self._cut()
+        with self._optional():
+            self._expression_()
+        self.name_last_node('value')
+        self._define(['value'], [])
+
+    @tatsumasu('Break')
+    def _break_(self):
+        self._token('break')
+
+    @tatsumasu('Next')
+    def _next_(self):
+        self._token('next')
+
+    @tatsumasu('Index')
+    def _index_(self):
+        self._symbol_()
+        self.name_last_node('target')
+        self._LBRACKET_()
+        self._cut()
+        with self._group():
+            with self._choice():
+                with self._option():
+                    self._symbol_()
+                with self._option():
+                    self._string_()
+                with self._option():
+                    self._number_()
+                self._error(
+                    'expecting one of: '
+                    '<number> <string> <symbol>'
+                )
+        self.name_last_node('index')
+        self._rbracket_()
+        self._define(['index', 'target'], [])
+
+    @tatsumasu()
+    def _LBRACKET_(self):
+        self._token('[')
+
+    @tatsumasu()
+    def _rbracket_(self):
+        self._token(']')
+
+    @tatsumasu('Comment')
+    def _comment_(self):
+        with self._choice():
+            with self._option():
+                self._eol_comment_()
+            with self._option():
+                self._block_comment_()
+            self._error(
+                'expecting one of: '
+                '(#|\\/\\/)[^\\n]* <block_comment>'
+                '<eol_comment> \\/\\*(?s:.*?)\\*\\/'
+            )
+
+    @tatsumasu()
+    def _eol_comment_(self):
+        self._pattern('(#|\\/\\/)[^\\n]*')
+
+    @tatsumasu()
+    def _block_comment_(self):
+        self._pattern('\\/\\*(?s:.*?)\\*\\/')
+
+    @tatsumasu('NEWLINE')
+    def _NEWLINE_(self):
+        self._pattern('[\\r\\n]+')
+
+    @tatsumasu()
+    def ___(self):
+        self._pattern('#.*|\\/\\/.*|\\/\\*(?s:.*?)\\*\\/|\\s+')
+
+
+def main(filename, **kwargs):
+    if not filename or filename == '-':
+        text = sys.stdin.read()
+    else:
+        text = Path(filename).read_text()
+    parser = ProboticsParser()
+    return parser.parse(
+        text,
+        filename=filename,
+        **kwargs,
+    )
+
+
+if __name__ == '__main__':
+    import json
+    from tatsu.util import asjson
+
+    ast = generic_main(main, ProboticsParser, name='Probotics')
+    data = asjson(ast)
+    print(json.dumps(data, indent=2))
+
+
+GRAMMAR_DIGEST = "aa04dc5c5f8fabd836a2a7e64fb76c2b727eadef83e31811120cbe9b3adbdee6"
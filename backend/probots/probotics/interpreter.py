@@ -1,17 +1,28 @@
-from typing import Callable, Optional, TypeAlias
+import functools
+import sys
+from collections import deque
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeAlias
 
 import structlog
 
+from .closures import execute_closures
 from .ops.all import (
+    Block,
     Breakpoint,
     Catch,
-    EnterScope,
-    ExitScope,
+    Control,
     Operation,
     Primitive,
     ScopeVars,
+    SourceMap,
     StackFrame,
+    source_map_of,
 )
+from .profiler import Profiler
+
+if TYPE_CHECKING:
+    from .closures import Code
 
 LOGGER = structlog.get_logger(__name__)
 
@@ -22,22 +33,84 @@ ExceptionCallback: TypeAlias = Callable[
 ]
 BreakCallback: TypeAlias = Callable[["ExecutionContext"], None]
 CompleteCallback: TypeAlias = Callable[["ExecutionContext"], None]
+ParkCallback: TypeAlias = Callable[
+    ["ExecutionContext", Optional[Callable[[], bool]]], None
+]
+
+# The most operations a context executes at a time, before letting other
+# contexts run
+DEFAULT_QUANTUM = 10_000
+
+# What a slice costs a context, in operations, however few it executes: the
+# slice -- one of the game thread's turns -- is what's scarce. Each round, a
+# context is credited this times its weight (see ProboticsInterpreter)
+SLICE_OPERATIONS = 1_000
+
+# The most exited frames a context keeps for reuse (see
+# ExecutionContext.new_frame). Deeper calls than this allocate their frames
+FRAME_POOL_SIZE = 64
+
+# How the operations are executed: each operation's execute() in turn, or
+# compiled to closures (see closures.py)
+EXECUTION_BACKENDS = ("ops", "closures")
 
 
 class ExecutionContext:
     builtins: ScopeVars
     operations: list[Operation]
+    source_map: Optional[SourceMap]
     globals: ScopeVars
     on_result: Optional[ResultCallback]
     on_exception: Optional[ExceptionCallback]
     on_break: Optional[BreakCallback]
     on_complete: Optional[CompleteCallback]
+    on_park: Optional[ParkCallback]
 
     current_frame: Optional[StackFrame]
     stopped: bool
 
+    # The frame being entered, or the breakpoint being unwound to, by the
+    # operation that just executed (see enter() and unwind())
+    entering: Optional[StackFrame]
+    unwinding: Optional[Breakpoint]
+
+    # The most operations to execute at a time (None for no limit)
+    quantum: Optional[int]
+
+    # The context's share of the interpreter, relative to other contexts, how
+    # many operations it can still execute this round, and how many it has been
+    # charged for in all (see ProboticsInterpreter)
+    weight: float
+    credit: float
+    charged: int
+
+    # How the operations are executed (one of EXECUTION_BACKENDS), and the loop
+    # that executes them
+    backend: str
+    run: Callable[[StackFrame], Optional[StackFrame]]
+
+    # The top-level operations compiled by the closures backend
+    code: Optional["Code"]
+
+    # What the context has executed, while it is being profiled (see
+    # start_profiling)
+    profiler: Optional[Profiler]
+
     total_frames: int
     total_operations: int
+    total_slices: int
+
+    # How many times the context used up its quantum and was preempted
+    preemptions: int
+
+    # How many times the context was parked (see park())
+    parks: int
+
+    # Frames that were exited, to be reused for calls, and how many calls did
+    # (hits) and did not (misses) get one of them (see new_frame)
+    frame_pool: list[StackFrame]
+    frame_pool_hits: int
+    frame_pool_misses: int
 
     latest_frames: int
     latest_operations: int
@@ -54,8 +127,20 @@ class ExecutionContext:
         on_exception: Optional[ExceptionCallback] = None,
         on_break: Optional[BreakCallback] = None,
         on_complete: Optional[CompleteCallback] = None,
+        on_park: Optional[ParkCallback] = None,
         name: Optional[str] = None,
+        owner: Any = None,
+        quantum: Optional[int] = DEFAULT_QUANTUM,
+        backend: str = "ops",
+        weight: float = 1.0,
     ) -> None:
+        if quantum is not None and quantum < 1:
+            raise ValueError(f"Invalid quantum: {quantum}")
+        if weight <= 0:
+            raise ValueError(f"Invalid weight: {weight}")
+        if backend not in EXECUTION_BACKENDS:
+            raise ValueError(f"Unknown execution backend: {backend}")
+
         # Builtins are symbols that cannot be changed (assigned to or overridden
         # by another global of the same name
         self.builtins = builtins or ScopeVars()
@@ -64,6 +149,10 @@ class ExecutionContext:
         # outer scope
         self.operations = operations
 
+        # Where the operations came from in the source, when they were compiled
+        # in lean mode -- for describing where errors happen
+        self.source_map = source_map_of(operations)
+
         # Callback to be called when there is a result available in the
         # outer scope, used to pass results back to the caller
         self.on_result = on_result
@@ -78,17 +167,48 @@ class ExecutionContext:
         # Callback to be called the context is all the way done
         self.on_complete = on_complete
 
+        # Callback to be called when the context is parked (see park()), which
+        # is responsible for resuming it
+        self.on_park = on_park
+
         # Globals are symbols can be assigned to in the outer scope only,
         # and will stay around as long as this execution context exists
         self.globals = globals if globals is not None else ScopeVars()
 
         self.name = name
 
+        # Whatever the context runs on behalf of (in the game, the player), for
+        # builtins that are shared by every context to act on (see Builtin)
+        self.owner = owner
+
+        # However long a program runs without yielding (e.g. calls that don't
+        # loop), it is preempted after this many operations, so that other
+        # contexts -- and the rest of the game -- get to run
+        self.quantum = quantum
+
+        self.weight = weight
+        self.credit = 0.0
+        self.charged = 0
+
+        self.backend = backend
+        self.run = self.backend_run()
+        self.code = None
+        self.profiler = None
+
         self.current_frame: Optional[StackFrame] = None
         self.stopped = False
 
+        self.entering = None
+        self.unwinding = None
+
         self.total_frames = 0
         self.total_operations = 0
+        self.total_slices = 0
+        self.preemptions = 0
+        self.parks = 0
+        self.frame_pool = []
+        self.frame_pool_hits = 0
+        self.frame_pool_misses = 0
         self.latest_frames = 0
         self.latest_operations = 0
 
@@ -112,44 +232,26 @@ class ExecutionContext:
     def execute_until_break(self, frame: StackFrame) -> Optional[StackFrame]:
         """Execute the frame, either until completion or to the next breakpoint.
         If stopped at a breakpoint, return the operation to be executed on the
-        next iteration"""
+        next iteration.
 
-        self.latest_frames = 0
-        self.latest_operations = 0
+        Operations transfer control by returning a Control (see Operation.execute)
+        rather than raising exceptions, so calls, returns and unwinding all
+        happen in the backend's loop. It only returns when the program is done,
+        when an operation yields (e.g. at the end of each iteration of a loop),
+        when the quantum is used up, or on an error."""
 
-        try:
-            while frame is not None:
-                self.execute_frame(frame)
-                frame = frame.parent
-            return None  # completed this frame / operation
-
-        except EnterScope as enter_scope:
-            # LOGGER.debug("Entering scope", frame=enter_scope.frame.name)
-            return enter_scope.frame
-
-        except ExitScope as exit_scope:
-            # LOGGER.debug("Exiting scope", frame=exit_scope.frame.name)
-            frame = exit_scope.frame.parent
-            if frame:
-                # Current frame gets the return value of the scope that just exited
-                if exit_scope.return_value is not None:
-                    frame.push(exit_scope.return_value)
-                return frame
-            else:
-                # We just exited the outermost frame,
-                if exit_scope.return_value is not None:
-                    self.on_result(exit_scope.return_value, self)
-
-        except Breakpoint as bp:
-            next_frame = self.handle_breakpoint(frame, bp)
-            if next_frame is None:
-                LOGGER.debug("Breakpoint not handled")
-                raise
+        self.latest_frames = 1
+        self.total_frames += 1
+        self.total_slices += 1
+        self.current_frame = frame
 
-            # LOGGER.debug("Breakpoint handled", frame=next_frame.name)
-            return next_frame
+        try:
+            next_frame = self.run(frame)
 
         except Exception as ex:
+            # The frame the error happened in
+            frame = self.current_frame
+
             LOGGER.exception("Execution error", exception=ex)
             if self.on_exception:
                 try:
@@ -166,22 +268,116 @@ class ExecutionContext:
                 )
                 for i, op in enumerate(frame.operations):
                     print(f"{i}: {op}{' <---' if i == frame.op_index-1 else ''}")
+            return None
+
+        if next_frame is None:
+            # We just exited the outermost frame
+            frame = self.current_frame
+            if frame.results and self.on_result:
+                self.on_result(frame.pop(), self)
+
+        return next_frame
+
+    def backend_run(self) -> Callable[[StackFrame], Optional[StackFrame]]:
+        """The loop that executes the operations, for the backend"""
+        if self.backend == "closures":
+            return functools.partial(execute_closures, self)
+        return self.execute_operations
+
+    def start_profiling(self, profiler: Optional[Profiler] = None) -> Profiler:
+        """Count the operations the context executes, and the time they take, in
+        the profiler (a new one if not given), from its next slice on. Until
+        then, and after stop_profiling(), the context runs without counting"""
+        self.profiler = profiler or Profiler()
+        self.run = functools.partial(self.profiler.execute, self)
+        return self.profiler
+
+    def stop_profiling(self) -> Optional[Profiler]:
+        """Stop profiling the context, returning the profiler, if it was"""
+        profiler = self.profiler
+        self.profiler = None
+        self.run = self.backend_run()
+        return profiler
+
+    def execute_operations(self, frame: StackFrame) -> Optional[StackFrame]:
+        """Execute each operation in turn (the "ops" backend). Returns the frame
+        to continue with the next time, or None when the program is done"""
+        operations = frame.operations
+        quantum = self.quantum or sys.maxsize
+        executed = 0
+        try:
+            while executed < quantum:
+                index = frame.op_index
+                if index < len(operations):
+                    op = operations[index]
+                    frame.op_index = index + 1
+                    control = op.execute(frame)
+                    executed += 1
+                    if control is None:
+                        continue
+                else:
+                    control = Control.EXIT
 
-    def execute_frame(self, frame: StackFrame) -> None:
-        """Execute the next operations in the frame, until something
-        causes a break (breakpoint, enter scope, exit scope)"""
+                if control is Control.YIELD:
+                    return frame
 
-        self.latest_frames += 1
-        self.total_frames += 1
+                frame = self.transfer(frame, control)
+                if frame is None:
+                    return None
+                operations = frame.operations
 
-        while True:
-            op = frame.next_op()
+            # Used up the quantum: continue from here the next time
+            self.preemptions += 1
+            return frame
 
-            # LOGGER.debug("Executing operation", operation=op)
-            op.execute(frame)
+        finally:
+            self.latest_operations = executed
+            self.total_operations += executed
+
+    def transfer(self, frame: StackFrame, control: Control) -> Optional[StackFrame]:
+        """The frame to continue with, after an operation in the frame returned
+        the control (other than YIELD) -- or None when the outermost frame exits,
+        leaving its result, if any, on its stack"""
+        if control is Control.ENTER:
+            frame = self.entering
+            self.entering = None
+            self.latest_frames += 1
+            self.total_frames += 1
+
+        elif control is Control.EXIT:
+            if frame.parent is None:
+                return None
+
+            # Exit the frame: the parent gets its return value
+            return_value = frame.pop() if frame.results else None
+            parent = frame.parent
+            self.release_frame(frame)
+            frame = parent
+            if return_value is not None:
+                frame.push(return_value)
+
+        elif control is Control.UNWIND:
+            bp = self.unwinding
+            self.unwinding = None
+            next_frame = self.handle_breakpoint(frame, bp)
+            if next_frame is None:
+                raise ValueError(f"Nothing to {bp.reason} from")
+            frame = next_frame
 
-            self.latest_operations += 1
-            self.total_operations += 1
+        self.current_frame = frame
+        return frame
+
+    def enter(self, frame: StackFrame) -> Control:
+        """For an operation to enter a new frame (whose parent is the frame the
+        operation is in): `return context.enter(frame)`"""
+        self.entering = frame
+        return Control.ENTER
+
+    def unwind(self, bp: Breakpoint) -> Control:
+        """For an operation to unwind the stack to the frame that catches the
+        breakpoint: `return context.unwind(bp)`"""
+        self.unwinding = bp
+        return Control.UNWIND
 
     def handle_breakpoint(
         self, frame: StackFrame, bp: Breakpoint
@@ -192,10 +388,6 @@ class ExecutionContext:
         """
         # LOGGER.debug("Breakpoint hit", reason=bp.reason)
 
-        if bp.stop:
-            self.stop()
-            return frame
-
         next_frame = frame.parent
         while next_frame is not None:
             # Is the next op in the frame a catcher?
@@ -206,6 +398,12 @@ class ExecutionContext:
                     catcher.do_jump(jump, next_frame)
                     if bp.value is not None:
                         next_frame.push(bp.value)
+
+                    # The frames in between are exited
+                    while frame is not next_frame:
+                        parent = frame.parent
+                        self.release_frame(frame)
+                        frame = parent
                     return next_frame
 
             next_frame = next_frame.parent
@@ -213,12 +411,167 @@ class ExecutionContext:
         # No catcher found
         return None
 
+    def new_frame(
+        self,
+        *,
+        name: str,
+        block: Block,
+        builtins: ScopeVars,
+        global_vars: ScopeVars,
+        scope_vars: Optional[ScopeVars],
+        args: Optional[ScopeVars],
+        parent: StackFrame,
+    ) -> StackFrame:
+        """The frame for a call of the block: one that was exited before (see
+        release_frame), if there is one, otherwise a new one. Without scope_vars
+        or args, the frame gets empty ones of its own. For a block with resolved
+        variables, its slots are all None"""
+        num_slots = block.num_slots
+        pool = self.frame_pool
+        if not pool:
+            self.frame_pool_misses += 1
+            return StackFrame(
+                context=self,
+                name=name,
+                builtins=builtins,
+                operations=block.operations,
+                source_map=block.source_map,
+                block=block,
+                global_vars=global_vars,
+                scope_vars=scope_vars if scope_vars is not None else ScopeVars(),
+                args=args if args is not None else ScopeVars(),
+                slots=[None] * num_slots if num_slots is not None else None,
+                parent=parent,
+            )
+
+        self.frame_pool_hits += 1
+        frame = pool.pop()
+        frame.name = name
+        frame.builtins = builtins
+        frame.operations = block.operations
+        frame.source_map = block.source_map
+        frame.block = block
+        frame.global_vars = global_vars
+        frame.parent = parent
+        if scope_vars is None:
+            scope_vars = frame.scope_vars if frame.scope_vars is not None else {}
+        frame.scope_vars = scope_vars
+        if args is None:
+            args = frame.args if frame.args is not None else {}
+        frame.args = args
+        if num_slots is not None:
+            if frame.slots is None:
+                frame.slots = []
+            frame.slots.extend(repeat(None, num_slots))
+        return frame
+
+    def release_frame(self, frame: StackFrame) -> None:
+        """Keep a frame that was exited, for another call to reuse (see
+        new_frame). Everything in it is dropped, but its dicts and lists are kept
+        -- except the ones that belong to the frame that called it (for a local
+        call), which is still running.
+
+        Nothing is kept while the context is stopped: whoever stopped it (e.g. to
+        describe where it is) may still be looking at its frames"""
+        pool = self.frame_pool
+        if self.stopped or len(pool) >= FRAME_POOL_SIZE:
+            return
+
+        parent = frame.parent
+        if parent is not None and frame.scope_vars is parent.scope_vars:
+            frame.scope_vars = None
+        else:
+            frame.scope_vars.clear()
+        if parent is not None and frame.args is parent.args:
+            frame.args = None
+        else:
+            frame.args.clear()
+        if frame.results is not None:
+            frame.results.clear()
+        if frame.slots is not None:
+            frame.slots.clear()
+        if frame.loop_marks is not None:
+            frame.loop_marks.clear()
+
+        frame.parent = None
+        frame.operations = None
+        frame.op_index = 0
+        frame.source_map = None
+        frame.block = None
+        frame.builtins = None
+        frame.global_vars = None
+        pool.append(frame)
+
+    def reuse_frame(self, frame: StackFrame, *, name: str, block: Block) -> StackFrame:
+        """The frame, reset for a tail call of the block (see TailCall): as if it
+        was released, and taken by new_frame for the call, with the same parent.
+        Like release_frame, the dicts that belong to the parent aren't cleared,
+        and the frame gets empty ones of its own instead"""
+        parent = frame.parent
+        if frame.scope_vars is None or frame.scope_vars is parent.scope_vars:
+            frame.scope_vars = {}
+        else:
+            frame.scope_vars.clear()
+        if frame.args is None or frame.args is parent.args:
+            frame.args = {}
+        else:
+            frame.args.clear()
+        if frame.results is not None:
+            frame.results.clear()
+        if frame.loop_marks is not None:
+            frame.loop_marks.clear()
+
+        frame.name = name
+        frame.operations = block.operations
+        frame.op_index = 0
+        frame.source_map = block.source_map
+        frame.block = block
+        num_slots = block.num_slots
+        if frame.slots is not None:
+            frame.slots.clear()
+        if num_slots is not None:
+            if frame.slots is None:
+                frame.slots = []
+            frame.slots.extend(repeat(None, num_slots))
+        return frame
+
+    def stats(self) -> dict[str, int | float]:
+        calls = self.frame_pool_hits + self.frame_pool_misses
+        return {
+            "quantum": self.quantum or 0,
+            "weight": self.weight,
+            "charged": self.charged,
+            "total_operations": self.total_operations,
+            "total_frames": self.total_frames,
+            "total_slices": self.total_slices,
+            "preemptions": self.preemptions,
+            "parks": self.parks,
+            "frame_pool_hits": self.frame_pool_hits,
+            "frame_pool_misses": self.frame_pool_misses,
+            "frame_pool_hit_rate": self.frame_pool_hits / calls if calls else 0.0,
+            "latest_operations": self.latest_operations,
+            "latest_frames": self.latest_frames,
+        }
+
     def stop(self) -> None:
         self.stopped = True
 
     def resume(self) -> None:
         self.stopped = False
 
+    def park(self, until: Optional[Callable[[], bool]] = None) -> bool:
+        """Stop the context until whatever it is waiting for might have happened
+        -- or with `until`, until that returns true. It is up to the owner of the
+        context (see on_park) to resume it then. Without one, the context isn't
+        parked, and keeps running. Returns whether it was parked"""
+        if self.on_park is None:
+            return False
+
+        self.stop()
+        self.parks += 1
+        self.on_park(self, until)
+        return True
+
     @property
     def is_finished(self) -> bool:
         return self.current_frame is None
@@ -229,59 +582,160 @@ class ExecutionContext:
 
 
 class ProboticsInterpreter:
+    """Runs execution contexts, one slice at a time (see
+    ExecutionContext.execute_next), taking turns.
+
+    Runnable contexts wait their turn in a queue. Contexts that are stopped
+    (e.g. by `wait`) wait in a set until they are resumed, and all of them are
+    indexed by name, so every change in scheduling is O(1). A context that is
+    removed or stopped is left in the queue, and skipped when it comes up.
+
+    Turns are weighted (deficit round robin): each time a context's turn comes
+    around, it is credited SLICE_OPERATIONS times its weight, and each slice it
+    runs is charged the operations it executed (at least SLICE_OPERATIONS). It
+    runs slices until it is out of credit, and a context still in debt -- e.g.
+    from using a whole quantum -- sits out its turn. So with equal weights and
+    slices that yield early, contexts take turns a slice at a time, and over
+    time contexts get shares in proportion to their weights (see shares())."""
+
     def __init__(self) -> None:
-        self.contexts: list[ExecutionContext] = []
-        self.stopped_contexts: list[ExecutionContext] = []
+        # Contexts that are runnable, and the queue of them waiting for their
+        # turn (which can have contexts that have since been removed or stopped)
+        self.contexts: set[ExecutionContext] = set()
+        self.queue: deque[ExecutionContext] = deque()
+        self.queued: set[ExecutionContext] = set()
+
+        # The context at the front of the queue that is in the middle of its
+        # turn, so isn't credited again
+        self.turn: Optional[ExecutionContext] = None
+
+        self.stopped_contexts: set[ExecutionContext] = set()
+        self.by_name: dict[Optional[str], set[ExecutionContext]] = {}
+
+        # Operations charged to all contexts, and the total when each context
+        # was added (for measuring its share)
+        self.total_charged = 0
+        self.added_at: dict[ExecutionContext, int] = {}
 
     def add(self, context: ExecutionContext) -> None:
-        self.contexts.append(context)
+        if context in self.added_at:
+            return
+        self.added_at[context] = self.total_charged
+        self.by_name.setdefault(context.name, set()).add(context)
+        self.schedule(context)
 
     def remove(self, name: str) -> None:
-        index = next((i for i, c in enumerate(self.contexts) if c.name == name), None)
-        if index is not None:
-            self.contexts.pop(index)
+        """Remove the contexts of that name, whether runnable or stopped"""
+        for context in self.by_name.pop(name, ()):
+            self.contexts.discard(context)
+            self.stopped_contexts.discard(context)
+            self.added_at.pop(context, None)
+
+    def schedule(self, context: ExecutionContext) -> None:
+        """Queue the runnable context: at the front if it has credit left for its
+        turn, else at the back"""
+        self.contexts.add(context)
+        if context in self.queued:
+            return
+
+        self.queued.add(context)
+        if self.turn is context and context.credit > 0:
+            self.queue.appendleft(context)
+        else:
+            self.queue.append(context)
+
+    def next_context(self) -> Optional[ExecutionContext]:
+        """Take the next context with credit for a turn from the queue"""
+        while self.queue:
+            context = self.queue.popleft()
+            self.queued.discard(context)
+            if context not in self.contexts:
+                # Removed or stopped since it was queued
+                continue
+
+            if self.turn is context:
+                return context
+
+            allotment = SLICE_OPERATIONS * context.weight
+            context.credit = min(context.credit + allotment, allotment)
+            if context.credit > 0:
+                self.turn = context
+                return context
+
+            self.queued.add(context)
+            self.queue.append(context)
+
+        return None
 
     def execute_next(self) -> None:
         """Execute the next sequence of operations. If the operation contains nested
         operations, it may stop when an appropriate break point is hit, for the
         purpose of other interpreters to run"""
-        try:
-            context = self.contexts.pop(0)
-        except IndexError:
-            context = None
-
+        context = self.next_context()
         if context is None:
             # LOGGER.info("No more contexts to execute")
             return
 
         try:
+            operations = context.total_operations
             finished = context.execute_next()
-            if not finished:
-                if context.stopped:
-                    self.stopped_contexts.append(context)
-                else:
-                    self.contexts.append(context)
-            else:
+
+            charge = max(context.total_operations - operations, SLICE_OPERATIONS)
+            context.credit -= charge
+            context.charged += charge
+            self.total_charged += charge
+            if finished or context.stopped or context.credit <= 0:
+                # End of its turn
+                self.turn = None
+
+            if finished:
+                self.contexts.discard(context)
+                self.forget(context)
                 if context.on_complete:
                     context.on_complete(context)
+            elif context not in self.added_at:
+                # Removed while it was running
+                pass
+            elif context.stopped:
+                self.stop(context)
+            else:
+                self.schedule(context)
         except Exception as ex:
             LOGGER.exception("Execution error", exception=ex)
             raise ex
 
+    def forget(self, context: ExecutionContext) -> None:
+        named = self.by_name.get(context.name, None)
+        if named is not None:
+            named.discard(context)
+            if not named:
+                del self.by_name[context.name]
+        self.added_at.pop(context, None)
+
     def stop_all(self) -> None:
-        for context in [c for c in self.contexts]:
+        for context in list(self.contexts):
             self.stop(context)
 
     def stop(self, context: ExecutionContext) -> None:
-        if context not in self.stopped_contexts:
-            self.stopped_contexts.append(context)
+        if context in self.added_at and context not in self.stopped_contexts:
+            self.contexts.discard(context)
+            self.stopped_contexts.add(context)
             context.stop()
 
     def resume(self, context: ExecutionContext) -> None:
         if context in self.stopped_contexts:
             self.stopped_contexts.remove(context)
             context.resume()
-            self.contexts.append(context)
+            self.schedule(context)
+
+    def shares(self) -> dict[ExecutionContext, float]:
+        """Each context's share of the interpreter since it was added: the
+        fraction of all that was charged (see SLICE_OPERATIONS) that was its own"""
+        shares = {}
+        for context, added_at in self.added_at.items():
+            charged = self.total_charged - added_at
+            shares[context] = context.charged / charged if charged else 0.0
+        return shares
 
     @property
     def is_finished(self) -> bool:
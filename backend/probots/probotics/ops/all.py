@@ -1,7 +1,7 @@
 from .arithmetic import Addition, Division, Multiplication, Subtraction
-from .assignment import Assignment
-from .base import BinaryOperator, Immediate, Operation
-from .call import Block, Call, MaybeCall
+from .assignment import Assignment, SetGlobal, SetLocal
+from .base import BinaryOperator, Control, Immediate, Operation
+from .call import Block, Call, MaybeCall, TailCall
 from .comparison import (
     CompareEqual,
     CompareGreaterThan,
@@ -10,10 +10,25 @@ from .comparison import (
     CompareLessThanOrEqual,
     CompareNotEqual,
 )
-from .flow_control import Break, Breakpoint, Catch, Jump, JumpIf, Next, Return
+from .flow_control import (
+    Break,
+    Breakpoint,
+    Catch,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    Jump,
+    JumpIf,
+    Next,
+    ParkIteration,
+    Return,
+)
 from .logical import LogicalAnd, LogicalNot, LogicalOr
-from .native import Native
+from .native import Native, WaitingCheck
 from .objects import GetIndex, GetProperty, Index, Property
-from .primitive import Primitive, PrimitiveType
-from .stack_frame import EnterScope, ExitScope, ScopeVars, StackFrame, UndefinedSymbol
-from .symbol import GetValue
+from .primitive import FALSE, NULL, TRUE, Primitive, PrimitiveType
+from .quickened import Quickened
+from .source_map import MappedOperations, SourceMap, source_map_of
+from .stack_frame import ScopeVars, StackFrame, UndefinedSymbol
+from .superinstructions import CallNamed, CompareJump, LoadProperty
+from .symbol import GetGlobal, GetLocal, GetValue
@@ -3,24 +3,32 @@ from .primitive import Primitive
 
 
 class Addition(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
         result = left.value + right.value
         return Primitive.of(result)
 
 
 class Subtraction(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
         result = left.value - right.value
         return Primitive.of(result)
 
 
 class Multiplication(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
         result = left.value * right.value
         return Primitive.of(result)
 
 
 class Division(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
         result = left.value / right.value
         return Primitive.of(result)
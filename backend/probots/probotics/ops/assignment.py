@@ -9,6 +9,8 @@ class Assignment(Operation):
     be a symbol or a property of an object.
     """
 
+    __slots__ = ()
+
     def execute(self, frame: StackFrame) -> None:
         value = frame.pop()
         target = frame.pop()
@@ -36,3 +38,63 @@ class Assignment(Operation):
         if right.is_block:
             return None
         return right
+
+
+class SetLocal(Operation):
+    """Assign a value to an argument or local variable of the frame, by its slot
+    (see ProboticsCodeGenerator.resolve_variables)"""
+
+    __slots__ = ("slot", "name")
+
+    def __init__(self, slot: int, name: str) -> None:
+        self.slot = slot
+        self.name = name
+
+    def execute(self, frame: StackFrame) -> None:
+        value = frame.pop()
+        if frame.slots[self.slot] is None and frame.get(self.name) is not None:
+            # The first assignment in this frame, to a name that is already
+            # defined: update the global (or fail, for a builtin)
+            frame.set(self.name, value)
+        else:
+            frame.slots[self.slot] = value
+
+        # Same result as Assignment
+        if not value.is_block:
+            frame.push(value)
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.slot == other.slot and self.name == other.name
+
+    def __repr__(self) -> str:
+        return f"SetLocal({self.slot}, {self.name})"
+
+
+class SetGlobal(Operation):
+    """Assign a value to a global variable, from the top level of a program"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def execute(self, frame: StackFrame) -> None:
+        value = frame.pop()
+        global_vars = frame.global_vars
+        if self.name not in global_vars and self.name in frame.builtins:
+            raise ValueError(f"Cannot assign to builtin: {self.name}")
+        global_vars[self.name] = value
+
+        # Same result as Assignment
+        if not value.is_block:
+            frame.push(value)
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.name == other.name
+
+    def __repr__(self) -> str:
+        return f"SetGlobal({self.name})"
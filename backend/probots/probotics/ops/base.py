@@ -1,14 +1,42 @@
-from typing import TYPE_CHECKING
+from enum import IntEnum
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from .primitive import Primitive
+    from .quickened import Quickened
     from .stack_frame import StackFrame
 
 
+class Control(IntEnum):
+    """What the interpreter does after executing an operation, when it isn't
+    just continuing with the next operation in the frame (see
+    ExecutionContext.execute_until_break)"""
+
+    # Continue with the next operation (the same as returning None)
+    CONTINUE = 0
+
+    # Enter the frame given to ExecutionContext.enter()
+    ENTER = 1
+
+    # Exit the frame, returning the value on top of its stack (if any)
+    EXIT = 2
+
+    # Unwind to the frame that catches the breakpoint given to
+    # ExecutionContext.unwind()
+    UNWIND = 3
+
+    # Let other contexts run. Execution continues with the frame the next time
+    # the context runs
+    YIELD = 4
+
+
 class Operation:
-    """Base class for an operation that can be executed"""
+    """Base class for an operation that can be executed. Executing it returns
+    None to continue with the next operation, or how to transfer control"""
 
-    def execute(self, frame: "StackFrame") -> None:
+    __slots__ = ()
+
+    def execute(self, frame: "StackFrame") -> Optional[Control]:
         raise NotImplementedError
 
     def __eq__(self, other: object) -> bool:
@@ -21,6 +49,8 @@ class Operation:
 class Immediate(Operation):
     """A terminal value in the parse tree that has an immediate value"""
 
+    __slots__ = ("value",)
+
     def __init__(self, value: "Primitive") -> None:
         self.value = value
 
@@ -36,14 +66,48 @@ class Immediate(Operation):
         return "Immediate(" + repr(self.value) + ")"
 
 
+# How many times a binary operator executes before it is specialized to the
+# types of its operands (see quickened.py)
+QUICKEN_AFTER = 8
+
+
 class BinaryOperator(Operation):
     """Base class for binary operators (primarily arithmetic and logical)"""
 
+    __slots__ = ("executions", "quickened")
+
+    # How many times the operator has executed, until it is specialized
+    executions: int
+
+    # The operator specialized to the types of its operands, once it is
+    quickened: Optional["Quickened"]
+
+    def __init__(self) -> None:
+        self.executions = 0
+        self.quickened = None
+
     def execute(self, frame: "StackFrame") -> None:
+        quickened = self.quickened
+        if quickened is not None:
+            return quickened.execute(frame)
+
         right = frame.pop()
         left = frame.pop()
         result = self._execute(left, right)
         frame.push(result)
 
+        self.executions += 1
+        if self.executions == QUICKEN_AFTER:
+            self.quicken(left, right)
+
+    def quicken(self, left: "Primitive", right: "Primitive") -> None:
+        """Specialize the operator to the types of the operands, if it can be"""
+        from .quickened import QUICKEN_BACKOFF, specialize
+
+        quickened = specialize(self, left, right)
+        if quickened is None:
+            self.executions = -QUICKEN_BACKOFF
+        self.quickened = quickened
+
     def _execute(self, left: "Primitive", right: "Primitive") -> "Primitive":
         raise NotImplementedError
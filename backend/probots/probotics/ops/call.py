@@ -1,9 +1,14 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
-from .base import Operation
+from .base import Control, Operation
 from .primitive import Primitive
-from .stack_frame import EnterScope, ScopeVars, StackFrame
+from .source_map import SourceMap
+from .stack_frame import ScopeVars, StackFrame
+
+if TYPE_CHECKING:
+    from ..closures import Code
+    from .native import DirectFunc
 
 
 @dataclass
@@ -12,6 +17,25 @@ class Block:
     name: Optional[str]
     arg_names: list[str]
 
+    # When the variables of the block are resolved to slots (arguments first,
+    # then locals), the number of slots its frames need. Otherwise None, and the
+    # variables are looked up by name
+    num_slots: Optional[int] = None
+
+    # Where the operations came from in the source, when compiled in lean mode.
+    # (Not part of what the block does, so not compared)
+    source_map: Optional[SourceMap] = field(default=None, compare=False)
+
+    # The operations compiled by the closures backend, the first time the block
+    # is called with it (see closures.Code)
+    code: Optional["Code"] = field(default=None, init=False, compare=False, repr=False)
+
+    # For a builtin implemented by a Python function, the function, which calls
+    # make without entering the block (see Primitive.native)
+    native: Optional["DirectFunc"] = field(
+        default=None, init=False, compare=False, repr=False
+    )
+
     def __output__(self) -> str:
         """This is what appears, for example, if the user types the name of
         a built-in function or a user-defined function in the terminal"""
@@ -24,49 +48,71 @@ class Call(Operation):
       on the number of arguments the function takes.
     - Then, the callable itself will be popped.
     - After creating a new frame representing the scope of the called function,
-      It will throw a EnterScope exception, which will be caught by the interpreter
-      and actually enter the new scope.
+      it returns Control.ENTER, and the interpreter continues with the new frame.
     - When the new scope exits, the result will be left on the calling frame's
       result stack (by the interpreter, not handled here)
     """
 
+    __slots__ = ("num_args", "local")
+
     def __init__(self, num_args: int, local: bool = False):
         super().__init__()
         self.num_args = num_args
         self.local = local
 
-    def execute(self, frame: StackFrame) -> None:
+    def execute(self, frame: StackFrame) -> Optional[Control]:
         # First pop the actual call arguments from the stack
         call_args = [frame.pop() for _ in range(self.num_args)]
         call_args.reverse()
 
         # Then pop the callable from the stack
         func_prim = frame.pop()
+        return self.call(frame, func_prim, call_args)
+
+    def call(
+        self, frame: StackFrame, func_prim: Primitive, call_args: list[Primitive]
+    ) -> Optional[Control]:
+        """Enter a new frame for calling the callable with the arguments -- or for
+        a native builtin, call its function right away"""
         if not func_prim.is_block:
             raise ValueError(
                 f"Value is not callable: {func_prim.value} ({func_prim.type.value})"
             )
         block = func_prim.value
 
-        # Compare call arguments with the expected arguments
-        # the function is defined to take in
-        args = self.validate_args(call_args, block, frame)
+        native = block.native
+        if native is not None:
+            # The same as the Native in a frame of its own would do
+            context = frame.context
+            result = native(context, call_args)
+            if result is not None:
+                frame.push(result)
+            if context.stopped:
+                return Control.YIELD
+            return None
+
+        if block.num_slots is not None:
+            return frame.context.enter(self.create_slots_frame(call_args, block, frame))
 
-        # Looks like we have a valid function call, so we can create a new frame
         new_frame = self.create_frame(
             name=block.name,
-            args=frame.args if self.local else args,
+            args=frame.args if self.local else None,
             scope_vars=frame.scope_vars if self.local else None,
             global_vars=frame.global_vars,
             block=block,
             parent_frame=frame,
         )
-        raise EnterScope(new_frame)
+        if not self.local:
+            # Compare call arguments with the expected arguments
+            # the function is defined to take in
+            self.validate_args(call_args, block, new_frame.args)
+        return frame.context.enter(new_frame)
 
     def validate_args(
-        self, args: list[Primitive], block: Block, frame: StackFrame
+        self, args: list[Primitive], block: Block, scope_vars: ScopeVars
     ) -> ScopeVars:
-        """Validate the arguments passed to the function and create a new scope."""
+        """Validate the arguments passed to the function, and add them to the
+        new scope."""
         # if len(block.arg_names) > 0 and len(args) < len(block.arg_names):
         #    raise ValueError(
         #        f"Block {block.name} expected {len(block.arg_names)} arguments, "
@@ -79,8 +125,7 @@ class Call(Operation):
             arg_n = 1 + len(arg_names) - len(block.arg_names)
             arg_names.append(f"arg{arg_n}")
 
-        # Create a new scope with the arguments
-        scope_vars = ScopeVars()
+        # Add the arguments to the new scope
         for name, value in zip(arg_names, args, strict=False):
             scope_vars[name] = value
 
@@ -90,26 +135,54 @@ class Call(Operation):
         self,
         *,
         name: str,
-        args: ScopeVars,
+        args: Optional[ScopeVars],
         scope_vars: Optional[ScopeVars],
         global_vars: ScopeVars,
         block: Block,
         parent_frame: StackFrame,
     ) -> StackFrame:
-        """Create a new stack frame for the function call."""
-        frame = StackFrame(
-            context=parent_frame.context,
+        """Create a new stack frame for the function call -- reusing one, if
+        the context has one (see ExecutionContext.new_frame). Without args or
+        scope vars, the frame gets empty ones of its own."""
+        return parent_frame.context.new_frame(
             name=f"{parent_frame.name}.{name}",
+            block=block,
             builtins=parent_frame.builtins,
-            operations=block.operations,
             global_vars=global_vars,
-            scope_vars=scope_vars or ScopeVars(),
+            scope_vars=scope_vars,
             args=args,
             parent=parent_frame,
         )
 
+    def create_slots_frame(
+        self, call_args: list[Primitive], block: Block, parent_frame: StackFrame
+    ) -> StackFrame:
+        """Create the frame for calling a block with resolved variables. The
+        arguments go in the first slots, and any extra arguments are passed by
+        name, as arg1, arg2, etc."""
+        frame = self.create_frame(
+            name=block.name,
+            args=None,
+            scope_vars=None,
+            global_vars=parent_frame.global_vars,
+            block=block,
+            parent_frame=parent_frame,
+        )
+
+        self.bind_slots(call_args, block, frame)
         return frame
 
+    def bind_slots(
+        self, call_args: list[Primitive], block: Block, frame: StackFrame
+    ) -> None:
+        """Put the arguments in the first slots of the frame, and any extra
+        arguments in its args, by name"""
+        num_args = len(block.arg_names)
+        passed = call_args[:num_args]
+        frame.slots[: len(passed)] = passed
+        for i, value in enumerate(call_args[num_args:]):
+            frame.args[f"arg{i + 1}"] = value
+
     def __repr__(self) -> str:
         return f"Call(num_args={self.num_args}, local={self.local})"
 
@@ -119,19 +192,57 @@ class Call(Operation):
         return self.num_args == other.num_args and self.local == other.local
 
 
+class TailCall(Call):
+    """A call in tail position: the value of the block that makes it is the value
+    of the call (see ProboticsCodeGenerator.mark_tail_calls). So instead of
+    entering a new frame, the calling frame is reused for the call, and the block
+    called returns straight to the caller's caller -- recursion in tail position
+    runs in constant stack space.
+
+    The Catch after the call is still there, for when a frame can't be reused:
+    natives are called as usual, and so is anything called from the outer frame.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, num_args: int) -> None:
+        super().__init__(num_args, local=False)
+
+    def call(
+        self, frame: StackFrame, func_prim: Primitive, call_args: list[Primitive]
+    ) -> Optional[Control]:
+        parent = frame.parent
+        if not func_prim.is_block or func_prim.value.native is not None or parent is None:
+            return super().call(frame, func_prim, call_args)
+
+        block = func_prim.value
+        context = frame.context
+        context.reuse_frame(frame, name=f"{parent.name}.{block.name}", block=block)
+        if block.num_slots is not None:
+            self.bind_slots(call_args, block, frame)
+        else:
+            self.validate_args(call_args, block, frame.args)
+        return context.enter(frame)
+
+    def __repr__(self) -> str:
+        return f"TailCall(num_args={self.num_args})"
+
+
 class MaybeCall(Call):
     """Used in cases (bare commands) where it's not clear if the referenced symbol
     is intended to be a call or not, and it depends on the runtime result -- whether
     the symbol is callable or not.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(num_args=0)
 
-    def execute(self, frame: StackFrame) -> None:
+    def execute(self, frame: StackFrame) -> Optional[Control]:
         maybe_func = frame.peek()
         if isinstance(maybe_func, Callable):
-            super().execute(frame)
+            return super().execute(frame)
         else:
             # Treat it as an immediate value
             frame.push(frame.pop())
@@ -1,39 +1,44 @@
 from .base import BinaryOperator
-
-from .primitive import Primitive
+from .primitive import FALSE, TRUE, Primitive
 
 
 class CompareEqual(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value == right.value
-        return Primitive.of(result)
+        return TRUE if left.value == right.value else FALSE
 
 
 class CompareNotEqual(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value != right.value
-        return Primitive.of(result)
+        return TRUE if left.value != right.value else FALSE
 
 
 class CompareLessThan(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value < right.value
-        return Primitive.of(result)
+        return TRUE if left.value < right.value else FALSE
 
 
 class CompareLessThanOrEqual(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value <= right.value
-        return Primitive.of(result)
+        return TRUE if left.value <= right.value else FALSE
 
 
 class CompareGreaterThan(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value > right.value
-        return Primitive.of(result)
+        return TRUE if left.value > right.value else FALSE
 
 
 class CompareGreaterThanOrEqual(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = left.value >= right.value
-        return Primitive.of(result)
+        return TRUE if left.value >= right.value else FALSE
@@ -1,5 +1,6 @@
 from typing import Optional
-from .base import Operation
+
+from .base import Control, Operation
 from .primitive import Primitive
 from .stack_frame import StackFrame
 
@@ -8,6 +9,8 @@ class Jump(Operation):
     """Jump (goto) a new instruction location unconditionally.
     This is used to implement if and while statements."""
 
+    __slots__ = ("jump",)
+
     jump: int
 
     def __init__(self, jump: int):
@@ -40,6 +43,8 @@ class JumpIf(Jump):
     """Jump (goto) a new instruction location if the top of the stack is true.
     This is used to implement if and while statements."""
 
+    __slots__ = ("sense",)
+
     sense: bool
 
     def __init__(self, jump: int, sense: bool = True):
@@ -60,59 +65,65 @@ class JumpIf(Jump):
         return f"JumpIf(jump={self.jump}, sense={self.sense})"
 
 
-class Breakpoint(Exception):
-    """Exception to be raised when a breakpoint is hit during execution.
-    This allows the context to stop and let other contexts run.
+class Breakpoint:
+    """A breakpoint that unwinds the stack, e.g. to return from a function. The
+    interpreter exits frames until it finds a Catch for the reason (see
+    ExecutionContext.handle_breakpoint), and pushes the value there, if any.
     """
 
+    __slots__ = ("reason", "value")
+
     reason: str
-    stop: bool
     value: Optional[Primitive]
 
-    def __init__(
-        self, *, reason: str, stop: bool = False, value: Optional[Primitive] = None
-    ) -> None:
-        super().__init__()
+    def __init__(self, *, reason: str, value: Optional[Primitive] = None) -> None:
         self.reason = reason
-        self.stop = stop
         self.value = value
 
 
 class Return(Operation):
-    """Break out of the current frame by raising a breakpoint.
+    """Break out of the current frame with a breakpoint.
     This will cause the interpreter to unwind the stack until it finds a Catch"""
 
+    __slots__ = ("with_value",)
+
     def __init__(self, with_value: bool) -> None:
         self.with_value = with_value
 
-    def execute(self, frame: StackFrame) -> None:
+    def execute(self, frame: StackFrame) -> Control:
         if self.with_value:
             value = frame.pop()
         else:
             value = Primitive.of(None)
 
-        raise Breakpoint(reason="return", value=value)
+        return frame.context.unwind(Breakpoint(reason="return", value=value))
 
 
 class Break(Operation):
-    """Break out of the current frame by raising a breakpoint.
+    """Break out of the current frame with a breakpoint.
     This will cause the interpreter to unwind the stack until it finds a Catch"""
 
-    def execute(self, frame: StackFrame) -> None:
-        raise Breakpoint(reason="break")
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> Control:
+        return frame.context.unwind(Breakpoint(reason="break"))
 
 
 class Next(Operation):
-    """Break out of the current frame by raising a breakpoint.
+    """Break out of the current frame with a breakpoint.
     This will cause the interpreter to unwind the stack until it finds a Catch"""
 
-    def execute(self, frame: StackFrame) -> None:
-        raise Breakpoint(reason="next")
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> Control:
+        return frame.context.unwind(Breakpoint(reason="next"))
 
 
 class Catch(Jump):
     """catch a breakpoint. Execute a jump based on what is caught"""
 
+    __slots__ = ("jumps",)
+
     jumps: dict[str, int]
 
     def __init__(self, jumps: dict[str, int]) -> None:
@@ -121,7 +132,7 @@ class Catch(Jump):
 
     def execute(self, frame: StackFrame) -> None:
         # When this op is executed, it doesn't do anything. It exists
-        # to be used by the interpreter to handle breakpoint exceptions.
+        # to be used by the interpreter to handle breakpoints.
         pass
 
     def catches(self, reason: str) -> bool:
@@ -134,3 +145,65 @@ class Catch(Jump):
 
     def __repr__(self) -> str:
         return f"Catch(jumps={self.jumps})"
+
+
+class EnterLoop(Operation):
+    """Marks the start of a while loop, whose body is inlined in the frame.
+
+    Each statement in the body leaves its value on the frame's results stack.
+    So that they don't accumulate for as long as the loop runs, EndIteration
+    drops all of them but the last one (which is the value of the loop, if it
+    is the last statement in a block)."""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        if frame.results is None:
+            frame.results = []
+        if frame.loop_marks is None:
+            frame.loop_marks = []
+        frame.loop_marks.append(len(frame.results))
+
+
+class EndIteration(Operation):
+    """End of an iteration of a loop (and the target of `next`): keep only the
+    latest value of the loop on the results stack.
+
+    This is also where a loop lets other contexts run, the same as a loop whose
+    body was a separate frame, so a program that never stops looping can't
+    take over the interpreter."""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> Control:
+        results = frame.results
+        mark = frame.loop_marks[-1]
+        if len(results) > mark + 1:
+            results[mark:] = results[-1:]
+        return Control.YIELD
+
+
+class ParkIteration(EndIteration):
+    """End of an iteration of a loop that only waits for the state of the probot
+    to change -- one that does nothing but check builtins like is_idle() and
+    me.energy (see PeepholeOptimizer.park_spin_loops). Rather than checking
+    again the next turn, the context is parked until the state might have
+    changed (see ExecutionContext.park)."""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> Control:
+        super().execute(frame)
+        frame.context.park()
+        return Control.YIELD
+
+
+class ExitLoop(Operation):
+    """Exit from a loop (and the target of `break`): drop anything left on the
+    results stack by an unfinished iteration"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        mark = frame.loop_marks.pop()
+        del frame.results[mark + 1 :]
@@ -1,22 +1,25 @@
 from .base import BinaryOperator, Operation
-from .primitive import Primitive
+from .primitive import FALSE, TRUE, Primitive
 from .stack_frame import StackFrame
 
 
 class LogicalAnd(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = bool(left.value) and bool(right.value)
-        return Primitive.of(result)
+        return TRUE if left.value and right.value else FALSE
 
 
 class LogicalOr(BinaryOperator):
+    __slots__ = ()
+
     def _execute(self, left: Primitive, right: Primitive) -> Primitive:
-        result = bool(left.value) or bool(right.value)
-        return Primitive.of(result)
+        return TRUE if left.value or right.value else FALSE
 
 
 class LogicalNot(Operation):
+    __slots__ = ()
+
     def execute(self, frame: StackFrame) -> None:
         right = frame.pop()
-        result = not bool(right.value)
-        frame.push(Primitive.of(result))
+        frame.push(FALSE if right.value else TRUE)
@@ -1,28 +1,76 @@
-from typing import Callable, Optional, TypeAlias
+from typing import TYPE_CHECKING, Callable, Optional, TypeAlias
 
-from .base import Operation
+from .base import Control, Operation
+from .flow_control import JumpIf
 from .primitive import Primitive
 from .stack_frame import StackFrame
 
+if TYPE_CHECKING:
+    from ..interpreter import ExecutionContext
+
 NativeFunc: TypeAlias = Callable[[StackFrame], Optional[Primitive]]
 
+# A function for a builtin that is called directly, without a frame: given the
+# context, and the arguments of the call in order (see Primitive.native)
+DirectFunc: TypeAlias = Callable[
+    ["ExecutionContext", list[Primitive]], Optional[Primitive]
+]
+
 
 class Native(Operation):
-    """An operation that is implemented natively in python."""
+    """An operation that is implemented natively in python. The function is given
+    the frame -- or, when it is direct, the context and the frame's arguments."""
+
+    __slots__ = ("func", "direct")
 
-    def __init__(self, func: NativeFunc) -> None:
+    def __init__(self, func: NativeFunc | DirectFunc, direct: bool = False) -> None:
         self.func = func
+        self.direct = direct
 
-    def execute(self, frame: StackFrame) -> None:
-        """The result of the function is passed as the return value for the frame"""
-        result = self.func(frame)
+    def execute(self, frame: StackFrame) -> Optional[Control]:
+        """The result of the function is passed as the return value for the frame.
+        A function that stops the context (e.g. `wait`) lets other contexts run"""
+        if self.direct:
+            result = self.func(frame.context, list(frame.args.values()))
+        else:
+            result = self.func(frame)
         if result is not None:
             frame.push(result)
+        if frame.context.stopped:
+            return Control.YIELD
 
     def __eq__(self, other: object) -> bool:
         if not super().__eq__(other):
             return False
-        return self.func == other.func
+        return self.func == other.func and self.direct == other.direct
 
     def __repr__(self) -> str:
         return f"Native({self.func.__name__})"
+
+
+class WaitingCheck(Native):
+    """The check of a builtin that waits, which returns whether to stop waiting.
+    Until then, the context lets other contexts run after each check: it is
+    parked, if its owner parks contexts (see ExecutionContext.park), otherwise it
+    checks again the next time it runs, rather than for the rest of its quantum"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> Optional[Control]:
+        control = super().execute(frame)
+        if control is None and not frame.results[-1].is_true:
+            return Control.YIELD
+        return control
+
+
+def waiting_loop(check: WaitingCheck, *before: Operation) -> list[Operation]:
+    """The operations of a builtin that waits: the operations before the check,
+    then the check, which either returns true, or returns false and lets other
+    contexts run -- in which case it starts again the next time the context runs"""
+    operations = [*before, check]
+    return [*operations, JumpIf(jump=-len(operations) - 1, sense=False)]
+
+
+def get_arg(args: list[Primitive], index: int) -> Optional[Primitive]:
+    """The argument of a direct function at the index, if it was passed"""
+    return args[index] if index < len(args) else None
@@ -8,6 +8,8 @@ class Property(Operation):
     while the name of the property is stored in the operation.
     """
 
+    __slots__ = ("name",)
+
     def __init__(self, name: str):
         self.name = name
 
@@ -30,6 +32,8 @@ class Property(Operation):
 class GetProperty(Operation):
     """Get the value of a property from an object. The property primitive comes from the stack"""
 
+    __slots__ = ()
+
     def execute(self, frame: "StackFrame") -> None:
         property = frame.pop()
         if not property.is_property:
@@ -46,6 +50,8 @@ class Index(Operation):
     to Property(), except that the index can be a string or an integer, and it is
     popped form the stack vs known at compile time."""
 
+    __slots__ = ()
+
     def execute(self, frame: "StackFrame") -> None:
         index = frame.pop()
         target = frame.pop()
@@ -63,6 +69,8 @@ class Index(Operation):
 class GetIndex(Operation):
     """Get the value of an index from a list, or an object property. The index primitive comes from the stack"""
 
+    __slots__ = ()
+
     def execute(self, frame: "StackFrame") -> None:
         index = frame.pop()
         if not index.is_property:
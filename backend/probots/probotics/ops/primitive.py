@@ -1,12 +1,13 @@
 from dataclasses import dataclass
 from enum import Enum
-from types import NoneType
 from typing import TYPE_CHECKING, Any, Optional
 
 import structlog
 
 if TYPE_CHECKING:
     from .base import Operation
+    from .native import DirectFunc
+    from .source_map import SourceMap
 
 
 LOGGER = structlog.get_logger(__name__)
@@ -25,9 +26,13 @@ class PrimitiveType(str, Enum):
     BLOCK = "block"
 
 
-@dataclass
+@dataclass(slots=True)
 class Primitive:
-    """The result of some execution"""
+    """The result of some execution.
+
+    Primitives are never changed once created, so the common ones are shared:
+    Primitive.of() returns the same instance for null, true, false and small
+    ints every time (see NULL, TRUE, FALSE and SMALL_INTS)"""
 
     type: PrimitiveType
     value: int | float | str | list | dict | tuple[dict, str] | tuple[list, str] | None
@@ -67,19 +72,19 @@ class Primitive:
     @classmethod
     def of(cls, value: Any) -> "Primitive":
         if value is None:
-            return Primitive(PrimitiveType.NULL, None)
+            return NULL
 
         t = type(value)
-        if t is NoneType:
-            return Primitive(PrimitiveType.NULL, None)
+        if t is bool:
+            return TRUE if value else FALSE
         if t is int:
+            if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+                return SMALL_INTS[value - SMALL_INT_MIN]
             return Primitive(PrimitiveType.INT, value)
         if t is float:
             return Primitive(PrimitiveType.FLOAT, value)
         if t is str:
             return Primitive(PrimitiveType.STRING, value)
-        if t is bool:
-            return Primitive(PrimitiveType.BOOL, value)
         if isinstance(value, list):
             return Primitive(PrimitiveType.LIST, value)
         if isinstance(value, dict):
@@ -107,12 +112,35 @@ class Primitive:
         operations: list["Operation"],
         name: Optional[str] = None,
         arg_names: Optional[list[str]] = None,
+        num_slots: Optional[int] = None,
+        source_map: Optional["SourceMap"] = None,
     ) -> "Primitive":
         from .call import Block
 
-        block = Block(operations=operations, name=name, arg_names=arg_names or [])
+        block = Block(
+            operations=operations,
+            name=name,
+            arg_names=arg_names or [],
+            num_slots=num_slots,
+            source_map=source_map,
+        )
         return Primitive(PrimitiveType.BLOCK, value=block)
 
+    @classmethod
+    def native(
+        cls,
+        func: "DirectFunc",
+        name: str,
+        arg_names: Optional[list[str]] = None,
+    ) -> "Primitive":
+        """A builtin implemented by a Python function of the context and the
+        arguments, which calls make directly, without a frame (see Call.call)"""
+        from .native import Native
+
+        primitive = cls.block([Native(func, direct=True)], name=name, arg_names=arg_names)
+        primitive.value.native = func
+        return primitive
+
     @classmethod
     def output(cls, value: Any) -> str:
         try:
@@ -130,3 +158,17 @@ class Primitive:
             return f"<block>({', '.join(self.value.arg_names)})"
 
         return self.value
+
+
+# The shared instances of the most common values (see Primitive.of). The range
+# of small ints covers the coordinates, energy and counters of most programs
+NULL = Primitive(PrimitiveType.NULL, None)
+TRUE = Primitive(PrimitiveType.BOOL, True)
+FALSE = Primitive(PrimitiveType.BOOL, False)
+
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+SMALL_INTS = tuple(
+    Primitive(PrimitiveType.INT, value)
+    for value in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)
+)
@@ -0,0 +1,235 @@
+"""Binary operators specialized to the types of their operands.
+
+A binary operator counts how many times it has executed, and after QUICKEN_AFTER
+times, keeps a version of itself specialized to the types of the operands it
+just had, and executes that from then on (see BinaryOperator.quicken and
+specialize()). That checks the types of its operands, and computes the result
+primitive directly, rather than through _execute() and Primitive.of().
+
+The list of operations isn't changed, so operations that are frozen and shared
+(see cache.freeze) are specialized too. Only the game thread executes them, and
+the specialized version checks its operands wherever it runs, so whichever
+frame specializes a shared operator, it is right for all of them.
+
+When the operands turn out to have other types, the specialized operation is
+dropped, and the generic one computes the result (see Quickened.deoptimize). It
+only tries to specialize again after QUICKEN_BACKOFF more executions, so
+operations whose operand types keep changing stay mostly generic.
+"""
+
+import operator
+from typing import Any, Callable, Optional
+
+from .arithmetic import Addition, Division, Multiplication, Subtraction
+from .base import BinaryOperator, Operation
+from .comparison import (
+    CompareEqual,
+    CompareGreaterThan,
+    CompareGreaterThanOrEqual,
+    CompareLessThan,
+    CompareLessThanOrEqual,
+    CompareNotEqual,
+)
+from .primitive import (
+    FALSE,
+    SMALL_INT_MAX,
+    SMALL_INT_MIN,
+    SMALL_INTS,
+    TRUE,
+    Primitive,
+    PrimitiveType,
+)
+from .stack_frame import StackFrame
+
+# How many more executions, after a specialized operation had to put the generic
+# one back, before it is specialized again
+QUICKEN_BACKOFF = 64
+
+ARITHMETIC: dict[type[BinaryOperator], Callable[[Any, Any], Any]] = {
+    Addition: operator.add,
+    Subtraction: operator.sub,
+    Multiplication: operator.mul,
+    Division: operator.truediv,
+}
+
+COMPARISONS: dict[type[BinaryOperator], Callable[[Any, Any], bool]] = {
+    CompareEqual: operator.eq,
+    CompareNotEqual: operator.ne,
+    CompareLessThan: operator.lt,
+    CompareLessThanOrEqual: operator.le,
+    CompareGreaterThan: operator.gt,
+    CompareGreaterThanOrEqual: operator.ge,
+}
+
+# (bools are not numbers here: they are their own type of primitive)
+NUMBERS = (int, float)
+
+
+class Quickened(Operation):
+    """Base class for a binary operator specialized to the types of its operands:
+    the generic operation it replaced, and the function of the operands' values
+    that it computes"""
+
+    __slots__ = ("generic", "operation")
+
+    def __init__(self, generic: BinaryOperator, operation: Callable) -> None:
+        self.generic = generic
+        self.operation = operation
+
+    def deoptimize(self, frame: StackFrame, left: Primitive, right: Primitive) -> None:
+        """The operands have other types: go back to the generic operation, and
+        let it compute the result"""
+        generic = self.generic
+        if generic.quickened is self:
+            generic.quickened = None
+        generic.executions = -QUICKEN_BACKOFF
+        frame.push(generic._execute(left, right))
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.generic == other.generic
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.generic!r})"
+
+
+class IntArithmetic(Quickened):
+    """Addition, subtraction or multiplication of two ints"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) is not int or type(y) is not int:
+            return self.deoptimize(frame, left, right)
+
+        value = self.operation(x, y)
+        if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+            results.append(SMALL_INTS[value - SMALL_INT_MIN])
+        else:
+            results.append(Primitive(PrimitiveType.INT, value))
+
+
+class NumberArithmetic(Quickened):
+    """Arithmetic on two numbers, at least one of them a float -- or any two
+    numbers, for division"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) not in NUMBERS or type(y) not in NUMBERS:
+            return self.deoptimize(frame, left, right)
+
+        value = self.operation(x, y)
+        if type(value) is float:
+            results.append(Primitive(PrimitiveType.FLOAT, value))
+        else:
+            results.append(Primitive.of(value))
+
+
+class StrConcatenation(Quickened):
+    """Addition of two strings"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) is not str or type(y) is not str:
+            return self.deoptimize(frame, left, right)
+
+        results.append(Primitive(PrimitiveType.STRING, x + y))
+
+
+class IntComparison(Quickened):
+    """Comparison of two ints"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) is not int or type(y) is not int:
+            return self.deoptimize(frame, left, right)
+
+        results.append(TRUE if self.operation(x, y) else FALSE)
+
+
+class NumberComparison(Quickened):
+    """Comparison of two numbers, at least one of them a float"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) not in NUMBERS or type(y) not in NUMBERS:
+            return self.deoptimize(frame, left, right)
+
+        results.append(TRUE if self.operation(x, y) else FALSE)
+
+
+class StrComparison(Quickened):
+    """Comparison of two strings"""
+
+    __slots__ = ()
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        x = left.value
+        y = right.value
+        if type(x) is not str or type(y) is not str:
+            return self.deoptimize(frame, left, right)
+
+        results.append(TRUE if self.operation(x, y) else FALSE)
+
+
+def specialize(
+    op: BinaryOperator, left: Primitive, right: Primitive
+) -> Optional[Quickened]:
+    """The operation specialized to the types of the operands, if it can be"""
+    cls = type(op)
+    x = type(left.value)
+    y = type(right.value)
+
+    operation = ARITHMETIC.get(cls, None)
+    if operation is not None:
+        if x is int and y is int and cls is not Division:
+            return IntArithmetic(op, operation)
+        if x in NUMBERS and y in NUMBERS:
+            return NumberArithmetic(op, operation)
+        if x is str and y is str and cls is Addition:
+            return StrConcatenation(op, operation)
+        return None
+
+    operation = COMPARISONS.get(cls, None)
+    if operation is not None:
+        if x is int and y is int:
+            return IntComparison(op, operation)
+        if x in NUMBERS and y in NUMBERS:
+            return NumberComparison(op, operation)
+        if x is str and y is str:
+            return StrComparison(op, operation)
+
+    return None
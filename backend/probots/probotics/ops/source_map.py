@@ -0,0 +1,84 @@
+import bisect
+from array import array
+from typing import Iterable, Iterator, Optional, Sequence
+
+from .base import Operation
+
+
+class SourceMap:
+    """Compact table of where in the source the operations of a block (or of the
+    top level of a program) came from: for each run of operations from the same
+    place, the index of the first one and its zero-based line and column. The
+    position of any operation is that of the run it is in.
+
+    Positions are relative to the source that was compiled, which for a chunk of
+    a program (see ProboticsCompiler.compile_chunks) is the chunk itself -- see
+    shifted().
+    """
+
+    __slots__ = ("indices", "lines", "cols")
+
+    def __init__(self, entries: Iterable[tuple[int, int, int]] = ()) -> None:
+        indices, lines, cols = list(zip(*entries, strict=True)) or ((), (), ())
+        self.indices = array("i", indices)
+        self.lines = array("i", lines)
+        self.cols = array("i", cols)
+
+    def lookup(self, index: int) -> Optional[tuple[int, int]]:
+        """The line and column of the operation at the index"""
+        i = bisect.bisect_right(self.indices, index) - 1
+        if i < 0:
+            return None
+        return self.lines[i], self.cols[i]
+
+    def extend(self, other: Optional["SourceMap"], offset: int) -> None:
+        """Add the entries of the map of operations that follow, starting at the
+        offset"""
+        if other is None:
+            return
+        for index, line, col in other:
+            if self.indices and (self.lines[-1], self.cols[-1]) == (line, col):
+                continue
+            self.indices.append(index + offset)
+            self.lines.append(line)
+            self.cols.append(col)
+
+    def shifted(self, line: int, col: int) -> "SourceMap":
+        """The same map, for source that starts at the line and column (of its
+        first line) within a larger source"""
+        return SourceMap(
+            (index, line + entry_line, col + entry_col if entry_line == 0 else entry_col)
+            for index, entry_line, entry_col in self
+        )
+
+    def __iter__(self) -> Iterator[tuple[int, int, int]]:
+        return zip(self.indices, self.lines, self.cols, strict=True)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SourceMap):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"SourceMap({list(self)})"
+
+
+class MappedOperations(list):
+    """The operations of the top level of a compiled program, with their source
+    map. (Blocks keep theirs in Block.source_map)"""
+
+    source_map: Optional[SourceMap] = None
+
+    def __init__(
+        self, operations: Iterable[Operation] = (), source_map: Optional[SourceMap] = None
+    ) -> None:
+        super().__init__(operations)
+        self.source_map = source_map
+
+
+def source_map_of(operations: Sequence[Operation]) -> Optional[SourceMap]:
+    """The source map of the top-level operations of a program, if it has one"""
+    return getattr(operations, "source_map", None)
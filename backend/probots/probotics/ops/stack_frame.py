@@ -1,16 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Optional, TypeAlias
 
 import structlog
 
-from .base import Operation
+from .base import Control, Operation
 from .primitive import Primitive
+from .source_map import SourceMap
 
 ScopeVars: TypeAlias = dict[str, Primitive]
 
 
 if TYPE_CHECKING:
     from ..interpreter import ExecutionContext
+    from .call import Block
 
 LOGGER = structlog.get_logger(__name__)
 
@@ -19,31 +21,7 @@ class UndefinedSymbol(Exception):
     pass
 
 
-class EnterScope(Exception):
-    """Exception to be raised when entering a new scope."""
-
-    # The frame to enter
-    frame: "StackFrame"
-
-    def __init__(self, frame: "StackFrame") -> None:
-        super().__init__()
-        self.frame = frame
-
-
-class ExitScope(Exception):
-    """Exception to be raised when a scope is done and should be exited."""
-
-    # The frame that is exiting, and it's return value
-    frame: "StackFrame"
-    return_value: "Primitive"
-
-    def __init__(self, frame: "StackFrame", return_value: "Primitive") -> None:
-        super().__init__()
-        self.frame = frame
-        self.return_value = return_value
-
-
-@dataclass
+@dataclass(slots=True)
 class StackFrame:
     """Stack frame is the runtime context for operations to be executed.
     It has a list of instructions to run in order, and a a stack of values(results)
@@ -63,17 +41,19 @@ class StackFrame:
     op_index: int = 0
     results: list[Primitive] = None
 
-    def next_op(self) -> Operation:
-        """ "Get the next operation to execute and advance the index.
-        If the end of the operations is reached, raise the ExitScope exception.
-        """
-        if self.operations is None or self.op_index >= len(self.operations):
-            return_value = self.pop() if self.results else None
-            raise ExitScope(self, return_value)
+    # Values of the arguments and local variables, for a block whose variables
+    # are resolved to slots -- None if not assigned yet
+    slots: list[Optional[Primitive]] = None
+
+    # Depth of the results stack when each of the (inlined) loops currently
+    # running in this frame was entered -- see EnterLoop
+    loop_marks: list[int] = None
 
-        op = self.operations[self.op_index]
-        self.op_index += 1
-        return op
+    # Where the operations came from in the source, if known
+    source_map: Optional[SourceMap] = None
+
+    # The block being executed, when the frame is for a call
+    block: Optional["Block"] = field(default=None, repr=False)
 
     def peek_op(self) -> Optional[Operation]:
         """ "Get the next operation to execute but don't advance the index."""
@@ -160,11 +140,25 @@ class StackFrame:
             operations=context.operations,
             op_index=0,
             results=[],
+            source_map=context.source_map,
         )
         return frame
 
+    def location(self) -> Optional[tuple[int, int]]:
+        """The zero-based line and column in the source of the operation being
+        executed (the last one started), if the frame has a source map"""
+        if self.source_map is None:
+            return None
+        return self.source_map.lookup(max(self.op_index - 1, 0))
+
     def describe(self) -> str:
-        """Return a string description of the frame for debugging purposes."""
+        """Return a string description of the frame for debugging purposes:
+        where it is in the source, if known, otherwise the operations it is at"""
+        location = self.location()
+        if location is not None:
+            line, col = location
+            return f"{self.name} at line {line + 1}, col {col + 1}"
+
         result = f"{self.name}@{self.op_index}/{len(self.operations)}"
         op_before = self.operations[self.op_index - 2] if self.op_index > 1 else None
         op_after = (
@@ -181,11 +175,13 @@ class PushFrame(Operation):
     This creates a new stack frame with local variables and a separate
     instruction pointer."""
 
+    __slots__ = ("name", "operations")
+
     def __init__(self, name: str, operations: list[Operation]) -> None:
         self.name = name
         self.operations = operations
 
-    def execute(self, parent_frame: StackFrame) -> None:
+    def execute(self, parent_frame: StackFrame) -> Control:
         new_frame = StackFrame(
             name=self.name,
             builtins=parent_frame.builtins,
@@ -196,4 +192,4 @@ class PushFrame(Operation):
             op_index=0,
             results=[],
         )
-        raise EnterScope(new_frame)
+        return parent_frame.context.enter(new_frame)
@@ -0,0 +1,136 @@
+"""Superinstructions: operations that do the work of a common sequence of
+operations in a single dispatch. The optimizer fuses the sequences into them
+(see PeepholeOptimizer.fuse_superinstructions), when nothing jumps into the
+middle of a sequence.
+
+The sequences were chosen by how often they execute in the fixture programs
+(see benchmarks/op_ngrams.py, which counts them):
+
+    GetGlobal(f), <args>, Call(n)        -> CallNamed(f, n)
+    GetGlobal(x), Property(y), GetProperty -> LoadProperty(x, y)
+    Compare*, JumpIf                       -> CompareJump
+"""
+
+import operator
+from typing import Any, Callable, Optional
+
+from .base import BinaryOperator, Control, Operation
+from .call import Call
+from .comparison import (
+    CompareEqual,
+    CompareGreaterThan,
+    CompareGreaterThanOrEqual,
+    CompareLessThan,
+    CompareLessThanOrEqual,
+    CompareNotEqual,
+)
+from .flow_control import JumpIf
+from .primitive import Primitive
+from .stack_frame import StackFrame, UndefinedSymbol
+
+# The comparison operators CompareJump can do, by the operator they implement
+COMPARISONS: dict[str, tuple[type[BinaryOperator], Callable[[Any, Any], bool]]] = {
+    "==": (CompareEqual, operator.eq),
+    "!=": (CompareNotEqual, operator.ne),
+    "<": (CompareLessThan, operator.lt),
+    "<=": (CompareLessThanOrEqual, operator.le),
+    ">": (CompareGreaterThan, operator.gt),
+    ">=": (CompareGreaterThanOrEqual, operator.ge),
+}
+
+COMPARISON_OF = {cls: comparison for comparison, (cls, _) in COMPARISONS.items()}
+
+
+def get_global(frame: StackFrame, name: str) -> Primitive:
+    """See GetGlobal"""
+    value = frame.global_vars.get(name)
+    if value is None:
+        value = frame.builtins.get(name)
+        if value is None:
+            raise UndefinedSymbol(f"undefined: {name}")
+    return value
+
+
+class CallNamed(Call):
+    """GetGlobal(name), then the arguments, then Call(num_args): call the global
+    (or builtin) named, without pushing it on the stack first. Only the arguments
+    are on the stack."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str, num_args: int, local: bool = False) -> None:
+        super().__init__(num_args, local)
+        self.name = name
+
+    def execute(self, frame: StackFrame) -> Optional[Control]:
+        results = frame.results
+        if self.num_args:
+            call_args = results[-self.num_args :]
+            del results[-self.num_args :]
+        else:
+            call_args = []
+        return self.call(frame, get_global(frame, self.name), call_args)
+
+    def __repr__(self) -> str:
+        return f"CallNamed({self.name}, num_args={self.num_args}, local={self.local})"
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.name == other.name
+
+
+class LoadProperty(Operation):
+    """GetGlobal(name), Property(property), GetProperty(): push the value of a
+    property of a global (or builtin) object, e.g. `me.energy`"""
+
+    __slots__ = ("name", "property")
+
+    def __init__(self, name: str, property: str) -> None:
+        self.name = name
+        self.property = property
+
+    def execute(self, frame: StackFrame) -> None:
+        target = get_global(frame, self.name)
+        if not target.is_object:
+            raise TypeError(f"Cannot get property of {target.type}")
+        frame.push(Primitive.of(target.value.get(self.property, None)))
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.name == other.name and self.property == other.property
+
+    def __repr__(self) -> str:
+        return f"LoadProperty({self.name}, {self.property})"
+
+
+class CompareJump(JumpIf):
+    """A comparison, then JumpIf on its result: jump if the comparison of the two
+    values on top of the stack is the sense, without pushing the result"""
+
+    __slots__ = ("comparison", "compare")
+
+    def __init__(self, comparison: str, jump: int, sense: bool = True) -> None:
+        super().__init__(jump=jump, sense=sense)
+        self.comparison = comparison
+        self.compare = COMPARISONS[comparison][1]
+
+    @classmethod
+    def fusing(cls, op: BinaryOperator, jump_if: JumpIf) -> "CompareJump":
+        return cls(COMPARISON_OF[type(op)], jump_if.jump, jump_if.sense)
+
+    def execute(self, frame: StackFrame) -> None:
+        results = frame.results
+        right = results.pop()
+        left = results.pop()
+        if bool(self.compare(left.value, right.value)) is self.sense:
+            self.do_jump(self.jump, frame)
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.comparison == other.comparison
+
+    def __repr__(self) -> str:
+        return f"CompareJump({self.comparison!r}, jump={self.jump}, sense={self.sense})"
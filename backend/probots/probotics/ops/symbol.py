@@ -6,6 +6,8 @@ from .stack_frame import StackFrame, UndefinedSymbol
 class GetValue(Operation):
     """Return the value of a symbol in the current scope."""
 
+    __slots__ = ("name",)
+
     def __init__(self, name: str) -> None:
         self.name = name
 
@@ -22,3 +24,47 @@ class GetValue(Operation):
 
     def __repr__(self):
         return f"GetValue({self.name})"
+
+
+class GetLocal(GetValue):
+    """Return the value of an argument or local variable of the frame, by its slot
+    (see ProboticsCodeGenerator.resolve_variables)"""
+
+    __slots__ = ("slot",)
+
+    def __init__(self, slot: int, name: str) -> None:
+        super().__init__(name)
+        self.slot = slot
+
+    def execute(self, frame: "StackFrame") -> None:
+        value = frame.slots[self.slot]
+        if value is None:
+            # Not passed / not assigned yet, so it can only be a global
+            return super().execute(frame)
+        frame.push(value)
+
+    def __eq__(self, other: object) -> bool:
+        if not super().__eq__(other):
+            return False
+        return self.slot == other.slot
+
+    def __repr__(self):
+        return f"GetLocal({self.slot}, {self.name})"
+
+
+class GetGlobal(GetValue):
+    """Return the value of a name that isn't an argument or local variable:
+    a global, or a builtin"""
+
+    __slots__ = ()
+
+    def execute(self, frame: "StackFrame") -> None:
+        value = frame.global_vars.get(self.name)
+        if value is None:
+            value = frame.builtins.get(self.name)
+            if value is None:
+                raise UndefinedSymbol(f"undefined: {self.name}")
+        frame.push(value)
+
+    def __repr__(self):
+        return f"GetGlobal({self.name})"
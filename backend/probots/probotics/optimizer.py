@@ -0,0 +1,701 @@
+from typing import Iterable, Mapping, Optional, Sequence
+
+import structlog
+
+from .ops.all import (
+    BinaryOperator,
+    Break,
+    Call,
+    CallNamed,
+    Catch,
+    CompareJump,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
+    GetLocal,
+    GetProperty,
+    GetValue,
+    Immediate,
+    Jump,
+    JumpIf,
+    LoadProperty,
+    LogicalNot,
+    MappedOperations,
+    Next,
+    Operation,
+    ParkIteration,
+    Primitive,
+    PrimitiveType,
+    Property,
+    Return,
+    SourceMap,
+    source_map_of,
+)
+from .ops.superinstructions import COMPARISON_OF
+
+LOGGER = structlog.get_logger(__name__)
+
+# Values that can be computed with at compile time
+SCALAR_TYPES = {
+    PrimitiveType.NULL,
+    PrimitiveType.INT,
+    PrimitiveType.FLOAT,
+    PrimitiveType.STRING,
+    PrimitiveType.BOOL,
+}
+
+# Operations that push a value and have no other effect, which can be the
+# arguments of a CallNamed
+PURE_PUSHES = (Immediate, GetValue, GetLocal, GetGlobal, LoadProperty)
+
+
+class Instruction:
+    """An operation being optimized. Jump targets refer to other instructions,
+    instead of being relative offsets, so that operations can be removed and
+    replaced without keeping track of the offsets."""
+
+    __slots__ = ("op", "target", "catches", "deleted", "forward", "position")
+
+    def __init__(self, op: Operation) -> None:
+        self.op = op
+
+        # Line and column in the source, if there is a source map
+        self.position: Optional[tuple[int, int]] = None
+
+        # For Jump and JumpIf: the instruction jumped to
+        self.target: Optional[Instruction] = None
+
+        # For Catch: the instruction jumped to for each reason
+        self.catches: dict[str, Instruction] = {}
+
+        self.deleted = False
+
+        # For a deleted instruction: the instruction that takes its place as a target
+        self.forward: Optional[Instruction] = None
+
+    def __repr__(self) -> str:
+        return f"Instruction({self.op!r})"
+
+
+# Target for jumps to the end of the operations
+END = Instruction(Operation())
+
+
+class PeepholeOptimizer:
+    """Rewrites the operations generated by ProboticsCodeGenerator into fewer
+    operations that have the same effect:
+
+    - constant folding: operators applied to immediate values are replaced by the
+      result, and the values of constant builtins are made immediate
+    - branch folding: conditional jumps on immediate values become unconditional
+      jumps (or are removed), and `not` before a conditional jump is folded into it,
+      as is an unconditional jump that a conditional jump skips over
+    - jump threading: jumps to unconditional jumps go directly to the final
+      target, and jumps to the next operation are removed
+    - dead code elimination: operations that can't be reached are removed
+    - unused pushes: immediate values that are only pushed to be dropped again
+      are removed (see drop_unused_pushes)
+    - spin loop parking: a loop that only waits for the probot's state to change
+      (see park_spin_loops) parks the context at the end of each iteration
+    - superinstructions (optional): common sequences of operations are fused
+      into single operations (see fuse_superinstructions)
+
+    The operations of nested blocks are optimized the same way.
+    """
+
+    # Upper bound on the number of times the passes are repeated for a list of
+    # operations, in case they don't reach a fixed point
+    MAX_PASSES = 20
+
+    def __init__(
+        self,
+        constants: Optional[Mapping[str, Primitive]] = None,
+        state_builtins: Iterable[str] = (),
+        wait_builtins: Iterable[str] = (),
+        superinstructions: bool = False,
+        state_properties: Optional[Mapping[str, Iterable[str]]] = None,
+    ) -> None:
+        # Builtin values that never change, which can be used at compile time.
+        # (They can only be hidden by arguments -- builtins can't be assigned to)
+        self.constants = dict(constants or {})
+
+        # Builtins that only observe the state of the probot (e.g. `is_idle`,
+        # `me`), and ones that only wait when called without arguments (e.g.
+        # `wait`), for finding loops that can be parked
+        self.state_builtins = frozenset(state_builtins)
+        self.wait_builtins = frozenset(wait_builtins)
+
+        # For state builtins that are objects (e.g. `me`), the properties that
+        # are the state of the probot. Other properties (e.g. `me.score`) can
+        # change without the probot changing, so loops that read them aren't
+        # parked
+        self.state_properties = {
+            name: frozenset(properties)
+            for name, properties in (state_properties or {}).items()
+        }
+
+        # Whether to fuse common sequences of operations (see superinstructions.py)
+        self.superinstructions = superinstructions
+
+    def optimize(
+        self, operations: Sequence[Operation], shadowed: frozenset[str] = frozenset()
+    ) -> list[Operation]:
+        """Optimize the operations. Names in `shadowed` are arguments of the
+        block the operations are in, which hide builtins of the same name.
+
+        If the operations have a source map (see MappedOperations), so does the
+        result."""
+        source_map = source_map_of(operations)
+        optimized, source_map = self.optimize_mapped(operations, source_map, shadowed)
+        if source_map is not None:
+            return MappedOperations(optimized, source_map)
+        return optimized
+
+    def optimize_mapped(
+        self,
+        operations: Sequence[Operation],
+        source_map: Optional[SourceMap],
+        shadowed: frozenset[str] = frozenset(),
+    ) -> tuple[list[Operation], Optional[SourceMap]]:
+        """Optimize the operations, and their source map to match"""
+        instructions = decode(operations, source_map)
+
+        passes = (
+            lambda instructions: self.fold_constants(instructions, shadowed),
+            self.fold_branches,
+            self.thread_jumps,
+            self.eliminate_dead_code,
+            self.drop_unused_pushes,
+        )
+        for _ in range(self.MAX_PASSES):
+            changed = False
+            for optimization in passes:
+                if optimization(instructions):
+                    instructions = compact(instructions)
+                    changed = True
+            if not changed:
+                break
+
+        self.park_spin_loops(instructions, shadowed)
+        if self.superinstructions:
+            # Again after fusing, for calls with a fused argument
+            while self.fuse_superinstructions(instructions):
+                instructions = compact(instructions)
+
+        for instruction in instructions:
+            self.optimize_block(instruction.op)
+
+        if source_map is not None:
+            source_map = encode_source_map(instructions)
+        return encode(instructions), source_map
+
+    def optimize_block(self, op: Operation) -> None:
+        if not (isinstance(op, Immediate) and op.value.is_block):
+            return
+
+        # A block is called with only its own arguments (see Call.create_frame)
+        block = op.value.value
+        block.operations, block.source_map = self.optimize_mapped(
+            block.operations, block.source_map, frozenset(block.arg_names)
+        )
+
+    #
+    # Passes -- each one returns whether it changed anything
+    #
+
+    def fold_constants(
+        self, instructions: list[Instruction], shadowed: frozenset[str]
+    ) -> bool:
+        changed = False
+        targets = jump_targets(instructions)
+
+        for i, instruction in enumerate(instructions):
+            op = instruction.op
+
+            if (
+                isinstance(op, GetValue)
+                and not isinstance(op, GetLocal)
+                and op.name in self.constants
+                and op.name not in shadowed
+            ):
+                instruction.op = Immediate(self.constants[op.name])
+                changed = True
+
+            elif isinstance(op, LogicalNot) and i >= 1:
+                operand = instructions[i - 1]
+                if immediate_scalar(operand) is not None and instruction not in targets:
+                    result = not operand.op.value.is_true  # type: ignore[attr-defined]
+                    operand.op = Immediate(Primitive.of(result))
+                    instruction.deleted = True
+                    changed = True
+
+            elif isinstance(op, BinaryOperator) and i >= 2:
+                left, right = instructions[i - 2], instructions[i - 1]
+                left_value = immediate_scalar(left)
+                right_value = immediate_scalar(right)
+                if (
+                    left_value is None
+                    or right_value is None
+                    or right in targets
+                    or instruction in targets
+                ):
+                    continue
+
+                try:
+                    result = op._execute(left_value, right_value)
+                except Exception:
+                    # e.g. division by zero -- leave it to fail at runtime
+                    continue
+
+                left.op = Immediate(result)
+                right.deleted = instruction.deleted = True
+                changed = True
+
+        return changed
+
+    def fold_branches(self, instructions: list[Instruction]) -> bool:
+        changed = False
+        targets = jump_targets(instructions)
+
+        for i, instruction in enumerate(instructions):
+            op = instruction.op
+            if type(op) is not JumpIf or i == 0 or instruction in targets:
+                continue
+
+            previous = instructions[i - 1]
+            value = immediate_scalar(previous)
+            if value is not None:
+                if value.is_true is op.sense:
+                    # Always jumps
+                    previous.op = Jump(0)
+                    previous.target = instruction.target
+                else:
+                    # Never jumps
+                    previous.deleted = True
+                instruction.deleted = True
+                changed = True
+
+            elif type(previous.op) is LogicalNot:
+                previous.op = JumpIf(0, sense=not op.sense)
+                previous.target = instruction.target
+                instruction.deleted = True
+                changed = True
+
+            elif i + 1 < len(instructions):
+                # Jumping over an unconditional jump (e.g. `if x { break }`) is
+                # the same as jumping to where it goes on the opposite condition
+                following = instructions[i + 1]
+                after = instructions[i + 2] if i + 2 < len(instructions) else END
+                if (
+                    type(following.op) is Jump
+                    and not following.deleted
+                    and following not in targets
+                    and instruction.target is after
+                ):
+                    instruction.op = JumpIf(0, sense=not op.sense)
+                    instruction.target = following.target
+                    following.deleted = True
+                    changed = True
+
+        return changed
+
+    def thread_jumps(self, instructions: list[Instruction]) -> bool:
+        changed = False
+
+        for i, instruction in enumerate(instructions):
+            if isinstance(instruction.op, Catch):
+                for reason, target in instruction.catches.items():
+                    final = final_target(target)
+                    if final is not target:
+                        instruction.catches[reason] = final
+                        changed = True
+
+            elif isinstance(instruction.op, Jump):
+                final = final_target(instruction.target)  # type: ignore[arg-type]
+                if final is not instruction.target:
+                    instruction.target = final
+                    changed = True
+
+                # An unconditional jump to the next operation does nothing
+                following = instructions[i + 1] if i + 1 < len(instructions) else END
+                if type(instruction.op) is Jump and instruction.target is following:
+                    instruction.deleted = True
+                    changed = True
+
+        return changed
+
+    def eliminate_dead_code(self, instructions: list[Instruction]) -> bool:
+        if not instructions:
+            return False
+
+        index = {id(instruction): i for i, instruction in enumerate(instructions)}
+        reachable = [False] * len(instructions)
+        pending = [0]
+
+        while pending:
+            i = pending.pop()
+            if i >= len(instructions) or reachable[i]:
+                continue
+            reachable[i] = True
+
+            instruction = instructions[i]
+            for target in successors(instruction):
+                if target is not END:
+                    pending.append(index[id(target)])
+            if falls_through(instruction.op):
+                pending.append(i + 1)
+
+        changed = False
+        for instruction, is_reachable in zip(instructions, reachable, strict=True):
+            if not is_reachable and not instruction.deleted:
+                instruction.deleted = True
+                changed = True
+        return changed
+
+    def drop_unused_pushes(self, instructions: list[Instruction]) -> bool:
+        """Remove immediate values that are dropped without being used. Each
+        statement leaves its value on the results stack, but only the latest one
+        is kept at the end of the frame, a `return` or the end of a loop
+        iteration, and none at a `return` without a value or a `break` or `next`
+        out of the frame. (Values of variables are kept: looking one up can fail.)
+        Nothing may jump in between the value and where it is dropped."""
+        changed = False
+        targets = jump_targets(instructions)
+
+        for i, instruction in enumerate(instructions):
+            if type(instruction.op) is not Immediate:
+                continue
+
+            # Skip over the values pushed after this one
+            j = i + 1
+            while (
+                j < len(instructions)
+                and type(instructions[j].op) in PURE_PUSHES
+                and instructions[j] not in targets
+            ):
+                j += 1
+            following = instructions[j] if j < len(instructions) else END
+            op = following.op
+
+            if (
+                following is END
+                or isinstance(op, EndIteration)
+                or (type(op) is Return and op.with_value)
+            ):
+                dropped = j > i + 1
+            else:
+                dropped = type(op) is Return or type(op) in (Break, Next)
+
+            if dropped:
+                instruction.deleted = True
+                changed = True
+
+        return changed
+
+    def park_spin_loops(
+        self, instructions: list[Instruction], shadowed: frozenset[str]
+    ) -> bool:
+        """Replace the EndIteration of each loop that does nothing but check the
+        state of the probot -- through state builtins, arguments, locals and
+        constants -- and maybe wait, with ParkIteration. Nothing else can
+        change what such a loop checks, so checking again before the probot
+        changes would be wasted."""
+        if not self.state_builtins:
+            return False
+
+        changed = False
+        index = {id(instruction): i for i, instruction in enumerate(instructions)}
+        index[id(END)] = len(instructions)
+
+        for i, instruction in enumerate(instructions[:-2]):
+            # A loop ends with EndIteration, a jump back to its start and ExitLoop
+            jump, exit = instructions[i + 1], instructions[i + 2]
+            if (
+                type(instruction.op) is not EndIteration
+                or type(jump.op) is not Jump
+                or type(exit.op) is not ExitLoop
+            ):
+                continue
+
+            start = index[id(jump.target)]
+            if start < 1 or type(instructions[start - 1].op) is not EnterLoop:
+                continue
+
+            if self.only_checks_state(instructions, start, i + 2, index, shadowed):
+                instruction.op = ParkIteration()
+                changed = True
+
+        return changed
+
+    def only_checks_state(
+        self,
+        instructions: list[Instruction],
+        start: int,
+        end: int,
+        index: dict[int, int],
+        shadowed: frozenset[str],
+    ) -> bool:
+        """Whether the instructions from start up to the end of the loop (at
+        end) have no effect other than waiting, and only depend on the state
+        of the probot"""
+        builtins = self.state_builtins | self.wait_builtins
+
+        def is_builtin(instruction: Instruction) -> bool:
+            op = instruction.op
+            if type(op) is GetGlobal:
+                return op.name in builtins
+            return type(op) is GetValue and op.name in builtins - shadowed
+
+        def is_state(i: int) -> bool:
+            """Whether the builtin at i is used only for the probot's state"""
+            properties = self.state_properties.get(instructions[i].op.name, None)
+            if properties is None:
+                return True
+            # Only as the target of a property that is the probot's state
+            property, get = instructions[i + 1], instructions[i + 2]
+            return (
+                type(property.op) is Property
+                and property.op.name in properties
+                and type(get.op) is GetProperty
+            )
+
+        for i in range(start, end - 2):
+            instruction = instructions[i]
+            op = instruction.op
+            cls = type(op)
+
+            if cls is Immediate:
+                if op.value.is_block:
+                    return False
+            elif cls is GetValue:
+                # An argument, or a builtin
+                if op.name not in shadowed and not (
+                    is_builtin(instruction) and is_state(i)
+                ):
+                    return False
+            elif cls is GetGlobal:
+                if not (is_builtin(instruction) and is_state(i)):
+                    return False
+            elif cls is Call:
+                if op.num_args != 0 or not is_builtin(instructions[i - 1]):
+                    return False
+            elif cls in (Jump, JumpIf, Catch):
+                if not all(
+                    start <= index[id(target)] <= end
+                    for target in successors(instruction)
+                ):
+                    return False
+            elif not (
+                cls in (GetLocal, Property, GetProperty, LogicalNot)
+                or isinstance(op, BinaryOperator)
+            ):
+                return False
+
+        return True
+
+    def fuse_superinstructions(self, instructions: list[Instruction]) -> bool:
+        """Replace common sequences of operations with the superinstructions that
+        do the same in one operation (see superinstructions.py). Only the first
+        operation of a sequence can be jumped to. (Jumps to the GetGlobal of a
+        call go to its first argument instead, which is the same, since the
+        CallNamed looks up the function.)
+
+        This is the last pass, since the others only know the operations it
+        replaces."""
+        changed = False
+        targets = jump_targets(instructions)
+
+        def fusible(sequence: list[Instruction]) -> bool:
+            return not any(instruction.deleted for instruction in sequence) and not any(
+                instruction in targets for instruction in sequence[1:]
+            )
+
+        for i, instruction in enumerate(instructions):
+            op = instruction.op
+            cls = type(op)
+
+            if cls is Call and i >= op.num_args + 1:
+                # The function is a global, and each argument is pushed by a
+                # single operation that has no other effect
+                function = instructions[i - op.num_args - 1]
+                arguments = instructions[i - op.num_args : i]
+                if (
+                    type(function.op) is GetGlobal
+                    and all(type(arg.op) in PURE_PUSHES for arg in arguments)
+                    and fusible([function, *arguments, instruction])
+                ):
+                    instruction.op = CallNamed(function.op.name, op.num_args, op.local)
+                    function.deleted = True
+                    changed = True
+
+            elif cls is GetProperty and i >= 2:
+                target, property = instructions[i - 2], instructions[i - 1]
+                if (
+                    type(target.op) is GetGlobal
+                    and type(property.op) is Property
+                    and fusible([target, property, instruction])
+                ):
+                    target.op = LoadProperty(target.op.name, property.op.name)
+                    property.deleted = instruction.deleted = True
+                    changed = True
+
+            elif cls is JumpIf and i >= 1:
+                comparison = instructions[i - 1]
+                if type(comparison.op) in COMPARISON_OF and fusible(
+                    [comparison, instruction]
+                ):
+                    comparison.op = CompareJump.fusing(comparison.op, op)
+                    comparison.target = instruction.target
+                    instruction.deleted = True
+                    changed = True
+
+        return changed
+
+
+def immediate_scalar(instruction: Instruction) -> Optional[Primitive]:
+    """The value of an Immediate instruction, if it is one that can be computed
+    with at compile time"""
+    op = instruction.op
+    if (
+        not instruction.deleted
+        and type(op) is Immediate
+        and op.value.type in SCALAR_TYPES
+    ):
+        return op.value
+    return None
+
+
+def falls_through(op: Operation) -> bool:
+    """Whether execution can continue with the next operation after this one"""
+    if isinstance(op, (JumpIf, Catch)):
+        return True
+    return not isinstance(op, (Jump, Return, Break, Next))
+
+
+def successors(instruction: Instruction) -> list[Instruction]:
+    """The instructions that can be jumped to from the instruction (not
+    including the next instruction)"""
+    if instruction.target is not None:
+        return [instruction.target]
+    return list(instruction.catches.values())
+
+
+def jump_targets(instructions: list[Instruction]) -> set[Instruction]:
+    return {
+        target
+        for instruction in instructions
+        if not instruction.deleted
+        for target in successors(instruction)
+    }
+
+
+def final_target(target: Instruction) -> Instruction:
+    """Follow a chain of unconditional jumps to where it ends up"""
+    seen = {target}
+    while type(target.op) is Jump and not target.deleted:
+        following = target.target
+        if following is None or following in seen:
+            break  # An infinite loop, leave it be
+        seen.add(following)
+        target = following
+    return target
+
+
+def decode(
+    operations: Sequence[Operation], source_map: Optional[SourceMap] = None
+) -> list[Instruction]:
+    instructions = [Instruction(op) for op in operations]
+
+    if source_map is not None:
+        position = None
+        runs = iter(source_map)
+        run = next(runs, None)
+        for i, instruction in enumerate(instructions):
+            while run is not None and run[0] <= i:
+                position = run[1:]
+                run = next(runs, None)
+            instruction.position = position
+
+    def at(index: int) -> Instruction:
+        if index == len(instructions):
+            return END
+        return instructions[index]
+
+    for i, instruction in enumerate(instructions):
+        op = instruction.op
+        if isinstance(op, Catch):
+            # Catch offsets are relative to the Catch itself (see
+            # ExecutionContext.handle_breakpoint)
+            instruction.catches = {
+                reason: at(i + jump) for reason, jump in op.jumps.items()
+            }
+        elif isinstance(op, Jump):
+            # Jump offsets are relative to the next operation
+            instruction.target = at(i + 1 + op.jump)
+
+    return instructions
+
+
+def compact(instructions: list[Instruction]) -> list[Instruction]:
+    """Remove deleted instructions. Jumps to a deleted instruction go to the
+    next one that remains instead."""
+    following = END
+    for instruction in reversed(instructions):
+        if instruction.deleted:
+            instruction.forward = following
+        else:
+            following = instruction
+
+    def resolve(target: Instruction) -> Instruction:
+        if target.deleted:
+            return target.forward  # type: ignore[return-value]
+        return target
+
+    remaining = [instruction for instruction in instructions if not instruction.deleted]
+    for instruction in remaining:
+        if instruction.target is not None:
+            instruction.target = resolve(instruction.target)
+        instruction.catches = {
+            reason: resolve(target) for reason, target in instruction.catches.items()
+        }
+    return remaining
+
+
+def encode(instructions: list[Instruction]) -> list[Operation]:
+    index = {id(instruction): i for i, instruction in enumerate(instructions)}
+    index[id(END)] = len(instructions)
+
+    operations: list[Operation] = []
+    for i, instruction in enumerate(instructions):
+        op = instruction.op
+        if isinstance(op, Catch):
+            jumps = {
+                reason: index[id(target)] - i
+                for reason, target in instruction.catches.items()
+            }
+            if jumps != op.jumps:
+                op = Catch(jumps)
+        elif isinstance(op, Jump):
+            jump = index[id(instruction.target)] - (i + 1)
+            if jump != op.jump:
+                if type(op) is CompareJump:
+                    op = CompareJump(op.comparison, jump, sense=op.sense)
+                elif type(op) is JumpIf:
+                    op = JumpIf(jump, sense=op.sense)
+                else:
+                    op = Jump(jump)
+        operations.append(op)
+
+    return operations
+
+
+def encode_source_map(instructions: list[Instruction]) -> SourceMap:
+    """The source map of the instructions' positions"""
+    entries = []
+    position = None
+    for i, instruction in enumerate(instructions):
+        if instruction.position is not None and instruction.position != position:
+            position = instruction.position
+            entries.append((i, *position))
+    return SourceMap(entries)
@@ -0,0 +1,582 @@
+"""A hand-written parser for Probotics.
+
+This is an alternative to the tatsu-generated parser, which is a PEG parser with
+backtracking and left recursion -- correct, but slow for the size of programs
+players write. This one tokenizes the source up front (see tokenizer.py) and
+parses expressions by precedence climbing, without backtracking.
+
+It produces a model with the same shape as the tatsu model (the same node class
+names and attributes), so ProboticsCodeGenerator generates identical operations
+from either one. The grammar (probotics-grammar.ebnf) remains the definition of
+the language, including its quirks, which this parser reproduces:
+
+- comparisons bind as tightly as `*` and `/`, so `a + b < c` is `a + (b < c)`
+- `and`, `or` and `not` take everything to their right: `not a and b` is
+  `not (a and b)`, and `a and b or c` is `a and (b or c)`
+- keywords can be used as symbol names wherever a value is expected
+- end-of-line comments are only allowed where a statement could start
+"""
+
+from typing import Any, Optional, Union
+
+from .tokenizer import ProboticsSyntaxError, Token, TokenKind, tokenize
+
+#
+# Model
+#
+
+
+class ParseNode:
+    __slots__ = ("pos",)
+
+    def __init__(self, pos: int) -> None:
+        # Offset of the first token of the node in the source
+        self.pos = pos
+
+    def children(self) -> list[Any]:
+        return []
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for cls in type(self).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if name != "pos"
+        )
+        return f"{type(self).__name__}({attrs})"
+
+
+class Name(ParseNode):
+    __slots__ = ("name",)
+
+    def __init__(self, pos: int, name: str) -> None:
+        super().__init__(pos)
+        self.name = name
+
+
+class Symbol(ParseNode):
+    """Either a simple Name, or a property reference x.y.z, represented (as in the
+    tatsu model) as a left-nested tuple: ('.', ('.', x, y), z)"""
+
+    __slots__ = ("ast",)
+
+    def __init__(self, pos: int, ast: Union[Name, tuple]) -> None:
+        super().__init__(pos)
+        self.ast = ast
+
+
+class Number(ParseNode):
+    __slots__ = ("ast",)
+
+    def __init__(self, pos: int, ast: tuple[str, str]) -> None:
+        super().__init__(pos)
+        self.ast = ast
+
+
+class String(ParseNode):
+    __slots__ = ("ast",)
+
+    def __init__(self, pos: int, ast: str) -> None:
+        super().__init__(pos)
+        self.ast = ast
+
+
+class Bool(ParseNode):
+    __slots__ = ("ast",)
+
+    def __init__(self, pos: int, ast: str) -> None:
+        super().__init__(pos)
+        self.ast = ast
+
+
+class Null(ParseNode):
+    __slots__ = ()
+
+
+class BinaryNode(ParseNode):
+    __slots__ = ("left", "op", "right")
+
+    def __init__(self, pos: int, left: Any, op: str, right: Any) -> None:
+        super().__init__(pos)
+        self.left = left
+        self.op = op
+        self.right = right
+
+
+class Addition(BinaryNode):
+    __slots__ = ()
+
+
+class Subtraction(BinaryNode):
+    __slots__ = ()
+
+
+class Multiplication(BinaryNode):
+    __slots__ = ()
+
+
+class Division(BinaryNode):
+    __slots__ = ()
+
+
+class Condition(BinaryNode):
+    __slots__ = ()
+
+
+class Logical(BinaryNode):
+    __slots__ = ()
+
+
+class LogicalNot(ParseNode):
+    __slots__ = ("right",)
+
+    def __init__(self, pos: int, right: Any) -> None:
+        super().__init__(pos)
+        self.right = right
+
+
+class Assignable(ParseNode):
+    __slots__ = ("target",)
+
+    def __init__(self, pos: int, target: Any) -> None:
+        super().__init__(pos)
+        self.target = target
+
+    def children(self) -> list[Any]:
+        return [self.target]
+
+
+class Assignment(ParseNode):
+    __slots__ = ("target", "value")
+
+    def __init__(self, pos: int, target: Assignable, value: Any) -> None:
+        super().__init__(pos)
+        self.target = target
+        self.value = value
+
+
+class Index(ParseNode):
+    __slots__ = ("target", "index")
+
+    def __init__(self, pos: int, target: Symbol, index: Any) -> None:
+        super().__init__(pos)
+        self.target = target
+        self.index = index
+
+
+class Call(ParseNode):
+    __slots__ = ("command", "args")
+
+    def __init__(self, pos: int, command: Symbol, args: list[Any]) -> None:
+        super().__init__(pos)
+        self.command = command
+        self.args = args
+
+
+class Block(ParseNode):
+    __slots__ = ("statements",)
+
+    def __init__(self, pos: int, statements: list[Any]) -> None:
+        super().__init__(pos)
+        self.statements = statements
+
+
+class BlockWithArgs(Block):
+    __slots__ = ("arg_names",)
+
+    def __init__(self, pos: int, statements: list[Any], arg_names: list[Name]) -> None:
+        super().__init__(pos, statements)
+        self.arg_names = arg_names
+
+
+class IfStatement(ParseNode):
+    __slots__ = ("condition", "block", "else_chain", "else_block")
+
+    def __init__(
+        self,
+        pos: int,
+        condition: Any,
+        block: Block,
+        else_chain: Optional[list[Any]],
+        else_block: Optional[Block],
+    ) -> None:
+        super().__init__(pos)
+        self.condition = condition
+        self.block = block
+        self.else_chain = else_chain
+        self.else_block = else_block
+
+
+class WhileLoop(ParseNode):
+    __slots__ = ("condition", "block")
+
+    def __init__(self, pos: int, condition: Any, block: Block) -> None:
+        super().__init__(pos)
+        self.condition = condition
+        self.block = block
+
+
+class Return(ParseNode):
+    __slots__ = ("value",)
+
+    def __init__(self, pos: int, value: Any) -> None:
+        super().__init__(pos)
+        self.value = value
+
+
+class Break(ParseNode):
+    __slots__ = ()
+
+
+class Next(ParseNode):
+    __slots__ = ()
+
+
+#
+# Parser
+#
+
+NAME = TokenKind.NAME
+NUMBER = TokenKind.NUMBER
+STRING = TokenKind.STRING
+OP = TokenKind.OP
+COMMENT = TokenKind.COMMENT
+EOF = TokenKind.EOF
+
+BOOLS = {"true", "True", "false", "False"}
+NULLS = {"null", "none", "None"}
+
+# Binary operators, by precedence. Higher binds tighter, and all of them are
+# left-associative. (`and` and `or` are handled separately, see expression())
+BINARY_OPS: dict[str, tuple[int, type[BinaryNode]]] = {
+    "+": (1, Addition),
+    "-": (1, Subtraction),
+    "*": (2, Multiplication),
+    "/": (2, Division),
+    "==": (2, Condition),
+    "===": (2, Condition),
+    "!=": (2, Condition),
+    "!==": (2, Condition),
+    "<": (2, Condition),
+    "<=": (2, Condition),
+    ">": (2, Condition),
+    ">=": (2, Condition),
+}
+# The only binary operator that is a word rather than punctuation
+WORD_BINARY_OPS: dict[str, tuple[int, type[BinaryNode]]] = {"is": (2, Condition)}
+
+LOGICAL_OPS = {"and", "or"}
+
+# Tokens that can start an expression (any name can, since keywords are valid
+# symbol names in an expression)
+EXPRESSION_START = {NAME, NUMBER, STRING}
+
+
+class PrattParser:
+    """Parses Probotics source into a model for ProboticsCodeGenerator. The
+    parser holds no state between parses, so one instance can be shared."""
+
+    def parse(self, input: str, trace: bool = False) -> list[Any]:
+        # (trace is accepted for compatibility with the tatsu parser, and ignored)
+        return _Parse(input).program()
+
+
+class _Parse:
+    """The state of a single parse"""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.tokens = tokenize(source)
+        self.index = 0
+
+    #
+    # Token helpers
+    #
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[self.index + offset]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def at(self, kind: TokenKind, value: str) -> bool:
+        token = self.tokens[self.index]
+        return token.kind is kind and token.value == value
+
+    def accept(self, kind: TokenKind, value: str) -> bool:
+        if self.at(kind, value):
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, kind: TokenKind, value: str) -> Token:
+        if not self.at(kind, value):
+            self.error(f"expecting '{value}'")
+        return self.advance()
+
+    def error(self, message: str, token: Optional[Token] = None) -> None:
+        token = token or self.tokens[self.index]
+        if token.kind is EOF:
+            message = f"{message}, found end of input"
+        else:
+            message = f"{message}, found '{token.value}'"
+        raise ProboticsSyntaxError(message, self.source, token.pos)
+
+    #
+    # Statements
+    #
+
+    def program(self) -> list[Any]:
+        statements = self.statements()
+        if self.peek().kind is not EOF:
+            self.error("expecting statement")
+        return statements
+
+    def statements(self) -> list[Any]:
+        """Statements up to the end of the input or the end of the block"""
+        statements = []
+        while True:
+            token = self.peek()
+            if token.kind is COMMENT:
+                self.index += 1
+            elif token.kind in EXPRESSION_START or (
+                token.kind is OP and token.value == "("
+            ):
+                statements.append(self.statement())
+            else:
+                return statements
+
+    def statement(self) -> Any:
+        token = self.peek()
+        if token.kind is NAME:
+            keyword = token.value
+            if keyword == "if":
+                return self.if_statement()
+            if keyword == "while":
+                return self.while_loop()
+            if keyword == "break":
+                self.index += 1
+                return Break(token.pos)
+            if keyword == "next":
+                self.index += 1
+                return Next(token.pos)
+            if keyword == "return":
+                self.index += 1
+                value = self.expression() if self.can_start_expression() else None
+                return Return(token.pos, value)
+
+        return self.expression()
+
+    def if_statement(self) -> IfStatement:
+        start = self.advance()
+        condition = self.expression()
+        block = self.block()
+
+        else_chain = else_block = None
+        if self.accept(NAME, "else"):
+            if self.at(OP, "{"):
+                else_block = self.block()
+                else_chain = [else_block]
+            elif self.at(NAME, "if"):
+                else_chain = [self.if_statement()]
+            else:
+                self.error("expecting '{' or 'if'")
+
+        return IfStatement(start.pos, condition, block, else_chain, else_block)
+
+    def while_loop(self) -> WhileLoop:
+        start = self.advance()
+        condition = self.expression()
+        return WhileLoop(start.pos, condition, self.block())
+
+    def block(self) -> Block:
+        start = self.expect(OP, "{")
+        statements = self.statements()
+        self.expect(OP, "}")
+        return Block(start.pos, statements)
+
+    def block_with_args(self) -> BlockWithArgs:
+        start = self.expect(OP, "{")
+        self.expect(OP, "(")
+
+        arg_names = [self.name()]
+        while self.accept(OP, ","):
+            arg_names.append(self.name())
+        self.expect(OP, ")")
+
+        statements = self.statements()
+        self.expect(OP, "}")
+        return BlockWithArgs(start.pos, statements, arg_names)
+
+    #
+    # Expressions
+    #
+
+    def can_start_expression(self, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind in EXPRESSION_START or (token.kind is OP and token.value == "(")
+
+    def expression(self) -> Any:
+        token = self.peek()
+
+        assignment = self.assignment()
+        if assignment is not None:
+            return assignment
+
+        if token.kind is NAME and token.value == "not":
+            self.index += 1
+            return LogicalNot(token.pos, self.expression())
+
+        left = self.binary(0)
+
+        # A dangling `and` or `or` (not followed by anything that could be an
+        # expression) is taken to be the symbol of the next statement, as the
+        # tatsu parser does
+        token = self.peek()
+        if (
+            token.kind is NAME
+            and token.value in LOGICAL_OPS
+            and self.can_start_expression(1)
+        ):
+            self.index += 1
+            return Logical(token.pos, left, token.value, self.expression())
+
+        return left
+
+    def assignment(self) -> Optional[Assignment]:
+        """An assignment, if there is one at the current position. Otherwise
+        nothing is consumed."""
+        start = self.peek()
+        if start.kind is not NAME:
+            return None
+
+        # Look ahead past the target to see if it is followed by `:=`
+        index = self.index
+        target = self.assignable()
+        if not self.accept(OP, ":="):
+            self.index = index
+            return None
+
+        value: Any
+        if self.at(OP, "{"):
+            if self.peek(1).kind is OP and self.peek(1).value == "(":
+                value = self.block_with_args()
+            else:
+                value = self.block()
+        else:
+            value = self.expression()
+
+        return Assignment(start.pos, Assignable(start.pos, target), value)
+
+    def assignable(self) -> Union[Index, Symbol]:
+        symbol = self.symbol()
+        if self.at(OP, "["):
+            return self.index_of(symbol)
+        return symbol
+
+    def binary(self, min_precedence: int) -> Any:
+        """Precedence climbing over the arithmetic and comparison operators"""
+        left = self.factor()
+
+        while True:
+            token = self.peek()
+            if token.kind is OP:
+                op = BINARY_OPS.get(token.value, None)
+            elif token.kind is NAME:
+                op = WORD_BINARY_OPS.get(token.value, None)
+                if op is not None and not self.can_start_expression(1):
+                    # Taken as the symbol of the next statement (see expression())
+                    op = None
+            else:
+                op = None
+
+            if op is None or op[0] < min_precedence:
+                return left
+
+            precedence, node_class = op
+            self.index += 1
+            right = self.binary(precedence + 1)
+            left = node_class(token.pos, left, token.value, right)
+
+    def factor(self) -> Any:
+        token = self.peek()
+        kind = token.kind
+
+        if kind is NAME:
+            value = token.value
+            if value in BOOLS:
+                self.index += 1
+                return Bool(token.pos, value)
+            if value in NULLS:
+                self.index += 1
+                return Null(token.pos)
+
+            symbol = self.symbol()
+            if self.at(OP, "("):
+                return self.call(symbol)
+            if self.at(OP, "["):
+                return self.index_of(symbol)
+            return symbol
+
+        if kind is NUMBER:
+            self.index += 1
+            return Number(token.pos, token.groups)  # type: ignore[arg-type]
+
+        if kind is STRING:
+            self.index += 1
+            return String(token.pos, token.value)
+
+        if kind is OP and token.value == "(":
+            self.index += 1
+            expression = self.expression()
+            self.expect(OP, ")")
+            return expression
+
+        self.error("expecting expression")
+
+    def call(self, command: Symbol) -> Call:
+        self.expect(OP, "(")
+
+        args = []
+        if not self.at(OP, ")"):
+            args.append(self.expression())
+            while self.accept(OP, ","):
+                args.append(self.expression())
+        self.expect(OP, ")")
+
+        return Call(command.pos, command, args)
+
+    def index_of(self, target: Symbol) -> Index:
+        self.expect(OP, "[")
+
+        token = self.peek()
+        index: Any
+        if token.kind is NAME:
+            index = self.symbol()
+        elif token.kind is STRING:
+            self.index += 1
+            index = String(token.pos, token.value)
+        elif token.kind is NUMBER:
+            self.index += 1
+            index = Number(token.pos, token.groups)  # type: ignore[arg-type]
+        else:
+            self.error("expecting symbol, string or number")
+
+        self.expect(OP, "]")
+        return Index(target.pos, target, index)
+
+    def symbol(self) -> Symbol:
+        start = self.peek()
+        ast: Union[Name, tuple] = self.name()
+        while self.accept(OP, "."):
+            ast = (".", ast, self.name())
+        return Symbol(start.pos, ast)
+
+    def name(self) -> Name:
+        token = self.peek()
+        if token.kind is not NAME:
+            self.error("expecting name")
+        self.index += 1
+        return Name(token.pos, token.value)
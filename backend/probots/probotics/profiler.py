@@ -0,0 +1,172 @@
+"""Profiling of where a program's operations -- and time -- go.
+
+Profiling is opt-in: a context only profiles while a Profiler is started on it
+(see ExecutionContext.start_profiling), which swaps the loop that executes its
+operations for Profiler.execute. That is the "ops" loop with the counting added,
+so contexts that aren't profiled run exactly as they did.
+
+For each block (or the top level of a program), the profile counts how many
+times each of its operations executed, and how much wall time was spent in the
+block's frames. The time is the block's own: while it calls another block, the
+time goes to that one -- but natives called directly (see Primitive.native) are
+part of their caller's time. When the operations have a source map, the counts
+add up by source line too.
+"""
+
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence
+
+from .ops.all import Control, Operation, SourceMap, StackFrame
+
+if TYPE_CHECKING:
+    from .interpreter import ExecutionContext
+
+
+@dataclass
+class BlockProfile:
+    """What a block's frames executed, while profiled"""
+
+    name: str
+    operations: Sequence[Operation] = field(repr=False)
+    source_map: Optional[SourceMap] = field(default=None, repr=False)
+
+    # How many times each operation executed, by its index
+    counts: list[int] = field(default_factory=list, repr=False)
+
+    # Wall time spent executing the block's own operations
+    seconds: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def lines(self) -> dict[int, int]:
+        """The operations executed, by (zero-based) source line, if known"""
+        by_line: dict[int, int] = {}
+        if self.source_map is None:
+            return by_line
+
+        for index, count in enumerate(self.counts):
+            if count and (location := self.source_map.lookup(index)) is not None:
+                line = location[0]
+                by_line[line] = by_line.get(line, 0) + count
+        return by_line
+
+
+class Profiler:
+    """The profiles of the blocks a context (or several, e.g. all of a player's)
+    executed while profiled, by their operations"""
+
+    blocks: dict[int, BlockProfile]
+
+    def __init__(self) -> None:
+        self.blocks = {}
+
+    def profile_of(self, frame: StackFrame) -> BlockProfile:
+        operations = frame.operations
+        profile = self.blocks.get(id(operations), None)
+        if profile is None:
+            block = frame.block
+            name = block.name if block is not None and block.name else frame.name
+            profile = BlockProfile(
+                name=name, operations=operations, source_map=frame.source_map
+            )
+            self.blocks[id(operations)] = profile
+
+        # (The top level of a program grows, as more of it is compiled)
+        missing = len(operations) - len(profile.counts)
+        if missing > 0:
+            profile.counts.extend([0] * missing)
+        return profile
+
+    def execute(
+        self, context: "ExecutionContext", frame: StackFrame
+    ) -> Optional[StackFrame]:
+        """Execute each operation in turn, counting them (see
+        ExecutionContext.execute_operations, which this mirrors)"""
+        operations = frame.operations
+        profile = self.profile_of(frame)
+        counts = profile.counts
+        quantum = context.quantum or sys.maxsize
+        executed = 0
+        started = time.perf_counter()
+        try:
+            while executed < quantum:
+                index = frame.op_index
+                if index < len(operations):
+                    op = operations[index]
+                    frame.op_index = index + 1
+                    counts[index] += 1
+                    control = op.execute(frame)
+                    executed += 1
+                    if control is None:
+                        continue
+                else:
+                    control = Control.EXIT
+
+                if control is Control.YIELD:
+                    return frame
+
+                now = time.perf_counter()
+                profile.seconds += now - started
+                started = now
+
+                frame = context.transfer(frame, control)
+                if frame is None:
+                    return None
+                operations = frame.operations
+                profile = self.profile_of(frame)
+                counts = profile.counts
+
+            # Used up the quantum: continue from here the next time
+            context.preemptions += 1
+            return frame
+
+        finally:
+            profile.seconds += time.perf_counter() - started
+            context.latest_operations = executed
+            context.total_operations += executed
+
+    @property
+    def total(self) -> int:
+        return sum(profile.total for profile in self.blocks.values())
+
+    @property
+    def seconds(self) -> float:
+        return sum(profile.seconds for profile in self.blocks.values())
+
+    def hottest(self, top: int = 10) -> list[BlockProfile]:
+        """The blocks that executed the most operations"""
+        profiles = [profile for profile in self.blocks.values() if profile.total]
+        return sorted(profiles, key=lambda profile: profile.total, reverse=True)[:top]
+
+    def clear(self) -> None:
+        self.blocks.clear()
+
+    def report(self, top: int = 10) -> str:
+        """The hottest blocks, and the hottest lines in each, as text"""
+        return format_report(
+            ((profile.name, profile) for profile in self.hottest(top)), self.total
+        )
+
+
+def format_report(
+    profiles: Iterable[tuple[str, BlockProfile]], total: int, lines: int = 3
+) -> str:
+    """The profiles (each with the name to show for it) as a table: how many
+    operations each executed, their share of the total, and the time spent --
+    and the lines that executed the most"""
+    rows = [f"{'ops':>10} {'share':>6} {'ms':>9}  block"]
+    for name, profile in profiles:
+        share = profile.total / total if total else 0.0
+        rows.append(
+            f"{profile.total:>10} {share:>6.1%} {profile.seconds * 1000:>9.1f}  {name}"
+        )
+        by_line = sorted(profile.lines().items(), key=lambda item: item[1], reverse=True)
+        for line, count in by_line[:lines]:
+            rows.append(f"{count:>10} {'':>6} {'':>9}    line {line + 1}")
+    if len(rows) == 1:
+        rows.append("(nothing profiled)")
+    return "\n".join(rows)
@@ -0,0 +1,264 @@
+"""Serialized form of compiled operations, so that compiled programs can be stored
+(see ProboticsCompiler.store) and loaded without parsing them again.
+
+The operations are encoded as compact JSON, compressed:
+
+    [BYTECODE_FORMAT, [[opcode, arg, ...], ...], source_map]
+
+where the opcode is the index of the operation's class in OPCODES, and the args
+are the values of its FIELDS, in the order its constructor takes them. Immediate
+values are encoded as [type, value], and blocks as
+["block", name, arg_names, num_slots, operations, source_map]. Source maps (of
+the top level, and of blocks) are flat lists of [index, line, col, ...], or null.
+"""
+
+import json
+import zlib
+from typing import Any, Optional, Protocol, Sequence
+
+from .ops.all import (
+    Addition,
+    Assignment,
+    Break,
+    Call,
+    CallNamed,
+    Catch,
+    CompareEqual,
+    CompareGreaterThan,
+    CompareGreaterThanOrEqual,
+    CompareJump,
+    CompareLessThan,
+    CompareLessThanOrEqual,
+    CompareNotEqual,
+    Division,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
+    GetIndex,
+    GetLocal,
+    GetProperty,
+    GetValue,
+    Immediate,
+    Index,
+    Jump,
+    JumpIf,
+    LoadProperty,
+    LogicalAnd,
+    LogicalNot,
+    LogicalOr,
+    MappedOperations,
+    MaybeCall,
+    Multiplication,
+    Next,
+    Operation,
+    ParkIteration,
+    Primitive,
+    PrimitiveType,
+    Property,
+    Return,
+    SetGlobal,
+    SetLocal,
+    SourceMap,
+    Subtraction,
+    TailCall,
+    source_map_of,
+)
+
+# Version of the encoding. Stored bytecode in any other format is not loaded
+BYTECODE_FORMAT = 2
+
+# The operations that can be serialized. Only append to this list -- the index
+# of each class is its opcode
+OPCODES: tuple[type[Operation], ...] = (
+    Immediate,
+    GetValue,
+    GetLocal,
+    GetGlobal,
+    Assignment,
+    SetLocal,
+    SetGlobal,
+    Addition,
+    Subtraction,
+    Multiplication,
+    Division,
+    CompareEqual,
+    CompareNotEqual,
+    CompareLessThan,
+    CompareLessThanOrEqual,
+    CompareGreaterThan,
+    CompareGreaterThanOrEqual,
+    LogicalAnd,
+    LogicalOr,
+    LogicalNot,
+    Property,
+    GetProperty,
+    Index,
+    GetIndex,
+    Call,
+    MaybeCall,
+    Jump,
+    JumpIf,
+    Catch,
+    Return,
+    Break,
+    Next,
+    EnterLoop,
+    EndIteration,
+    ExitLoop,
+    ParkIteration,
+    CallNamed,
+    LoadProperty,
+    CompareJump,
+    TailCall,
+)
+
+# The attributes of each operation that are its constructor arguments, for the
+# operations that have any
+FIELDS: dict[type[Operation], tuple[str, ...]] = {
+    Immediate: ("value",),
+    GetValue: ("name",),
+    GetLocal: ("slot", "name"),
+    GetGlobal: ("name",),
+    SetLocal: ("slot", "name"),
+    SetGlobal: ("name",),
+    Property: ("name",),
+    Call: ("num_args", "local"),
+    Jump: ("jump",),
+    JumpIf: ("jump", "sense"),
+    Catch: ("jumps",),
+    Return: ("with_value",),
+    CallNamed: ("name", "num_args", "local"),
+    LoadProperty: ("name", "property"),
+    CompareJump: ("comparison", "jump", "sense"),
+    TailCall: ("num_args",),
+}
+
+OPCODE_OF = {cls: opcode for opcode, cls in enumerate(OPCODES)}
+
+# Primitive types that are encoded as their plain value
+PLAIN_TYPES = {
+    PrimitiveType.NULL,
+    PrimitiveType.INT,
+    PrimitiveType.FLOAT,
+    PrimitiveType.STRING,
+    PrimitiveType.BOOL,
+    PrimitiveType.SYMBOL,
+}
+
+
+class BytecodeError(ValueError):
+    """The operations can't be serialized, or the data can't be deserialized"""
+
+
+class BytecodeStore(Protocol):
+    """Persistent storage for serialized programs, by the hash of their source
+    and the version of the compiler that compiled them"""
+
+    def load(self, key: str, version: str) -> Optional[bytes]: ...
+
+    def save(self, key: str, version: str, bytecode: bytes) -> None: ...
+
+
+def dumps(operations: Sequence[Operation]) -> bytes:
+    """Serialize the operations"""
+    encoded = [
+        BYTECODE_FORMAT,
+        encode_operations(operations),
+        encode_source_map(source_map_of(operations)),
+    ]
+    text = json.dumps(encoded, separators=(",", ":"))
+    return zlib.compress(text.encode("utf-8"))
+
+
+def loads(bytecode: bytes) -> list[Operation]:
+    """Deserialize operations serialized by dumps()"""
+    try:
+        version, *encoded = json.loads(zlib.decompress(bytecode))
+    except Exception as ex:
+        raise BytecodeError(f"Invalid bytecode: {ex}") from ex
+
+    if version != BYTECODE_FORMAT:
+        raise BytecodeError(f"Unsupported bytecode format: {version}")
+
+    operations, source_map = encoded
+    decoded = decode_operations(operations)
+    if source_map is not None:
+        return MappedOperations(decoded, decode_source_map(source_map))
+    return decoded
+
+
+def encode_operations(operations: Sequence[Operation]) -> list[list[Any]]:
+    return [encode_operation(op) for op in operations]
+
+
+def encode_operation(op: Operation) -> list[Any]:
+    opcode = OPCODE_OF.get(type(op), None)
+    if opcode is None:
+        raise BytecodeError(f"Can't serialize operation: {op!r}")
+
+    args = [getattr(op, name) for name in FIELDS.get(type(op), ())]
+    if type(op) is Immediate:
+        args = [encode_primitive(op.value)]
+    return [opcode, *args]
+
+
+def encode_primitive(value: Primitive) -> list[Any]:
+    if value.type in PLAIN_TYPES:
+        return [value.type.value, value.value]
+
+    if value.is_block:
+        block = value.value
+        return [
+            PrimitiveType.BLOCK.value,
+            block.name,
+            list(block.arg_names),
+            block.num_slots,
+            encode_operations(block.operations),
+            encode_source_map(block.source_map),
+        ]
+
+    raise BytecodeError(f"Can't serialize value: {value!r}")
+
+
+def decode_operations(operations: list[list[Any]]) -> list[Operation]:
+    return [decode_operation(op) for op in operations]
+
+
+def decode_operation(encoded: list[Any]) -> Operation:
+    opcode, *args = encoded
+    try:
+        cls = OPCODES[opcode]
+    except (IndexError, TypeError):
+        raise BytecodeError(f"Unknown opcode: {opcode}")
+
+    if cls is Immediate:
+        return Immediate(decode_primitive(args[0]))
+    return cls(*args)
+
+
+def decode_primitive(encoded: list[Any]) -> Primitive:
+    type = PrimitiveType(encoded[0])
+    if type in PLAIN_TYPES:
+        return Primitive(type, encoded[1])
+
+    _, name, arg_names, num_slots, operations, source_map = encoded
+    return Primitive.block(
+        decode_operations(operations),
+        name=name,
+        arg_names=arg_names,
+        num_slots=num_slots,
+        source_map=decode_source_map(source_map),
+    )
+
+
+def encode_source_map(source_map: Optional[SourceMap]) -> Optional[list[int]]:
+    if source_map is None:
+        return None
+    return [value for entry in source_map for value in entry]
+
+
+def decode_source_map(encoded: Optional[list[int]]) -> Optional[SourceMap]:
+    if encoded is None:
+        return None
+    return SourceMap(zip(encoded[0::3], encoded[1::3], encoded[2::3], strict=True))
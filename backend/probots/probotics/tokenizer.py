@@ -0,0 +1,162 @@
+import bisect
+import re
+from enum import Enum
+from typing import NamedTuple, Optional
+
+
+class TokenKind(str, Enum):
+    NAME = "name"
+    NUMBER = "number"
+    STRING = "string"
+    OP = "op"
+    COMMENT = "comment"
+    EOF = "eof"
+
+
+class Token(NamedTuple):
+    kind: TokenKind
+    value: str
+    pos: int
+
+    # For numbers: the integer and decimal parts
+    groups: Optional[tuple[str, str]] = None
+
+
+class ProboticsSyntaxError(Exception):
+    """Raised when the source can't be tokenized or parsed"""
+
+    def __init__(self, message: str, source: str, pos: int) -> None:
+        self.message = message
+        self.source = source
+        self.line, self.col = line_and_col(source, pos)
+        self.pos = pos
+
+        lines = source.splitlines() or [""]
+        text = lines[min(self.line, len(lines) - 1)]
+        super().__init__(
+            f"({self.line + 1}:{self.col + 1}) {message} :\n{text}\n{' ' * self.col}^"
+        )
+
+    def __reduce__(self):
+        # So that it can be raised in a worker process (see CompilationService)
+        return type(self), (self.message, self.source, self.pos)
+
+
+# Whitespace and /* block comments */ are skipped anywhere, but end-of-line
+# comments are tokens: the grammar only allows them where a statement could be.
+_SKIP = r"(?:\s+|/\*(?s:.*?)\*/)*"
+_SKIP_RE = re.compile(_SKIP)
+
+_TOKEN = re.compile(
+    _SKIP
+    + r"""(?:
+        (?P<comment>(?:\#|//)[^\n]*)
+      | (?P<number>(?P<int>0|[1-9][0-9]*)(?P<frac>\.[0-9]+)?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+      | (?P<op>:=|={2,3}|!={1,2}|<=|>=|[<>+\-*/(){}\[\],.])
+      | (?P<eof>$)
+    )""",
+    re.VERBOSE,
+)
+
+
+def tokenize(source: str) -> list[Token]:
+    """Split the source into tokens. The last token is always EOF."""
+    tokens: list[Token] = []
+    pos = 0
+    match = _TOKEN.match
+    append = tokens.append
+
+    while True:
+        m = match(source, pos)
+        if m is None:
+            # Report the position of the offending character, not the whitespace
+            bad = _SKIP_RE.match(source, pos).end()  # type: ignore[union-attr]
+            raise ProboticsSyntaxError("unexpected character", source, bad)
+
+        kind = m.lastgroup
+        start = m.start(kind)
+
+        if kind == "number":
+            groups = (m.group("int"), m.group("frac") or "")
+            append(Token(TokenKind.NUMBER, m.group(kind), start, groups))
+        elif kind == "eof":
+            append(Token(TokenKind.EOF, "", start))
+            return tokens
+        else:
+            append(Token(TokenKind(kind), m.group(kind), start))
+
+        pos = m.end()
+
+
+def line_and_col(source: str, pos: int) -> tuple[int, int]:
+    """Zero-based line and column of a position in the source"""
+    return locate(line_starts(source), pos)
+
+
+def line_starts(source: str) -> list[int]:
+    """Positions of the start of each line of the source (see locate)"""
+    starts = [0]
+    starts.extend(i + 1 for i, c in enumerate(source) if c == "\n")
+    return starts
+
+
+def locate(starts: list[int], pos: int) -> tuple[int, int]:
+    """Zero-based line and column of a position, given the line starts"""
+    line = bisect.bisect_right(starts, pos) - 1
+    return line, pos - starts[line]
+
+
+OPENING = {"{", "(", "["}
+CLOSING = {"}", ")", "]"}
+
+
+def top_level_chunks(source: str) -> list[str]:
+    """Split the source into chunks of top-level statements, which can each be
+    compiled on their own, such that the concatenation of the operations for the
+    chunks is the same as the operations for the whole source.
+
+    A chunk ends after a block that closes at the top level -- e.g. the typical
+    `name := { ... }` definition -- unless the block is followed by `else`.
+    Nothing can continue a statement after such a block, so the statements on
+    either side are parsed the same way whether or not they are split.
+
+    If the source can't be tokenized, or the brackets don't balance, it is
+    returned as a single chunk (compiling it will report the error).
+    """
+    try:
+        tokens = tokenize(source)
+    except ProboticsSyntaxError:
+        return [source]
+
+    chunks = []
+    start = 0
+    depth = 0
+    block_end = None  # The end of a block that just closed at the top level
+
+    for token in tokens:
+        kind = token.kind
+        if kind is TokenKind.COMMENT:
+            continue
+
+        if block_end is not None:
+            if kind is TokenKind.EOF:
+                break
+            if not (kind is TokenKind.NAME and token.value == "else"):
+                chunks.append(source[start:block_end])
+                start = block_end
+            block_end = None
+
+        if kind is TokenKind.OP:
+            if token.value in OPENING:
+                depth += 1
+            elif token.value in CLOSING:
+                depth -= 1
+                if depth < 0:
+                    return [source]
+                if depth == 0 and token.value == "}":
+                    block_end = token.pos + 1
+
+    chunks.append(source[start:])
+    return [chunk for chunk in (chunk.strip() for chunk in chunks) if chunk]
@@ -1,3 +1,4 @@
 from .game_reset import GameReset
 from .password import Password
+from .profiles import Profiles
 from .spawn_bot import SpawnBot
@@ -3,8 +3,10 @@ from typing import TYPE_CHECKING
 import structlog
 
 from .....models.all import Program, User
-from .....models.game.all import Player, Probot
-from .....probotics.ops.all import Native, Operation, Primitive, ScopeVars, StackFrame
+from .....models.game.all import Probot
+from .....probotics.interpreter import ExecutionContext
+from .....probotics.ops.all import Operation, Primitive, ScopeVars
+from .....probotics.ops.native import get_arg
 from ..base import Builtin
 
 if TYPE_CHECKING:
@@ -15,20 +17,14 @@ LOGGER = structlog.stdlib.get_logger(__name__)
 
 class GameReset(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["game_reset"] = Primitive.block(
-            operations=[Native(inst.game_reset)],
-            name="game_reset",
-            arg_names=["ticks_per_second"],
+        builtins["game_reset"] = Primitive.native(
+            inst.game_reset, name="game_reset", arg_names=["ticks_per_second"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def game_reset(self, frame: StackFrame) -> Primitive:
-        ticks = frame.args.get("ticks_per_second", Primitive.of(None)).value
+    def game_reset(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        ticks = (get_arg(args, 0) or Primitive.of(None)).value
         self.engine.reset_game(ticks_per_sec=ticks)
         return Primitive.of(None)
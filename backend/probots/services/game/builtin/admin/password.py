@@ -5,8 +5,9 @@ import structlog
 from .....app import APP
 from .....db import DB
 from .....models.all import User
-from .....models.game.all import Player
-from .....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from .....probotics.interpreter import ExecutionContext
+from .....probotics.ops.all import Primitive, ScopeVars
+from .....probotics.ops.native import get_arg
 from ..base import Builtin
 
 if TYPE_CHECKING:
@@ -17,22 +18,16 @@ LOGGER = structlog.stdlib.get_logger(__name__)
 
 class Password(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["password"] = Primitive.block(
-            operations=[Native(inst.set_password)],
-            name="password",
-            arg_names=["name", "password"],
+        builtins["password"] = Primitive.native(
+            inst.set_password, name="password", arg_names=["name", "password"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def set_password(self, frame: StackFrame) -> Primitive:
-        name = frame.get("name")
-        password = frame.get("password")
+    def set_password(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        name = get_arg(args, 0)
+        password = get_arg(args, 1)
 
         assert name is not None and name.is_str, "name must be a string"
         assert password is not None and password.is_str, "password must be a string"
@@ -0,0 +1,60 @@
+from typing import TYPE_CHECKING
+
+import structlog
+
+from .....probotics.interpreter import ExecutionContext
+from .....probotics.ops.all import Primitive, ScopeVars
+from .....probotics.profiler import format_report
+from ....message_handlers.terminal_handler import TerminalOutput
+from ..base import Builtin
+
+if TYPE_CHECKING:
+    from ...engine import Engine
+
+LOGGER = structlog.stdlib.get_logger(__name__)
+
+
+class Profiles(Builtin):
+    """`profiles()` prints what the programs of all the players that have been
+    profiled executed: the operations and time of each player, and the hottest
+    blocks of them all"""
+
+    TOP = 10
+
+    @classmethod
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
+
+        builtins["profiles"] = Primitive.native(inst.profiles, name="profiles")
+
+    def profiles(self, context: ExecutionContext, args: list[Primitive]) -> None:
+        profilers = self.engine.programming.profilers
+        total = sum(profiler.total for profiler in profilers.values())
+
+        rows = [f"{'ops':>10} {'share':>6} {'ms':>9}  player"]
+        for name, profiler in sorted(
+            profilers.items(), key=lambda item: item[1].total, reverse=True
+        ):
+            share = profiler.total / total if total else 0.0
+            rows.append(
+                f"{profiler.total:>10} {share:>6.1%} {profiler.seconds * 1000:>9.1f}  "
+                f"{name}"
+            )
+
+        hottest = sorted(
+            (
+                (f"{name}: {profile.name}", profile)
+                for name, profiler in profilers.items()
+                for profile in profiler.hottest(self.TOP)
+            ),
+            key=lambda item: item[1].total,
+            reverse=True,
+        )
+        rows.append("")
+        rows.append(format_report(hottest[: self.TOP], total))
+
+        output = TerminalOutput(output="\n".join(rows))
+        self.engine.send_to_player(
+            self.player_of(context), "terminal", "output", output.as_msg()
+        )
+        return None
@@ -1,11 +1,15 @@
-from typing import TYPE_CHECKING
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Sequence
 
 import structlog
 
 from .....app import APP
 from .....models.all import Program, User
 from .....models.game.all import Player, Probot
-from .....probotics.ops.all import Native, Operation, Primitive, ScopeVars, StackFrame
+from .....probotics.interpreter import ExecutionContext
+from .....probotics.ops.all import Operation, Primitive, ScopeVars
+from .....probotics.ops.native import get_arg
+from ....message_handlers.terminal_handler import TerminalOutput
 from ..base import Builtin
 
 if TYPE_CHECKING:
@@ -16,25 +20,18 @@ LOGGER = structlog.stdlib.get_logger(__name__)
 
 class SpawnBot(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["spawn_bot"] = Primitive.block(
-            operations=[Native(inst.spawn_bot)],
-            name="spawn_bot",
-            arg_names=["name", "profile", "other"],
+        builtins["spawn_bot"] = Primitive.native(
+            inst.spawn_bot, name="spawn_bot", arg_names=["name", "profile", "other"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def spawn_bot(self, frame: StackFrame) -> Primitive:
+    def spawn_bot(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
         """Create a new player that runs as a bot"""
-        name = frame.get("name")
-        profile = frame.get("profile")
-        other = frame.get("other")
-        colors = frame.get("colors")
+        name = get_arg(args, 0)
+        profile = get_arg(args, 1)
+        other = get_arg(args, 2)
 
         assert name is not None and name.is_str, "name must be a string"
         assert profile is not None and profile.is_str, "profile must be a string"
@@ -43,7 +40,8 @@ class SpawnBot(Builtin):
         if self.engine.get_player(name.value):
             raise ValueError(f"Player {name.value} already exists")
 
-        ops = self.load_profile(profile.value)
+        spawner = self.player_of(context)
+        compiling = self.load_profile(profile.value)
 
         other_dict: ScopeVars = other.value if other else ScopeVars()
 
@@ -58,14 +56,22 @@ class SpawnBot(Builtin):
             colors=color_scheme,
             score=0,
         )
-        self.engine.add_player(player, start_ops=ops)
+        self.engine.add_player(player)
 
         probot = self.engine.spawn_probot(player)
 
+        # The bot's program starts once it is compiled
+        self.engine.programming.when_compiled(
+            compiling,
+            on_compiled=lambda ops: self.engine.set_player_startup(player, ops),
+            on_error=lambda ex: self.on_profile_error(spawner, profile.value, ex),
+        )
+
         return Primitive.of(None)
 
-    def load_profile(self, profile: str) -> list[Operation]:
-        """Load the profile for the bot"""
+    def load_profile(self, profile: str) -> Future[Sequence[Operation]]:
+        """Load the profile for the bot, and start compiling it -- off the game
+        thread, which is running this"""
         LOGGER.info("Loading profile", profile=profile)
 
         with APP.app_context():
@@ -74,5 +80,9 @@ class SpawnBot(Builtin):
             program = user.current_program
             assert program is not None, f"User {profile} has no program"
 
-        ops = self.engine.programming.compile(program.content)
-        return ops
+        return self.engine.programming.compile_async(program.content, persist=True)
+
+    def on_profile_error(self, spawner: Player, profile: str, ex: Exception) -> None:
+        LOGGER.info("Profile not compiled", profile=profile, ex=ex)
+        output = TerminalOutput(output=f"Error in profile {profile}: {ex}")
+        self.engine.send_to_player(spawner, "terminal", "output", output.as_msg())
@@ -6,6 +6,8 @@ from .me import Me
 from .movement import IsIdle, Move, Turn, Wait
 from .players import Players
 from .print import Print
+from .profile import Profile
 from .random import Random
 from .say import Say
 from .types import NewList, NewObject, ToInt, ToStr, Length
+from .waiting import WaitFor, WaitUntil
@@ -1,15 +1,25 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from ....models.game.player import Player
+from ....models.game.probot import Probot
+from ....probotics.interpreter import ExecutionContext
 
 if TYPE_CHECKING:
     from ..engine import Engine
 
 
 class Builtin:
-    player: Player
+    """Base class for builtins. The builtins are shared by every player, so they
+    act on the player whose context calls them (its owner)"""
+
     engine: "Engine"
 
-    def __init__(self, player: Player, engine: "Engine") -> None:
-        self.player = player
+    def __init__(self, engine: "Engine") -> None:
         self.engine = engine
+
+    @staticmethod
+    def player_of(context: ExecutionContext) -> Player:
+        return context.owner
+
+    def probot_of(self, context: ExecutionContext) -> Optional[Probot]:
+        return self.engine.probot_for_player(context.owner)
@@ -2,8 +2,8 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.all import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
 from .base import Builtin
 
 if TYPE_CHECKING:
@@ -14,20 +14,14 @@ LOGGER = structlog.get_logger(__name__)
 
 class Collect(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["collect"] = Primitive.block(
-            operations=[Native(inst.collect)], name="collect", arg_names=[]
-        )
+        builtins["collect"] = Primitive.native(inst.collect, name="collect")
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def collect(self, frame: StackFrame) -> Primitive:
+    def collect(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
         bonus = 200
 
-        probot = self.engine.probot_for_player(self.player)
+        probot = self.probot_of(context)
         collected = self.engine.energy.collect_crystals(probot, bonus=bonus)
         return Primitive.of(collected)
@@ -2,8 +2,9 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.all import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
 from .base import Builtin
 from .me import enum_string
 
@@ -15,25 +16,21 @@ LOGGER = structlog.get_logger(__name__)
 
 class Inspect(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["inspect"] = Primitive.block(
-            operations=[Native(inst.inspect)], name="inspect", arg_names=["x", "y"]
+        builtins["inspect"] = Primitive.native(
+            inst.inspect, name="inspect", arg_names=["x", "y"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def inspect(self, frame: StackFrame) -> Primitive:
+    def inspect(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
         bonus = 50
 
-        x = frame.get("x")
-        y = frame.get("y")
+        x = get_arg(args, 0)
+        y = get_arg(args, 1)
 
         if x is None or x.is_null:
-            probot = self.engine.probot_for_player(self.player)
+            probot = self.probot_of(context)
             x = Primitive.of(probot.x)
             y = Primitive.of(probot.y)
 
@@ -46,6 +43,6 @@ class Inspect(Builtin):
             y = Primitive.of(probot.y)
 
         result = self.engine.inspection.inspect(x.value, y.value)
-        self.engine.update_score(self.player, bonus)
+        self.engine.update_score(self.player_of(context), bonus)
 
         return result
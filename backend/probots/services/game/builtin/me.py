@@ -28,7 +28,8 @@ class Me(Builtin):
         builtins["me"] = Primitive.of(me.data)
 
     def __init__(self, player: Player, engine: "Engine") -> None:
-        super().__init__(player, engine)
+        super().__init__(engine)
+        self.player = player
 
         self.data = CallbackDict(
             on_get=self.on_get,
@@ -122,7 +123,8 @@ class Me(Builtin):
 
         self.engine.update_score(self.player, 5)
         self.engine.notify_of_player_change(self.player)
-        self.engine.notify_of_probot_change(self.player)
+        if probot := self.engine.probot_for_player(self.player):
+            self.engine.notify_of_probot_change(probot)
 
     def on_delete_color(self, key: str) -> None:
         raise KeyError(f"Not deletable: {key}")
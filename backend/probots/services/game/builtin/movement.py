@@ -2,8 +2,10 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.all import Player, ProbotState
-from ....probotics.ops.all import Breakpoint, Native, Primitive, ScopeVars, StackFrame
+from ....models.game.all import ProbotState
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
 from ..movement import MovementDir
 from .base import Builtin
 
@@ -15,41 +17,39 @@ LOGGER = structlog.get_logger(__name__)
 
 class IsIdle(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        def do_is_idle(frame: StackFrame) -> Primitive:
-            probot = engine.probot_for_player(player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        def do_is_idle(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            probot = engine.probot_for_player(cls.player_of(context))
             return Primitive.of(probot.state == ProbotState.idle)
 
-        builtins["is_idle"] = Primitive.block(
-            operations=[Native(do_is_idle)], name="is_idle", arg_names=[]
-        )
+        builtins["is_idle"] = Primitive.native(do_is_idle, name="is_idle")
 
 
 class Move(Builtin):
+    # Names for the directions, which never change (so can be used by the
+    # compiler's optimizer)
+    CONSTANTS = {
+        "forward": Primitive.of("forward"),
+        "backward": Primitive.of("backward"),
+        "left": Primitive.of("left"),
+        "right": Primitive.of("right"),
+    }
+
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["move"] = Primitive.block(
-            operations=[Native(inst.move)], name="move", arg_names=["dir"]
-        )
+        builtins["move"] = Primitive.native(inst.move, name="move", arg_names=["dir"])
 
         # For convenience:
-        builtins["forward"] = Primitive.of("forward")
-        builtins["backward"] = Primitive.of("backward")
-        builtins["left"] = Primitive.of("left")
-        builtins["right"] = Primitive.of("right")
-
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
+        builtins.update(cls.CONSTANTS)
 
-    def move(self, frame: StackFrame) -> Primitive:
+    def move(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
         dir = "forward"
         bonus = 5
 
-        if frame.args:
-            got = frame.args.get("dir", None)
+        if args:
+            got = get_arg(args, 0)
             if got is not None and not got.is_null:
                 dir = MovementDir(got.value)
 
@@ -61,47 +61,39 @@ class Move(Builtin):
                     case MovementDir.right:
                         bonus = 10
 
-        probot = self.engine.probot_for_player(self.player)
+        probot = self.probot_of(context)
         self.engine.mover.move(probot, dir=dir, bonus=bonus)
 
 
 class Turn(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        def do_turn(frame: StackFrame) -> Primitive:
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        def do_turn(context: ExecutionContext, args: list[Primitive]) -> Primitive:
             bonus = 3
-            dir = frame.args["dir"]
+            dir = args[0]
 
-            probot = engine.probot_for_player(player)
+            probot = engine.probot_for_player(cls.player_of(context))
             engine.mover.turn(probot, dir=dir.value, bonus=bonus)
 
-        builtins["turn"] = Primitive.block(
-            operations=[Native(do_turn)], name="turn", arg_names=["dir"]
-        )
+        builtins["turn"] = Primitive.native(do_turn, name="turn", arg_names=["dir"])
 
 
 class Wait(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
-
-        builtins["wait"] = Primitive.block(
-            operations=[Native(inst.wait)], name="wait", arg_names=["ticks"]
-        )
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
+        builtins["wait"] = Primitive.native(inst.wait, name="wait", arg_names=["ticks"])
 
-    def wait(self, frame: StackFrame) -> Primitive:
+    def wait(self, context: ExecutionContext, args: list[Primitive]) -> None:
         ticks = 1
 
-        if frame.args:
-            got = frame.args.get("ticks", None)
+        if args:
+            got = get_arg(args, 0)
             if got is not None and not got.is_null:
                 ticks = got.value
 
-        # Raise a break exception and stop the interpreter on this context
-        probot = self.engine.probot_for_player(self.player)
+        # Stop the interpreter on this context, until the probot's work resumes it
+        probot = self.probot_of(context)
         self.engine.add_probot_work(probot, self.engine.ensure_not_stopped, delay=ticks)
-        raise Breakpoint(reason="wait", stop=True)
+        context.stop()
@@ -3,8 +3,8 @@ from typing import TYPE_CHECKING, Any, Optional
 
 import structlog
 
-from ....models.game.player import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
 from ...message_handlers.terminal_handler import TerminalOutput
 from ..inspection import InspectionService
 from .base import Builtin
@@ -17,19 +17,13 @@ LOGGER = structlog.get_logger(__name__)
 
 class Players(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["probots"] = Primitive.block(
-            operations=[Native(inst.players)], name="probots", arg_names=[]
-        )
+        builtins["probots"] = Primitive.native(inst.players, name="probots")
         builtins["players"] = builtins["probots"]
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def players(self, frame: StackFrame) -> Primitive:
+    def players(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
         probots = self.engine.probots
         probot_infos = [
             Primitive.of(InspectionService.probot_info(probot)) for probot in probots
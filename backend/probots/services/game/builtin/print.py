@@ -3,8 +3,9 @@ from typing import TYPE_CHECKING, Any, Optional
 
 import structlog
 
-from ....models.game.player import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
 from ...message_handlers.terminal_handler import TerminalOutput
 from .base import Builtin
 
@@ -16,18 +17,18 @@ LOGGER = structlog.get_logger(__name__)
 
 class Print(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        def do_print(frame: StackFrame, player=player) -> Optional[Primitive]:
-            msg = frame.get("what")
-            # LOGGER.info("do_print", player=player, what=msg)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        def do_print(
+            context: ExecutionContext, args: list[Primitive]
+        ) -> Optional[Primitive]:
+            msg = get_arg(args, 0)
+            # LOGGER.info("do_print", player=cls.player_of(context), what=msg)
             engine.send_to_player(
-                player,
+                cls.player_of(context),
                 "terminal",
                 "output",
                 TerminalOutput(output=Primitive.output(msg)).as_msg(),
             )
             return None
 
-        builtins["print"] = Primitive.block(
-            operations=[Native(do_print)], name="print", arg_names=["what"]
-        )
+        builtins["print"] = Primitive.native(do_print, name="print", arg_names=["what"])
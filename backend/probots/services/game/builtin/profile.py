@@ -0,0 +1,50 @@
+from typing import TYPE_CHECKING
+
+import structlog
+
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
+from ...message_handlers.terminal_handler import TerminalOutput
+from .base import Builtin
+
+if TYPE_CHECKING:
+    from ..engine import Engine
+
+LOGGER = structlog.get_logger(__name__)
+
+
+class Profile(Builtin):
+    """`profile(true)` starts profiling the player's programs, and `profile(false)`
+    stops. `profile()` prints the blocks that executed the most operations, and
+    the time they took, to the player's terminal (see Programming.start_profiling)
+    """
+
+    @classmethod
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
+
+        builtins["profile"] = Primitive.native(
+            inst.profile, name="profile", arg_names=["on"]
+        )
+
+    def profile(self, context: ExecutionContext, args: list[Primitive]) -> None:
+        player = self.player_of(context)
+        programming = self.engine.programming
+        on = get_arg(args, 0)
+
+        if on is not None and not on.is_null:
+            if on.is_true:
+                programming.start_profiling(player)
+            else:
+                programming.stop_profiling(player)
+            return None
+
+        profiler = programming.profilers.get(player.name, None)
+        if profiler is None:
+            report = "Nothing profiled: profile(true) starts profiling"
+        else:
+            report = profiler.report()
+        output = TerminalOutput(output=report)
+        self.engine.send_to_player(player, "terminal", "output", output.as_msg())
+        return None
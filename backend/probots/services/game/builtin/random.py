@@ -3,8 +3,9 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.all import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
 from .base import Builtin
 
 if TYPE_CHECKING:
@@ -15,18 +16,14 @@ LOGGER = structlog.get_logger(__name__)
 
 class Random(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["random"] = Primitive.block(
-            operations=[Native(inst.random)], name="random", arg_names=["max"]
+        builtins["random"] = Primitive.native(
+            inst.random, name="random", arg_names=["max"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def random(self, frame: StackFrame) -> Primitive:
-        max = frame.get("max")
+    def random(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        max = get_arg(args, 0)
         result = random.randint(0, max.value if max else 1)
         return Primitive.of(result)
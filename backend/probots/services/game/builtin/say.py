@@ -2,8 +2,9 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.all import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
+from ....probotics.ops.native import get_arg
 from .base import Builtin
 
 if TYPE_CHECKING:
@@ -14,27 +15,23 @@ LOGGER = structlog.get_logger(__name__)
 
 class Say(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["say"] = Primitive.block(
-            operations=[Native(inst.say)], name="say", arg_names=["what", "to_whom"]
+        builtins["say"] = Primitive.native(
+            inst.say, name="say", arg_names=["what", "to_whom"]
         )
 
-    def __init__(self, engine: "Engine", player: Player) -> None:
-        self.engine = engine
-        self.player = player
-
-    def say(self, frame: StackFrame) -> Primitive:
-        what = frame.get("what")
-        to_whom = frame.get("to_whom")
+    def say(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        what = get_arg(args, 0)
+        to_whom = get_arg(args, 1)
 
         if what is None or what.is_null:
             raise ValueError("What to say must be specified")
         if to_whom is None or to_whom.is_null:
             raise ValueError("To whom must be specified")
 
-        probot = self.engine.probot_for_player(self.player)
+        probot = self.probot_of(context)
 
         said = self.engine.saying.say(
             probot, Primitive.output(what), Primitive.output(to_whom)
@@ -2,8 +2,8 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ....models.game.player import Player
-from ....probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
+from ....probotics.interpreter import ExecutionContext
+from ....probotics.ops.all import Primitive, ScopeVars
 from .base import Builtin
 
 if TYPE_CHECKING:
@@ -16,45 +16,39 @@ class ToStr(Builtin):
     """call str() on the argument"""
 
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        def do_str(frame: StackFrame) -> Primitive:
-            value = frame.args["value"]
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        def do_str(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            value = args[0]
             formatted = Primitive.output(value)
             return Primitive.of(formatted)
 
-        builtins["str"] = Primitive.block(
-            operations=[Native(do_str)], name="str", arg_names=["value"]
-        )
+        builtins["str"] = Primitive.native(do_str, name="str", arg_names=["value"])
 
 
 class ToInt(Builtin):
     """call int() on the argument"""
 
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        def do_int(frame: StackFrame) -> Primitive:
-            value = frame.args["value"]
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        def do_int(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            value = args[0]
             formatted = int(value)
             return Primitive.of(formatted)
 
-        builtins["int"] = Primitive.block(
-            operations=[Native(do_int)], name="int", arg_names=["value"]
-        )
+        builtins["int"] = Primitive.native(do_int, name="int", arg_names=["value"])
 
 
 class NewList(Builtin):
     """create a new list"""
 
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["list"] = Primitive.block(
-            operations=[Native(inst.new_list)], name="list", arg_names=[]
-        )
+        builtins["list"] = Primitive.native(inst.new_list, name="list")
 
-    def new_list(self, frame: StackFrame) -> Primitive:
-        new_list = [arg for arg in frame.args.values()]
+    def new_list(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        new_list = list(args)
         return Primitive.of(new_list)
 
 
@@ -62,15 +56,14 @@ class NewObject(Builtin):
     """create a new object"""
 
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["object"] = Primitive.block(
-            operations=[Native(inst.new_object)], name="object", arg_names=[]
-        )
+        builtins["object"] = Primitive.native(inst.new_object, name="object")
 
-    def new_object(self, frame: StackFrame) -> Primitive:
-        new_object = {k: v for k, v in frame.args.items()}
+    def new_object(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        # Named the same as extra arguments to a block (see Call.validate_args)
+        new_object = {f"arg{i + 1}": v for i, v in enumerate(args)}
         return Primitive.of(new_object)
 
 
@@ -78,14 +71,14 @@ class Length(Builtin):
     """return length of a thing"""
 
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["len"] = Primitive.block(
-            operations=[Native(inst.length_of)], name="len", arg_names=["value"]
+        builtins["len"] = Primitive.native(
+            inst.length_of, name="len", arg_names=["value"]
         )
         builtins["length"] = builtins["len"]
 
-    def length_of(self, frame: StackFrame) -> Primitive:
-        value = frame.args["value"]
+    def length_of(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        value = args[0]
         return Primitive.of(len(value.value))
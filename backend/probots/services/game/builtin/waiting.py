@@ -0,0 +1,97 @@
+from typing import TYPE_CHECKING, Callable
+
+import structlog
+
+from ....models.game.all import Probot, ProbotState
+from ....probotics.codegen import ProboticsCodeGenerator
+from ....probotics.ops.all import (
+    GetValue,
+    Primitive,
+    PrimitiveType,
+    ScopeVars,
+    StackFrame,
+    WaitingCheck,
+)
+from ....probotics.ops.native import waiting_loop
+from .base import Builtin
+
+if TYPE_CHECKING:
+    from ..engine import Engine
+
+LOGGER = structlog.get_logger(__name__)
+
+
+class WaitUntil(Builtin):
+    """`wait_until(condition)` calls the condition (a block) until it returns
+    true. In between, the context is parked, and only checks again once the
+    probot has changed (see Programming.probot_changed) -- or, outside the game,
+    the next time it runs"""
+
+    @classmethod
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
+
+        builtins["wait_until"] = Primitive.block(
+            operations=waiting_loop(
+                WaitingCheck(inst.check),
+                GetValue("condition"),
+                *ProboticsCodeGenerator.call_operations(0),
+            ),
+            name="wait_until",
+            arg_names=["condition"],
+        )
+
+    def check(self, frame: StackFrame) -> Primitive:
+        if frame.pop().is_true:
+            return Primitive.of(True)
+
+        frame.context.park()
+        return Primitive.of(False)
+
+
+class WaitFor(Builtin):
+    """`wait_for(what, amount)` waits until the probot is idle, or has at least
+    the amount of energy or crystals. The context is parked until then, and the
+    condition is checked without running it (see Programming.probot_changed)"""
+
+    CONDITIONS: dict[str, Callable[[Probot, int], bool]] = {
+        "idle": lambda probot, amount: probot.state == ProbotState.idle,
+        "energy": lambda probot, amount: probot.energy >= amount,
+        "crystals": lambda probot, amount: probot.crystals >= amount,
+    }
+
+    @classmethod
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
+
+        builtins["wait_for"] = Primitive.block(
+            operations=waiting_loop(WaitingCheck(inst.check)),
+            name="wait_for",
+            arg_names=["what", "amount"],
+        )
+
+    def check(self, frame: StackFrame) -> Primitive:
+        what = frame.args.get("what", None)
+        amount = frame.args.get("amount", None)
+
+        if what is None or what.is_null:
+            raise ValueError("What to wait for must be specified")
+        condition = self.CONDITIONS.get(what.value, None) if what.is_str else None
+        if condition is None:
+            raise ValueError(
+                f"Can't wait for {what.value}, only: {', '.join(self.CONDITIONS)}"
+            )
+
+        if amount is None or amount.is_null:
+            threshold = 0
+        elif amount.type in (PrimitiveType.INT, PrimitiveType.FLOAT):
+            threshold = amount.value
+        else:
+            raise ValueError(f"Amount to wait for must be a number, not {amount.value}")
+
+        probot = self.probot_of(frame.context)
+        if condition(probot, threshold):
+            return Primitive.of(True)
+
+        frame.context.park(until=lambda: condition(probot, threshold))
+        return Primitive.of(False)
@@ -2,10 +2,10 @@ from typing import TYPE_CHECKING
 
 import structlog
 
-from ...models.all import User
 from ...models.game.player import Player
-from ...probotics.ops.all import Native, Primitive, ScopeVars, StackFrame
-from .builtin.admin.all import GameReset, SpawnBot, Password
+from ...probotics.interpreter import ExecutionContext
+from ...probotics.ops.all import Primitive, ScopeVars
+from .builtin.admin.all import GameReset, SpawnBot, Password, Profiles
 from .builtin.all import (
     Builtin,
     Collect,
@@ -19,12 +19,15 @@ from .builtin.all import (
     NewObject,
     Players,
     Print,
+    Profile,
     Random,
     Say,
     ToInt,
     ToStr,
     Turn,
     Wait,
+    WaitFor,
+    WaitUntil,
 )
 
 if TYPE_CHECKING:
@@ -35,10 +38,21 @@ LOGGER = structlog.get_logger(__name__)
 
 
 class BuiltinsService:
+    """The builtins are shared by every player: the natives act on whichever
+    player's context calls them (see Builtin), so they are only created once.
+    Each player gets a copy of the table, with their own `me` added, and the
+    admin builtins too if the player is an admin."""
+
     def __init__(self, engine: "Engine") -> None:
         self.engine = engine
         self.builtins_per_player: dict[str, ScopeVars] = {}
 
+        self.standard_builtins: ScopeVars = {}
+        self.create_standard_builtins(self.standard_builtins)
+
+        self.admin_builtins: ScopeVars = dict(self.standard_builtins)
+        self.create_admin_builtins(self.admin_builtins)
+
     def get_builtins(self, player: Player) -> ScopeVars:
         if player.name not in self.builtins_per_player:
             self.builtins_per_player[player.name] = self.create_builtins(player)
@@ -46,67 +60,61 @@ class BuiltinsService:
         return self.builtins_per_player[player.name]
 
     def create_builtins(self, player: Player) -> ScopeVars:
-        """Define a new set of built-ins bound to the player"""
-        builtins: ScopeVars = {}
-
-        self.create_standard_builtins(player, builtins)
-
+        """The built-ins for the player: the shared ones, and those bound to the
+        player"""
         user = self.engine.user_for_player(player)
-        if user:
-            if user.admin:
-                self.create_admin_builtins(user, player, builtins)
+        if user and user.admin:
+            builtins = dict(self.admin_builtins)
+        else:
+            builtins = dict(self.standard_builtins)
+
+        Me.add(player, self.engine, builtins)
 
         return builtins
 
-    def create_standard_builtins(self, player: Player, builtins: ScopeVars) -> None:
+    def create_standard_builtins(self, builtins: ScopeVars) -> None:
         # Basic language features
-        Length.add(player, self.engine, builtins)
-        NewList.add(player, self.engine, builtins)
-        NewObject.add(player, self.engine, builtins)
-        Random.add(player, self.engine, builtins)
-        ToInt.add(player, self.engine, builtins)
-        ToStr.add(player, self.engine, builtins)
+        Length.add(self.engine, builtins)
+        NewList.add(self.engine, builtins)
+        NewObject.add(self.engine, builtins)
+        Random.add(self.engine, builtins)
+        ToInt.add(self.engine, builtins)
+        ToStr.add(self.engine, builtins)
 
         # Game-specific built-ins
-        Collect.add(player, self.engine, builtins)
-        Give.add(player, self.engine, builtins)
-        Inspect.add(player, self.engine, builtins)
-        IsIdle.add(player, self.engine, builtins)
-        Me.add(player, self.engine, builtins)
-        Move.add(player, self.engine, builtins)
-        Players.add(player, self.engine, builtins)
-        Print.add(player, self.engine, builtins)
-        Say.add(player, self.engine, builtins)
-        Turn.add(player, self.engine, builtins)
-        Wait.add(player, self.engine, builtins)
+        Collect.add(self.engine, builtins)
+        Give.add(self.engine, builtins)
+        Inspect.add(self.engine, builtins)
+        IsIdle.add(self.engine, builtins)
+        Move.add(self.engine, builtins)
+        Players.add(self.engine, builtins)
+        Print.add(self.engine, builtins)
+        Profile.add(self.engine, builtins)
+        Say.add(self.engine, builtins)
+        Turn.add(self.engine, builtins)
+        Wait.add(self.engine, builtins)
+        WaitFor.add(self.engine, builtins)
+        WaitUntil.add(self.engine, builtins)
 
         # A command to list all the built-ins
-        Builtins.add(player, self.engine, builtins)
+        Builtins.add(self.engine, builtins)
 
-    def create_admin_builtins(
-        self, user: User, player: Player, builtins: ScopeVars
-    ) -> None:
-        GameReset.add(player, self.engine, builtins)
-        Password.add(player, self.engine, builtins)
-        SpawnBot.add(player, self.engine, builtins)
+    def create_admin_builtins(self, builtins: ScopeVars) -> None:
+        GameReset.add(self.engine, builtins)
+        Password.add(self.engine, builtins)
+        Profiles.add(self.engine, builtins)
+        SpawnBot.add(self.engine, builtins)
 
 
 class Builtins(Builtin):
     @classmethod
-    def add(cls, player: Player, engine: "Engine", builtins: ScopeVars) -> None:
-        inst = cls(engine, player, builtins)
+    def add(cls, engine: "Engine", builtins: ScopeVars) -> None:
+        inst = cls(engine)
 
-        builtins["builtins"] = Primitive.block(
-            operations=[Native(inst.list_all)], name="builtins", arg_names=[]
-        )
+        builtins["builtins"] = Primitive.native(inst.list_all, name="builtins")
 
         builtins["commands"] = builtins["builtins"]
 
-    def __init__(self, engine: "Engine", player: Player, builtins: ScopeVars) -> None:
-        self.engine = engine
-        self.player = player
-        self.builtins = builtins
-
-    def list_all(self, frame: StackFrame) -> Primitive:
-        names = sorted(self.builtins.keys())
+    def list_all(self, context: ExecutionContext, args: list[Primitive]) -> Primitive:
+        names = sorted(context.builtins.keys())
         return Primitive.of([Primitive.of(n) for n in names])
@@ -1,7 +1,7 @@
 import queue
 import random
 import threading
-from typing import Callable, Optional, TypeAlias
+from typing import Callable, Optional, Sequence, TypeAlias
 
 import structlog
 
@@ -69,7 +69,7 @@ class Engine:
         self.grid: Grid = Grid.blank(1, 1)
         self.players: list[Player] = []
         self.probots: list[Probot] = []
-        self.player_startup: dict[str, list[Operation]] = {}
+        self.player_startup: dict[str, Sequence[Operation]] = {}
 
         # Helper services
         self.coloring = ColoringService()
@@ -126,6 +126,7 @@ class Engine:
         LOGGER.info("Shutting down game")
         self.stopped = True
         self.processor.stop()
+        self.programming.shutdown()
 
     def pause(self) -> None:
         if self.paused:
@@ -263,7 +264,7 @@ class Engine:
         self,
         player: Player,
         session: Optional[Session] = None,
-        start_ops: Optional[list[Operation]] = None,
+        start_ops: Optional[Sequence[Operation]] = None,
     ) -> None:
         if player in self.players:
             return
@@ -274,12 +275,7 @@ class Engine:
 
         # Schedule work to make it run...
         if start_ops:
-            self.player_startup[player.name] = start_ops
-            self.add_player_work(
-                player,
-                func=self.start_player,
-                delay=10,
-            )
+            self.set_player_startup(player, start_ops)
 
         LOGGER.info(
             "Added player",
@@ -292,6 +288,15 @@ class Engine:
         # Notify all sessions
         self.processor.add_work(self.broadcast_current_state, delay=10)
 
+    def set_player_startup(self, player: Player, start_ops: Sequence[Operation]) -> None:
+        """Set the ops the player runs at startup, and schedule them to run"""
+        self.player_startup[player.name] = start_ops
+        self.add_player_work(
+            player,
+            func=self.start_player,
+            delay=10,
+        )
+
     def start_player(self, player: Player) -> None:
         """Run the startup ops for a player"""
         if player.name not in self.player_startup:
@@ -597,6 +602,9 @@ class Engine:
         """ "Send a message to all sessions about the change in this probot.
         Ideally would send a delta of some sort, but simple/dumb implementation
         is to just send the full probot state"""
+        # Programs that are waiting for the probot to change can check again
+        self.programming.probot_changed(probot)
+
         self.send_broadcast(
             event="update_probot",
             data=probot.as_msg(),
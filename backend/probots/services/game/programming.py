@@ -1,10 +1,17 @@
-from typing import TYPE_CHECKING, Optional
+import os
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
 
 import structlog
 
-from ...models.game.all import Player, ProgramState
+from ...app import APP
+from ...models.all import CompiledProgram
+from ...models.game.all import Player, Probot, ProgramState
+from ...probotics.cache import PROGRAM_CACHE
+from ...probotics.compile_service import CompilationService
 from ...probotics.compiler import ProboticsCompiler
 from ...probotics.interpreter import (
+    DEFAULT_QUANTUM,
     BreakCallback,
     CompleteCallback,
     ExceptionCallback,
@@ -12,8 +19,11 @@ from ...probotics.interpreter import (
     ProboticsInterpreter,
     ResultCallback,
 )
-from ...probotics.ops.all import Immediate, Operation, Primitive, ScopeVars, StackFrame
+from ...probotics.ops.all import Operation, Primitive, ScopeVars, StackFrame
+from ...probotics.optimizer import PeepholeOptimizer
+from ...probotics.profiler import Profiler
 from ..message_handlers.terminal_handler import TerminalOutput
+from .builtin.all import Move
 from .builtins import BuiltinsService
 from .processor import Work
 
@@ -22,6 +32,34 @@ if TYPE_CHECKING:
 
 LOGGER = structlog.get_logger(__name__)
 
+# Builtins that only observe the state of the player's probot, and ones that
+# only wait, for parking loops that wait for the probot to change (see
+# PeepholeOptimizer.park_spin_loops)
+STATE_BUILTINS = ("is_idle", "me")
+WAIT_BUILTINS = ("wait",)
+
+# The properties of `me` that are the probot's, so change only when it does (see
+# Engine.notify_of_probot_change). The rest (e.g. `me.score`, `me.globals`) are the
+# player's
+STATE_PROPERTIES = {"me": ("state", "x", "y", "orientation", "energy", "crystals")}
+
+# How often parked contexts are checked even if their probot hasn't changed,
+# in ticks -- in case a change is missed
+PARK_CHECK_TICKS = 20
+
+
+class StoredPrograms:
+    """Stores compiled programs in the database (see CompiledProgram), for the
+    compiler. Used from the game thread as well as request handlers."""
+
+    def load(self, key: str, version: str) -> Optional[bytes]:
+        with APP.app_context():
+            return CompiledProgram.lookup(key, version)
+
+    def save(self, key: str, version: str, bytecode: bytes) -> None:
+        with APP.app_context():
+            CompiledProgram.store(key, version, bytecode)
+
 
 class Programming:
     """Service that manages code execution in the context of the game.
@@ -35,30 +73,129 @@ class Programming:
 
     def __init__(self, engine: "Engine") -> None:
         self.engine = engine
-        self.compiler = ProboticsCompiler()
+        # The hand-written parser generates the same operations as the tatsu
+        # one, in a fraction of the time. Programs are recompiled on every edit,
+        # so only the top-level statements that changed are compiled again.
+        # Variables are resolved at compile time, so reading an argument or local
+        # is a list index rather than a lookup in each scope. Saved programs are
+        # stored compiled, so they aren't parsed again after a restart. In lean
+        # mode, runtime errors are reported by source line (see SourceMap). Loops
+        # that only wait for the probot to change are parked until it does,
+        # common sequences of operations are fused into superinstructions, and
+        # calls in tail position reuse the caller's frame, so that a bot's main
+        # loop can recurse forever
+        self.compiler = ProboticsCompiler(
+            cache=PROGRAM_CACHE,
+            backend="pratt",
+            incremental=True,
+            optimizer=PeepholeOptimizer(
+                constants=Move.CONSTANTS,
+                state_builtins=STATE_BUILTINS,
+                wait_builtins=WAIT_BUILTINS,
+                superinstructions=True,
+                state_properties=STATE_PROPERTIES,
+            ),
+            resolve=True,
+            store=StoredPrograms(),
+            lean=True,
+            tail_calls=True,
+        )
+
+        # Programs are compiled off the game thread, by a pool of threads -- and
+        # of processes, if configured, so that compiling scales across cores
+        self.compilation = CompilationService(
+            self.compiler,
+            workers=int(os.getenv("PROBOTS_COMPILE_WORKERS", "0")) or None,
+            processes=os.getenv("PROBOTS_COMPILE_PROCESSES", "") == "1",
+        )
         self.interpreter = ProboticsInterpreter()
 
+        # Each turn a player's program gets is at most this many operations, so
+        # that no program can hold up the game thread
+        self.quantum = int(os.getenv("PROBOTS_OP_QUANTUM", "0")) or DEFAULT_QUANTUM
+
+        # Each kind of player's share of the interpreter, relative to the others
+        # (see ProboticsInterpreter): admins, bots (players without a user, e.g.
+        # spawned by spawn_bot) and everyone else
+        self.weights = {
+            "admin": float(os.getenv("PROBOTS_WEIGHT_ADMIN", "1")),
+            "bot": float(os.getenv("PROBOTS_WEIGHT_BOT", "1")),
+            "human": float(os.getenv("PROBOTS_WEIGHT_HUMAN", "1")),
+        }
+
         self.builtins = BuiltinsService(self.engine)
 
         self.player_contexts: dict[str, ExecutionContext] = {}
         self.player_globals: dict[str, ScopeVars] = {}
 
+        # Parked contexts of each player, with what each is waiting for, if it
+        # can be checked without running it (see ExecutionContext.park). And the
+        # players that have a check of their parked contexts scheduled
+        self.parked: dict[str, dict[ExecutionContext, Optional[Callable[[], bool]]]] = {}
+        self.park_checks: set[str] = set()
+
+        # What each player's programs executed while they were profiled (see
+        # start_profiling), and the players being profiled now
+        self.profilers: dict[str, Profiler] = {}
+        self.profiling: set[str] = set()
+
     def reset(self) -> None:
         self.interpreter.stop_all()
         self.interpreter = ProboticsInterpreter()
 
         self.player_contexts.clear()
         self.player_globals.clear()
+        self.parked.clear()
+        self.park_checks.clear()
+        self.profilers.clear()
+        self.profiling.clear()
 
-    def compile(self, code: str) -> list[Operation]:
+    def compile(self, code: str, persist: bool = False) -> Sequence[Operation]:
         """Compile the code into operations -- determine whether it is syntactically
-        valid"""
-        return self.compiler.compile(code)
+        valid. The result may be shared (cached), so it must not be modified.
+
+        Saved programs should be compiled with `persist`, so they are stored
+        compiled, and loaded from the store if they have been compiled before.
+
+        This waits for the program to be compiled by the compilation service, so
+        it must not be used from the game thread -- see compile_async."""
+        return self.compile_async(code, persist=persist).result()
+
+    def compile_async(
+        self, code: str, persist: bool = False
+    ) -> Future[Sequence[Operation]]:
+        """Start compiling the code off the calling thread (see compile)"""
+        return self.compilation.submit(code, persist=persist)
+
+    def when_compiled(
+        self,
+        future: Future[Sequence[Operation]],
+        on_compiled: Callable[[Sequence[Operation]], None],
+        on_error: Callable[[Exception], None],
+    ) -> None:
+        """Call on_compiled with the operations (or on_error with the compile
+        error) on the game thread, once the compile is done. Until then, it is
+        checked once per tick, so the game thread never waits for it"""
+        if not future.done():
+            self.engine.processor.add_work(
+                lambda: self.when_compiled(future, on_compiled, on_error)
+            )
+            return
+
+        try:
+            operations = future.result()
+        except Exception as ex:
+            on_error(ex)
+        else:
+            on_compiled(operations)
+
+    def shutdown(self) -> None:
+        self.compilation.shutdown()
 
     def execute(
         self,
         *,
-        operations: list[Operation],
+        operations: Sequence[Operation],
         player: Player,
         on_result: Optional[ResultCallback] = None,
         on_exception: Optional[ExceptionCallback] = None,
@@ -141,7 +278,7 @@ class Programming:
         self,
         *,
         player: Player,
-        operations: list[Operation],
+        operations: Sequence[Operation],
         on_result: Optional[ResultCallback],
         on_exception: Optional[ExceptionCallback] = None,
         on_break: Optional[BreakCallback] = None,
@@ -150,7 +287,7 @@ class Programming:
         """Create a new execution context for the given player, using the given globals
         as the starting point"""
 
-        return ExecutionContext(
+        context = ExecutionContext(
             operations=operations,
             builtins=self.builtins.get_builtins(player),
             globals=self.get_player_globals(player),
@@ -158,8 +295,51 @@ class Programming:
             on_exception=on_exception,
             on_break=on_break,
             on_complete=on_complete,
+            on_park=lambda context, until: self.park(player, context, until),
             name=f"player:{player.name}",
+            owner=player,
+            quantum=self.quantum,
+            weight=self.weight_for(player),
         )
+        if player.name in self.profiling:
+            context.start_profiling(self.profilers[player.name])
+        return context
+
+    def start_profiling(self, player: Player) -> Profiler:
+        """Profile the player's programs, from scratch: the ones running now, and
+        the ones started until stop_profiling(). Contexts that aren't profiled
+        run without counting anything"""
+        profiler = Profiler()
+        self.profilers[player.name] = profiler
+        self.profiling.add(player.name)
+        for context in self.interpreter.by_name.get(f"player:{player.name}", ()):
+            context.start_profiling(profiler)
+        return profiler
+
+    def stop_profiling(self, player: Player) -> Optional[Profiler]:
+        """Stop profiling the player's programs, keeping what was profiled"""
+        self.profiling.discard(player.name)
+        for context in self.interpreter.by_name.get(f"player:{player.name}", ()):
+            context.stop_profiling()
+        return self.profilers.get(player.name, None)
+
+    def weight_for(self, player: Player) -> float:
+        """The player's share of the interpreter, relative to other players"""
+        user = self.engine.user_for_player(player)
+        if user is None:
+            return self.weights["bot"]
+        if user.admin:
+            return self.weights["admin"]
+        return self.weights["human"]
+
+    def player_shares(self) -> dict[str, float]:
+        """Each running player's share of the interpreter (see
+        ProboticsInterpreter.shares)"""
+        shares = self.interpreter.shares()
+        return {
+            name: shares.get(context, 0.0)
+            for name, context in self.player_contexts.items()
+        }
 
     def ensure_running(self) -> None:
         """Make sure the interpreter is running (has work scheduled)"""
@@ -204,6 +384,53 @@ class Programming:
             self.ensure_running()
             player.program_state = ProgramState.running
 
+    def park(
+        self,
+        player: Player,
+        context: ExecutionContext,
+        until: Optional[Callable[[], bool]],
+    ) -> None:
+        """Keep the context stopped until the player's probot changes (see
+        probot_changed), instead of it checking every turn"""
+        self.parked.setdefault(player.name, {})[context] = until
+        self.schedule_park_check(player)
+
+    def schedule_park_check(self, player: Player) -> None:
+        probot = self.engine.probot_for_player(player)
+        if probot is not None and player.name not in self.park_checks:
+            self.park_checks.add(player.name)
+            self.engine.add_probot_work(probot, self.check_parked, delay=PARK_CHECK_TICKS)
+
+    def check_parked(self, probot: Probot) -> None:
+        """Check the player's parked contexts, in case a change was missed"""
+        self.park_checks.discard(probot.player.name)
+        self.probot_changed(probot)
+        if self.parked.get(probot.player.name, None):
+            self.schedule_park_check(probot.player)
+
+    def probot_changed(self, probot: Probot) -> None:
+        """Resume the player's parked contexts that might be done waiting: those
+        waiting for something that's now true, and those that have to run to
+        check"""
+        parked = self.parked.get(probot.player.name, None)
+        if not parked:
+            return
+
+        resumed = False
+        for context, until in list(parked.items()):
+            if context not in self.interpreter.stopped_contexts:
+                # Resumed some other way, or removed
+                del parked[context]
+            elif until is None or until():
+                del parked[context]
+                self.interpreter.resume(context)
+                resumed = True
+
+        if not parked:
+            del self.parked[probot.player.name]
+        if resumed:
+            self.ensure_running()
+
     def on_break(self, player: Player, context: ExecutionContext) -> None:
         """Called when a break point is hit in the interpreter.
         Since the point of the game is to run the code: award points
@@ -249,32 +476,9 @@ class Programming:
             # )
             return
 
-        try:
-            call = f"{event}()"
-            operations = self.compiler.compile(call)
-
-            # the call op is initially the second operation
-            # - GetValue(event)
-            # - Call()
-            call_op = operations[1]
-            call_op.num_args = len(args)
-
-            # Put the call arguments onto the stack by creating immediate operations
-            # These go after the GetValue(event) op, before the Call op
-            immediate_args = [Immediate(arg_value) for arg_value in args.values()]
-            while immediate_args:
-                arg = immediate_args.pop()
-                operations.insert(1, arg)
-
-        except Exception as ex:
-            LOGGER.exception(
-                "emit_event - failed to compile",
-                name=event,
-                player=player.name,
-                args=args,
-                exception=ex,
-            )
-            return
+        # Build the call directly (no parsing): the arguments are passed as
+        # immediate values, between the GetValue(event) and the Call
+        operations = self.compiler.compile_call(event, list(args.values()))
 
         # LOGGER.debug(
         #    "emit_event - compiled",
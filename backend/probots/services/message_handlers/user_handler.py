@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Sequence
 
 import structlog
 
@@ -73,7 +73,7 @@ class UserHandler(MessageHandler):
 
         content = user.current_program.content if user.current_program else ""
 
-        compiled, error = self.compile(content)
+        compiled, error = self.compile(content, persist=True)
         response = GetProgramResponse(
             program=content,
             compiled=compiled is not None,
@@ -106,7 +106,7 @@ class UserHandler(MessageHandler):
         did_run = False
         error_msg = None
 
-        compiled, error = self.compile(content)
+        compiled, error = self.compile(content, persist=True)
 
         if error and not compiled:
             lines = error.splitlines()
@@ -122,9 +122,11 @@ class UserHandler(MessageHandler):
         )
         dispatcher.send(session, "user", "update_program", response.as_msg())
 
-    def compile(self, content: str) -> tuple[Optional[list[Operation]], Optional[str]]:
+    def compile(
+        self, content: str, persist: bool = False
+    ) -> tuple[Optional[Sequence[Operation]], Optional[str]]:
         try:
-            operations = ENGINE.programming.compile(content)
+            operations = ENGINE.programming.compile(content, persist=persist)
             return operations, None
         except Exception as ex:
             LOGGER.exception("Compilation error", exception=ex)
@@ -133,7 +135,7 @@ class UserHandler(MessageHandler):
     def run(
         self,
         session: Session,
-        compiled: list[Operation],
+        compiled: Sequence[Operation],
         dispatcher: Dispatcher,
         replace_program: bool = True,
         replace_globals: bool = True,
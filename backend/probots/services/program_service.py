@@ -3,7 +3,6 @@ import structlog
 
 from probots.db import DB
 from probots.models.all import BaseSchema, Program, User
-from probots.probotics.compiler import ProboticsCompiler
 
 LOGGER = structlog.get_logger(__name__)
 
@@ -30,15 +29,17 @@ class ProgramService:
     def update_user_program(
         self, user: User, update: UserProgramUpdateRequest
     ) -> UserProgramUpdateResult:
+        # The game engine owns the (shared, cached) compiler
+        from .game.engine import ENGINE
+
         result = UserProgramUpdateResult()
 
         program = user.current_program
         program.content = update.content
 
         if update.parse:
-            compiler = ProboticsCompiler()
             try:
-                compiler.compile(program.content)
+                ENGINE.programming.compile(program.content, persist=True)
                 result.parse_success = True
             except Exception as ex:
                 result.parse_success = False
@@ -46,8 +47,6 @@ class ProgramService:
 
         if update.run and result.parse_success:
             # Pass it to the game engine, if present...
-            from .game.engine import ENGINE
-
             player = ENGINE.player_for_user(user)
             if player:
                 ENGINE.programming.update_player(player, program)
@@ -0,0 +1,217 @@
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from tatsu.exceptions import FailedParse
+
+from probots.probotics.cache import CompiledProgramCache, freeze
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext, ProboticsInterpreter
+from probots.probotics.ops.all import Immediate, Operation, Primitive
+from probots.probotics.tokenizer import ProboticsSyntaxError, top_level_chunks
+
+
+class TestCompiledProgramCache:
+    @pytest.fixture
+    def cache(self) -> CompiledProgramCache:
+        return CompiledProgramCache(max_size=2)
+
+    @pytest.fixture
+    def compiler(self, cache: CompiledProgramCache) -> ProboticsCompiler:
+        return ProboticsCompiler(cache=cache)
+
+    def test_hit_returns_same_operations(
+        self, compiler: ProboticsCompiler, cache: CompiledProgramCache
+    ):
+        first = compiler.compile("a := 1 + 2")
+        second = compiler.compile("a := 1 + 2")
+
+        assert first is second
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_operations_are_frozen(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("foo := { (x)\n  if x { 1 } else { 2 }\n}")
+
+        assert type(ops) is tuple
+        block_op = ops[1]
+        assert isinstance(block_op, Immediate)
+        assert type(block_op.value.value.operations) is tuple
+        with pytest.raises(TypeError, match="does not support item assignment"):
+            block_op.value.value.operations[0] = block_op
+        assert type(block_op.value.value.arg_names) is tuple
+
+    def test_matches_uncached(self, compiler: ProboticsCompiler):
+        source = "foo := { (x)\n  x * 2\n}\nfoo(3)"
+        assert compiler.compile(source) == freeze(compiler.compile_uncached(source))
+
+    def test_eviction(self, compiler: ProboticsCompiler, cache: CompiledProgramCache):
+        compiler.compile("1")
+        compiler.compile("2")
+        compiler.compile("1")  # 1 is now the most recently used
+        compiler.compile("3")  # evicts 2
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.get(cache.key("1")) is not None
+        assert cache.get(cache.key("2")) is None
+
+    def test_failed_compile_not_cached(
+        self, compiler: ProboticsCompiler, cache: CompiledProgramCache
+    ):
+        with pytest.raises(FailedParse, match="expecting"):
+            compiler.compile("a := ")
+        assert len(cache) == 0
+
+    def test_shared_operations_execute(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("foo := { (x)\n  x * 2\n}\nfoo(3)")
+
+        results = []
+        interpreter = ProboticsInterpreter()
+        for _ in range(2):
+            interpreter.add(
+                ExecutionContext(
+                    operations=ops,
+                    on_result=lambda result, context: results.append(result),
+                )
+            )
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(6), Primitive.of(6)]
+
+
+class TestIncrementalCompile:
+    FIXTURES = sorted(Path(__file__).parents[3].joinpath("fixtures").glob("*.probot"))
+
+    @pytest.fixture
+    def cache(self) -> CompiledProgramCache:
+        return CompiledProgramCache()
+
+    @pytest.fixture
+    def compiler(self, cache: CompiledProgramCache) -> ProboticsCompiler:
+        return ProboticsCompiler(cache=cache, backend="pratt", incremental=True)
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            ("", []),
+            ("x := 1\ny := 2", ["x := 1\ny := 2"]),
+            ("a := { 1 }\nb := { (x) x }", ["a := { 1 }", "b := { (x) x }"]),
+            ("if a { 1 }\nelse { 2 }\nb", ["if a { 1 }\nelse { 2 }", "b"]),
+            ("a := { 1 } # one\n# two\nb", ["a := { 1 }", "# one\n# two\nb"]),
+            ("f({ 1 })\nb := { 2 }", ["f({ 1 })\nb := { 2 }"]),
+            ("a := { 1 }}\nb", ["a := { 1 }}\nb"]),
+        ],
+    )
+    def test_top_level_chunks(self, input: str, expected: list[str]):
+        assert top_level_chunks(input) == expected
+
+    @pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.name)
+    def test_matches_full_compile(self, compiler: ProboticsCompiler, path: Path):
+        source = path.read_text()
+        assert compiler.compile(source) == freeze(compiler.compile_uncached(source))
+
+    def test_only_changed_chunks_compiled(
+        self, compiler: ProboticsCompiler, monkeypatch: pytest.MonkeyPatch
+    ):
+        source = "a := { 1 }\nb := { 2 }\nc := { 3 }"
+        compiler.compile(source)
+
+        compiled = []
+        compile_uncached = compiler.compile_uncached
+
+        def spy(input: str, trace: bool = False) -> list[Operation]:
+            compiled.append(input)
+            return compile_uncached(input, trace)
+
+        monkeypatch.setattr(compiler, "compile_uncached", spy)
+
+        ops = compiler.compile(source.replace("{ 2 }", "{ 2 + 2 }"))
+
+        assert compiled == ["b := { 2 + 2 }"]
+        assert ops == freeze(compile_uncached(source.replace("{ 2 }", "{ 2 + 2 }")))
+
+    def test_error_relative_to_program(self, compiler: ProboticsCompiler):
+        with pytest.raises(ProboticsSyntaxError) as error:
+            compiler.compile("a := { 1 }\nb := { 2 + }")
+
+        assert (error.value.line, error.value.col) == (1, 11)
+
+
+class MemoryStore:
+    def __init__(self) -> None:
+        self.programs: dict[tuple[str, str], bytes] = {}
+
+    def load(self, key: str, version: str) -> Optional[bytes]:
+        return self.programs.get((key, version), None)
+
+    def save(self, key: str, version: str, bytecode: bytes) -> None:
+        self.programs[(key, version)] = bytecode
+
+
+class FailingStore:
+    def load(self, key: str, version: str) -> Optional[bytes]:
+        raise RuntimeError("load failed")
+
+    def save(self, key: str, version: str, bytecode: bytes) -> None:
+        raise RuntimeError("save failed")
+
+
+class TestStoredPrograms:
+    SOURCE = "a := { (x) y := x + 1\n y * 2 }\nb := a(1)"
+
+    @pytest.fixture
+    def store(self) -> MemoryStore:
+        return MemoryStore()
+
+    def make_compiler(self, store, **kwargs) -> ProboticsCompiler:
+        return ProboticsCompiler(
+            cache=CompiledProgramCache(), backend="pratt", store=store, **kwargs
+        )
+
+    def spy(self, compiler: ProboticsCompiler, monkeypatch: pytest.MonkeyPatch):
+        compiled = []
+        compile_uncached = compiler.compile_uncached
+
+        def spy(input: str, trace: bool = False) -> list[Operation]:
+            compiled.append(input)
+            return compile_uncached(input, trace)
+
+        monkeypatch.setattr(compiler, "compile_uncached", spy)
+        return compiled
+
+    def test_persisted_program_loaded(
+        self, store: MemoryStore, monkeypatch: pytest.MonkeyPatch
+    ):
+        first = self.make_compiler(store).compile(self.SOURCE, persist=True)
+        assert len(store.programs) == 1
+
+        # e.g. after a restart -- nothing is cached, but the program is stored
+        compiler = self.make_compiler(store)
+        compiled = self.spy(compiler, monkeypatch)
+
+        assert compiler.compile(self.SOURCE, persist=True) == first
+        assert compiled == []
+
+    def test_not_persisted(self, store: MemoryStore):
+        self.make_compiler(store).compile(self.SOURCE)
+
+        assert store.programs == {}
+
+    def test_other_version_compiled(
+        self, store: MemoryStore, monkeypatch: pytest.MonkeyPatch
+    ):
+        self.make_compiler(store).compile(self.SOURCE, persist=True)
+
+        compiler = self.make_compiler(store, resolve=True)
+        compiled = self.spy(compiler, monkeypatch)
+        compiler.compile(self.SOURCE, persist=True)
+
+        assert compiled == [self.SOURCE]
+        assert len(store.programs) == 2
+
+    def test_store_failure_compiled(self):
+        compiler = self.make_compiler(FailingStore())
+        operations = compiler.compile(self.SOURCE, persist=True)
+
+        assert operations == freeze(compiler.compile_uncached(self.SOURCE))
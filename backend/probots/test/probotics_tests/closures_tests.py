@@ -0,0 +1,67 @@
+import pytest
+
+from probots.probotics.closures import HOT_CALLS, find_runs
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext, ProboticsInterpreter
+from probots.probotics.ops.all import Primitive
+
+
+class TestClosures:
+    @pytest.fixture
+    def compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="pratt", lean=True)
+
+    @pytest.fixture
+    def interpreter(self) -> ProboticsInterpreter:
+        return ProboticsInterpreter()
+
+    def test_find_runs(self):
+        ops = ProboticsCompiler().compile("x := 1 + 2\nif x > 2 { 3 }")
+        # Up to and including the jump over the if's body
+        assert find_runs(ops) == [(0, 9)]
+
+    def test_hot_block(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+    ):
+        ops = compiler.compile(
+            "inc := { (x) x + 1 }\ni := 0\n"
+            f"while i < {HOT_CALLS * 2} {{ i := inc(i) }}\ni"
+        )
+        results = []
+        context = ExecutionContext(
+            operations=ops,
+            backend="closures",
+            on_result=lambda result, context: results.append(result),
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(HOT_CALLS * 2)]
+        assert context.globals["inc"].value.code.generated
+
+    def test_error_in_generated_run(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+    ):
+        ops = compiler.compile(
+            "f := { (n) i := 0\n  while i < n {\n    i := i + 1\n"
+            "    x := 1 / (3 - i)\n  }\n}\nf(5)"
+        )
+        errors = []
+        context = ExecutionContext(
+            operations=ops,
+            backend="closures",
+            on_exception=lambda ex, context, frame: errors.append(frame.describe()),
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        # The division, rather than the start of the run it is in
+        assert errors == ["<outer>.f at line 4, col 12"]
+
+    def test_invalid_backend(self):
+        with pytest.raises(ValueError):
+            ExecutionContext(operations=[], backend="jit")
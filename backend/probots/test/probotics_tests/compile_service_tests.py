@@ -0,0 +1,81 @@
+import pickle
+import threading
+from pathlib import Path
+
+import pytest
+
+from probots.probotics.cache import CompiledProgramCache, freeze
+from probots.probotics.compile_service import CompilationService
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.ops.all import Operation
+from probots.probotics.optimizer import PeepholeOptimizer
+from probots.probotics.tokenizer import ProboticsSyntaxError
+
+
+class TestCompilationService:
+    SAMPLE = Path(__file__).parent.joinpath("sample.probot")
+
+    @pytest.fixture
+    def compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(
+            cache=CompiledProgramCache(),
+            backend="pratt",
+            incremental=True,
+            optimizer=PeepholeOptimizer(),
+            resolve=True,
+        )
+
+    @pytest.fixture(params=[False, True], ids=["threads", "processes"])
+    def service(self, request: pytest.FixtureRequest, compiler: ProboticsCompiler):
+        service = CompilationService(compiler, workers=2, processes=request.param)
+        yield service
+        service.shutdown()
+
+    def test_compile(self, service: CompilationService, compiler: ProboticsCompiler):
+        source = self.SAMPLE.read_text()
+        operations = service.submit(source).result()
+
+        assert operations == freeze(compiler.compile_uncached(source))
+        assert compiler.compile(source) is operations
+
+    def test_syntax_error(self, service: CompilationService):
+        future = service.submit("a := { 1 }\nb := { 2 + }")
+
+        with pytest.raises(ProboticsSyntaxError) as error:
+            future.result()
+
+        assert (error.value.line, error.value.col) == (1, 11)
+
+    def test_same_program_compiled_once(
+        self,
+        compiler: ProboticsCompiler,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        service = CompilationService(compiler, workers=4)
+        compiled = []
+        started = threading.Event()
+        compile_uncached = compiler.compile_uncached
+
+        def spy(input: str, trace: bool = False) -> list[Operation]:
+            compiled.append(input)
+            started.wait(timeout=5)
+            return compile_uncached(input, trace)
+
+        monkeypatch.setattr(compiler, "compile_uncached", spy)
+
+        futures = [service.submit("a := 1") for _ in range(4)]
+        started.set()
+
+        assert len({id(future.result()) for future in futures}) == 1
+        assert compiled == ["a := 1"]
+        assert service.pending == {}
+        service.shutdown()
+
+    def test_syntax_error_pickled(self):
+        with pytest.raises(ProboticsSyntaxError) as error:
+            ProboticsCompiler(backend="pratt").compile("a := (1")
+
+        copy = pickle.loads(pickle.dumps(error.value))
+
+        assert str(copy) == str(error.value)
+        assert (copy.line, copy.col) == (error.value.line, error.value.col)
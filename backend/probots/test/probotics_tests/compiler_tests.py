@@ -1,6 +1,16 @@
+from pathlib import Path
+
 import pytest
+import tatsu
 
-from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics import generated_parser
+from probots.probotics.build_parser import GRAMMAR_PATH, grammar_digest
+from probots.probotics.cache import CompiledProgramCache
+from probots.probotics.compiler import (
+    PARSER_BACKENDS,
+    GeneratedParser,
+    ProboticsCompiler,
+)
 from probots.probotics.ops.all import (
     Addition,
     Assignment,
@@ -14,7 +24,12 @@ from probots.probotics.ops.all import (
     CompareLessThanOrEqual,
     CompareNotEqual,
     Division,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
     GetIndex,
+    GetLocal,
     GetProperty,
     GetValue,
     Immediate,
@@ -26,19 +41,24 @@ from probots.probotics.ops.all import (
     LogicalOr,
     MaybeCall,
     Multiplication,
-    Next,
     Operation,
     Primitive,
     Property,
     Return,
+    SetGlobal,
+    SetLocal,
     Subtraction,
+    TailCall,
+    source_map_of,
 )
+from probots.probotics.optimizer import PeepholeOptimizer
+from probots.probotics.tokenizer import ProboticsSyntaxError
 
 
 class TestCompilerPrimitives:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize("input", ["", " ", "\n"])
     def test_empty(self, compiler: ProboticsCompiler, input: str):
@@ -151,9 +171,9 @@ class TestCompilerPrimitives:
 
 
 class TestCompilerArithmetic:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -240,9 +260,9 @@ class TestCompilerArithmetic:
 
 
 class TestConditionals:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -264,9 +284,9 @@ class TestConditionals:
 
 
 class TestLogicals:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -298,9 +318,9 @@ class TestLogicals:
 
 
 class TestBlocks:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -372,61 +392,50 @@ class TestBlocks:
                 "if a { b }",
                 [
                     GetValue("a"),
-                    JumpIf(jump=2, sense=False),
-                    Immediate(Primitive.block([GetValue("b")], name="IfStatement")),
-                    Call(0, local=True),
+                    JumpIf(jump=1, sense=False),
+                    GetValue("b"),
                 ],
             ),
             (
                 "if a { b } else { c }",
                 [
                     GetValue("a"),
-                    JumpIf(jump=3, sense=False),
-                    Immediate(Primitive.block([GetValue("b")], name="IfStatement")),
-                    Call(0, local=True),
-                    Jump(jump=2),
-                    Immediate(Primitive.block([GetValue("c")], name="ElseStatement")),
-                    Call(0, local=True),
+                    JumpIf(jump=2, sense=False),
+                    GetValue("b"),
+                    Jump(jump=1),
+                    GetValue("c"),
                 ],
             ),
             (
                 "if a { b } else if (c) { d } else { e }",
                 [
                     GetValue("a"),
-                    JumpIf(jump=3, sense=False),
-                    Immediate(Primitive.block([GetValue("b")], name="IfStatement")),
-                    Call(0, local=True),
-                    Jump(jump=7),
+                    JumpIf(jump=2, sense=False),
+                    GetValue("b"),
+                    Jump(jump=5),
                     GetValue("c"),
-                    JumpIf(jump=3, sense=False),
-                    Immediate(Primitive.block([GetValue("d")], name="IfStatement")),
-                    Call(0, local=True),
-                    Jump(jump=2),
-                    Immediate(Primitive.block([GetValue("e")], name="ElseStatement")),
-                    Call(0, local=True),
+                    JumpIf(jump=2, sense=False),
+                    GetValue("d"),
+                    Jump(jump=1),
+                    GetValue("e"),
                 ],
             ),
             (
                 "if a { b }\nelse { c }",
                 [
                     GetValue("a"),
-                    JumpIf(jump=3, sense=False),
-                    Immediate(Primitive.block([GetValue("b")], name="IfStatement")),
-                    Call(0, local=True),
-                    Jump(jump=2),
-                    Immediate(Primitive.block([GetValue("c")], name="ElseStatement")),
-                    Call(0, local=True),
+                    JumpIf(jump=2, sense=False),
+                    GetValue("b"),
+                    Jump(jump=1),
+                    GetValue("c"),
                 ],
             ),
             (
                 "if a { return }",
                 [
                     GetValue("a"),
-                    JumpIf(jump=2, sense=False),
-                    Immediate(
-                        Primitive.block([Return(with_value=False)], name="IfStatement")
-                    ),
-                    Call(0, local=True),
+                    JumpIf(jump=1, sense=False),
+                    Return(with_value=False),
                 ],
             ),
         ],
@@ -441,37 +450,27 @@ class TestBlocks:
             (
                 "while true { false }",
                 [
+                    EnterLoop(),
                     Immediate(Primitive.of(True)),
-                    JumpIf(jump=4, sense=False),
-                    Immediate(
-                        Primitive.block(
-                            [Immediate(Primitive.of(False))], name="WhileLoop"
-                        )
-                    ),
-                    Call(0, local=True),
-                    Catch({"break": 2, "next": 1, "wait": 1}),
-                    Jump(jump=-6),
+                    JumpIf(jump=3, sense=False),
+                    Immediate(Primitive.of(False)),
+                    EndIteration(),
+                    Jump(jump=-5),
+                    ExitLoop(),
                 ],
             ),
             (
                 "while a { if b { break } }",
                 [
+                    EnterLoop(),
                     GetValue("a"),
-                    JumpIf(jump=4, sense=False),
-                    Immediate(
-                        Primitive.block(
-                            [
-                                GetValue("b"),
-                                JumpIf(jump=2, sense=False),
-                                Immediate(Primitive.block([Break()], name="IfStatement")),
-                                Call(0, local=True),
-                            ],
-                            name="WhileLoop",
-                        )
-                    ),
-                    Call(0, local=True),
-                    Catch({"break": 2, "next": 1, "wait": 1}),
-                    Jump(jump=-6),
+                    JumpIf(jump=5, sense=False),
+                    GetValue("b"),
+                    JumpIf(jump=1, sense=False),
+                    Jump(jump=2),
+                    EndIteration(),
+                    Jump(jump=-7),
+                    ExitLoop(),
                 ],
             ),
             (
@@ -482,72 +481,85 @@ class TestBlocks:
                     if i == 5 {
                         break
                     }
-                }                   
+                }
                 """,
                 [
                     Immediate(Primitive.symbol("i")),
                     Immediate(Primitive.of(0)),
                     Assignment(),
+                    EnterLoop(),
                     Immediate(Primitive.of(True)),
-                    JumpIf(jump=4, sense=False),
-                    Immediate(
-                        Primitive.block(
-                            [
-                                Immediate(Primitive.symbol("i")),
-                                GetValue("i"),
-                                Immediate(Primitive.of(1)),
-                                Addition(),
-                                Assignment(),
-                                GetValue("i"),
-                                Immediate(Primitive.of(5)),
-                                CompareEqual(),
-                                JumpIf(jump=2, sense=False),
-                                Immediate(Primitive.block([Break()], name="IfStatement")),
-                                Call(0, local=True),
-                            ],
-                            name="WhileLoop",
-                        )
-                    ),
-                    Call(0, local=True),
-                    Catch({"break": 2, "next": 1, "wait": 1}),
-                    Jump(jump=-6),
+                    JumpIf(jump=12, sense=False),
+                    Immediate(Primitive.symbol("i")),
+                    GetValue("i"),
+                    Immediate(Primitive.of(1)),
+                    Addition(),
+                    Assignment(),
+                    GetValue("i"),
+                    Immediate(Primitive.of(5)),
+                    CompareEqual(),
+                    JumpIf(jump=1, sense=False),
+                    Jump(jump=2),
+                    EndIteration(),
+                    Jump(jump=-14),
+                    ExitLoop(),
                 ],
             ),
             (
                 "while true { return 5 }",
                 [
+                    EnterLoop(),
                     Immediate(Primitive.of(True)),
                     JumpIf(jump=4, sense=False),
-                    Immediate(
-                        Primitive.block(
-                            [Immediate(Primitive.of(5)), Return(with_value=True)],
-                            name="WhileLoop",
-                        )
-                    ),
-                    Call(0, local=True),
-                    Catch({"break": 2, "next": 1, "wait": 1}),
+                    Immediate(Primitive.of(5)),
+                    Return(with_value=True),
+                    EndIteration(),
                     Jump(jump=-6),
+                    ExitLoop(),
                 ],
             ),
             (
                 "while true { if false { next } }",
                 [
+                    EnterLoop(),
                     Immediate(Primitive.of(True)),
-                    JumpIf(jump=4, sense=False),
-                    Immediate(
-                        Primitive.block(
-                            [
-                                Immediate(Primitive.of(False)),
-                                JumpIf(jump=2, sense=False),
-                                Immediate(Primitive.block([Next()], name="IfStatement")),
-                                Call(0, local=True),
-                            ],
-                            name="WhileLoop",
-                        )
-                    ),
-                    Call(0, local=True),
-                    Catch({"break": 2, "next": 1, "wait": 1}),
-                    Jump(jump=-6),
+                    JumpIf(jump=5, sense=False),
+                    Immediate(Primitive.of(False)),
+                    JumpIf(jump=1, sense=False),
+                    Jump(jump=0),
+                    EndIteration(),
+                    Jump(jump=-7),
+                    ExitLoop(),
+                ],
+            ),
+            (
+                # A function called in the loop can break out of it
+                "while a { f() }",
+                [
+                    EnterLoop(),
+                    GetValue("a"),
+                    JumpIf(jump=5, sense=False),
+                    GetValue("f"),
+                    Call(0, local=False),
+                    Catch({"return": 1, "wait": 1, "break": 3, "next": 1}),
+                    EndIteration(),
+                    Jump(jump=-7),
+                    ExitLoop(),
+                ],
+            ),
+            (
+                # A block defined in the loop is a separate function
+                "while a { b := { break } }",
+                [
+                    EnterLoop(),
+                    GetValue("a"),
+                    JumpIf(jump=5, sense=False),
+                    Immediate(Primitive.symbol("b")),
+                    Immediate(Primitive.block([Break()], name="b")),
+                    Assignment(),
+                    EndIteration(),
+                    Jump(jump=-7),
+                    ExitLoop(),
                 ],
             ),
         ],
@@ -560,9 +572,9 @@ class TestBlocks:
 
 
 class TestCompilerCalls:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -605,6 +617,22 @@ class TestCompilerCalls:
         ops = compiler.compile(input)
         assert expected == ops
 
+    @pytest.mark.parametrize(
+        "input,name,args",
+        [
+            ("on_wakeup()", "on_wakeup", []),
+            (
+                "on_message('hi', 'joe')",
+                "on_message",
+                [Primitive.of("hi"), Primitive.of("joe")],
+            ),
+        ],
+    )
+    def test_compile_call(
+        self, compiler: ProboticsCompiler, input: str, name: str, args: list[Primitive]
+    ) -> None:
+        assert compiler.compile_call(name, args) == compiler.compile(input)
+
     @pytest.mark.skip("Not implemented yet")
     def test_bare_command_1(self, compiler: ProboticsCompiler):
         ops = compiler.compile("move")
@@ -623,10 +651,53 @@ class TestCompilerCalls:
         ]
 
 
+class TestTailCalls:
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param, tail_calls=True)
+
+    @staticmethod
+    def calls(operations: list[Operation]) -> list[type[Operation]]:
+        """The types of the calls in the first block"""
+        block = next(
+            op.value.value
+            for op in operations
+            if isinstance(op, Immediate) and op.value.is_block
+        )
+        return [type(op) for op in block.operations if isinstance(op, Call)]
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            ("f := { (n) return g(n) }", [TailCall]),
+            ("f := { (n) g(n) }", [TailCall]),
+            ("f := { (n) h(n)\n g(n) }", [Call, TailCall]),
+            ("f := { (n) g(h(n)) }", [Call, TailCall]),
+            ("f := { (n) if n { g(n) } else { h(n) } }", [TailCall, TailCall]),
+            ("f := { (n) if n { return g(n) }\n h(n) }", [TailCall, TailCall]),
+            ("f := { (n) g(n) + 1 }", [Call]),
+            ("f := { (n) x := g(n) }", [Call]),
+            ("f := { (n) while n { return g(n) } }", [Call]),
+        ],
+    )
+    def test_tail_calls(
+        self, compiler: ProboticsCompiler, input: str, expected: list[type[Operation]]
+    ) -> None:
+        assert self.calls(compiler.compile(input)) == expected
+
+    def test_not_at_top_level(self, compiler: ProboticsCompiler) -> None:
+        ops = compiler.compile("g(1)")
+        assert [type(op) for op in ops if isinstance(op, Call)] == [Call]
+
+    def test_off(self) -> None:
+        compiler = ProboticsCompiler(backend="pratt")
+        assert self.calls(compiler.compile("f := { (n) return g(n) }")) == [Call]
+
+
 class TestCompilerObjects:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param)
 
     @pytest.mark.parametrize(
         "input,expected",
@@ -713,3 +784,277 @@ class TestCompilerObjects:
     ):
         ops = compiler.compile(input)
         assert expected == ops
+
+
+class TestResolvedVariables:
+    @pytest.fixture(params=PARSER_BACKENDS)
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend=request.param, resolve=True)
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            (
+                "a := b",
+                [GetGlobal("b"), SetGlobal("a")],
+            ),
+            (
+                "f := { (a, b) c := a + b\n c + d }",
+                [
+                    Immediate(
+                        Primitive.block(
+                            [
+                                GetLocal(0, "a"),
+                                GetLocal(1, "b"),
+                                Addition(),
+                                SetLocal(2, "c"),
+                                GetLocal(2, "c"),
+                                GetGlobal("d"),
+                                Addition(),
+                            ],
+                            name="f",
+                            arg_names=["a", "b"],
+                            num_slots=3,
+                        )
+                    ),
+                    SetGlobal("f"),
+                ],
+            ),
+            (
+                # A local is a local everywhere in the block, not only after it
+                # is assigned
+                "f := { while a { a := b } }",
+                [
+                    Immediate(
+                        Primitive.block(
+                            [
+                                EnterLoop(),
+                                GetLocal(0, "a"),
+                                JumpIf(jump=4, sense=False),
+                                GetGlobal("b"),
+                                SetLocal(0, "a"),
+                                EndIteration(),
+                                Jump(jump=-6),
+                                ExitLoop(),
+                            ],
+                            name="f",
+                            num_slots=1,
+                        )
+                    ),
+                    SetGlobal("f"),
+                ],
+            ),
+            (
+                # Variables of the enclosing block are not visible in a nested one
+                "f := { (a) g := { a }\n arg2 }",
+                [
+                    Immediate(
+                        Primitive.block(
+                            [
+                                Immediate(
+                                    Primitive.block(
+                                        [GetGlobal("a")], name="g", num_slots=0
+                                    )
+                                ),
+                                SetLocal(1, "g"),
+                                GetValue("arg2"),
+                            ],
+                            name="f",
+                            arg_names=["a"],
+                            num_slots=2,
+                        )
+                    ),
+                    SetGlobal("f"),
+                ],
+            ),
+            (
+                "a.b := c",
+                [
+                    GetGlobal("a"),
+                    Property("b"),
+                    GetGlobal("c"),
+                    Assignment(),
+                ],
+            ),
+        ],
+    )
+    def test_resolve(
+        self, compiler: ProboticsCompiler, input: str, expected: list[Operation]
+    ):
+        ops = compiler.compile(input)
+        assert expected == ops
+
+    def test_compile_call(self, compiler: ProboticsCompiler) -> None:
+        args = [Primitive.of(1)]
+        assert compiler.compile_call("on_event", args) == compiler.compile("on_event(1)")
+
+
+class TestGeneratedParser:
+    FIXTURES = sorted(Path(__file__).parents[3].joinpath("fixtures").glob("*.probot"))
+
+    def test_up_to_date(self):
+        assert generated_parser.GRAMMAR_DIGEST == grammar_digest(GRAMMAR_PATH.read_text())
+
+    def test_generated_parser_loaded(self):
+        assert isinstance(ProboticsCompiler().parser, GeneratedParser)
+
+    @pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.name)
+    def test_matches_runtime_grammar(self, path: Path):
+        compiler = ProboticsCompiler()
+        runtime = ProboticsCompiler()
+        runtime.parser = tatsu.compile(runtime.grammar, asmodel=True)
+
+        source = path.read_text()
+        assert compiler.compile(source) == runtime.compile(source)
+
+
+class TestPrattParser:
+    FIXTURES = TestGeneratedParser.FIXTURES
+
+    @pytest.fixture
+    def tatsu_compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="tatsu")
+
+    @pytest.fixture
+    def compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="pratt")
+
+    @pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.name)
+    def test_matches_tatsu(
+        self, compiler: ProboticsCompiler, tatsu_compiler: ProboticsCompiler, path: Path
+    ):
+        source = path.read_text()
+        assert compiler.compile(source) == tatsu_compiler.compile(source)
+
+    @pytest.mark.parametrize(
+        "input",
+        [
+            "a + b < c",
+            "a < b + c",
+            "a * b / c - d",
+            "not a and b",
+            "a and b or c",
+            "a and b := c",
+            "x := y := f(a, b.c) + d[e]",
+            "x := return",
+            "a is",
+            "a and",
+            "01",
+            "a\n(b)",
+            "x := { /* c */ (a) a }",
+            "x := { # c\n (a) a }",
+            "if a { b } else if c { d } else { e }",
+            "return\nx",
+            "while a { b // c\n next }",
+        ],
+    )
+    def test_quirks_match_tatsu(
+        self, compiler: ProboticsCompiler, tatsu_compiler: ProboticsCompiler, input: str
+    ):
+        assert compiler.compile(input) == tatsu_compiler.compile(input)
+
+    @pytest.mark.parametrize(
+        "input, line, col",
+        [
+            ("a := ", 0, 5),
+            ("a # c\n + b", 1, 1),
+            ("f(a,)", 0, 4),
+            ("{ (a + b) }", 0, 0),
+            ("x := 1\ny := a[b + 1]", 1, 9),
+            ("a = b", 0, 2),
+        ],
+    )
+    def test_syntax_error(
+        self, compiler: ProboticsCompiler, input: str, line: int, col: int
+    ):
+        with pytest.raises(ProboticsSyntaxError) as error:
+            compiler.compile(input)
+
+        assert (error.value.line, error.value.col) == (line, col)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            ProboticsCompiler(backend="nope")
+
+class TestLeanCompile:
+    FIXTURES = TestGeneratedParser.FIXTURES
+
+    @pytest.fixture(
+        params=[{}, {"optimizer": PeepholeOptimizer(), "resolve": True}],
+        ids=["plain", "resolved"],
+    )
+    def options(self, request: pytest.FixtureRequest) -> dict:
+        return {"backend": "pratt", **request.param}
+
+    @pytest.fixture
+    def compiler(self, options: dict) -> ProboticsCompiler:
+        return ProboticsCompiler(lean=True, **options)
+
+    @staticmethod
+    def locations(operations) -> list:
+        source_map = source_map_of(operations)
+        return [source_map.lookup(i) for i in range(len(operations))]
+
+    @pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.name)
+    def test_same_operations(self, options: dict, path: Path):
+        source = path.read_text()
+        lean = ProboticsCompiler(lean=True, **options).compile(source)
+
+        assert lean == ProboticsCompiler(**options).compile(source)
+
+    def test_tatsu_same_operations(self):
+        source = "f := { (x) x + 1 }\nf(2)"
+
+        lean = ProboticsCompiler(lean=True).compile(source)
+
+        assert lean == ProboticsCompiler().compile(source)
+
+    def test_source_map(self):
+        compiler = ProboticsCompiler(backend="pratt", lean=True)
+        operations = compiler.compile("a := 1\nb := a + 2")
+
+        assert operations[6] == Addition()
+        assert self.locations(operations) == [
+            (0, 0),
+            (0, 5),
+            (0, 0),
+            (1, 0),
+            (1, 5),
+            (1, 9),
+            (1, 7),
+            (1, 0),
+        ]
+
+    def test_block_source_map(self, compiler: ProboticsCompiler):
+        operations = compiler.compile("f := {\n  x := 1 / y\n}")
+        block = next(op for op in operations if op.value.is_block).value.value
+        division = block.operations.index(Division())
+
+        assert block.source_map.lookup(division) == (1, 9)
+
+    def test_not_lean(self):
+        operations = ProboticsCompiler(backend="pratt").compile("f := { 1 }")
+
+        assert source_map_of(operations) is None
+        assert operations[1].value.value.source_map is None
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "a := { 1 }\nb := { (x)\n  x / 0 }\nb(1)",
+            "a := { 1 } b := { 2 / 0 }\n\nc := { (x) x }",
+        ],
+    )
+    def test_incremental(self, options: dict, source: str):
+        incremental = ProboticsCompiler(
+            lean=True, incremental=True, cache=CompiledProgramCache(), **options
+        )
+        # The chunks are cached, and then reused at different positions
+        incremental.compile(source.replace("\n", "\n\n"))
+        operations = incremental.compile(source)
+        expected = ProboticsCompiler(lean=True, **options).compile(source)
+
+        assert self.locations(operations) == self.locations(expected)
+        for op, expected_op in zip(operations, expected, strict=True):
+            if isinstance(op, Immediate) and op.value.is_block:
+                assert op.value.value.source_map == expected_op.value.value.source_map
@@ -2,36 +2,73 @@ from typing import Optional
 
 import pytest
 
+from probots.probotics.codegen import ProboticsCodeGenerator
 from probots.probotics.compiler import ProboticsCompiler
-from probots.probotics.interpreter import ExecutionContext, ProboticsInterpreter
-from probots.probotics.ops.all import Native, Operation, Primitive, ScopeVars, StackFrame
+from probots.probotics.interpreter import (
+    SLICE_OPERATIONS,
+    ExecutionContext,
+    ProboticsInterpreter,
+)
+from probots.probotics.ops.all import (
+    GetValue,
+    Native,
+    Operation,
+    Primitive,
+    ScopeVars,
+    StackFrame,
+    WaitingCheck,
+)
+from probots.probotics.ops.native import waiting_loop
+from probots.probotics.optimizer import PeepholeOptimizer
 
 
 def make_context(
-    ops: list[Operation], results: list[Primitive], builtins: Optional[ScopeVars] = None
+    ops: list[Operation],
+    results: list[Primitive],
+    builtins: Optional[ScopeVars] = None,
+    backend: str = "ops",
 ) -> ExecutionContext:
     return ExecutionContext(
         operations=ops,
         builtins=builtins,
         on_result=lambda result, context: results.append(result),
+        backend=backend,
     )
 
 
 class TestInterpreter:
-    @pytest.fixture
-    def compiler(self) -> ProboticsCompiler:
-        return ProboticsCompiler()
+    @pytest.fixture(
+        params=[
+            {},
+            {"optimizer": PeepholeOptimizer()},
+            {"resolve": True},
+            {"optimizer": PeepholeOptimizer(superinstructions=True), "resolve": True},
+            {"tail_calls": True},
+            {
+                "optimizer": PeepholeOptimizer(superinstructions=True),
+                "resolve": True,
+                "tail_calls": True,
+            },
+        ],
+        ids=["plain", "optimized", "resolved", "fused", "tail", "tail_fused"],
+    )
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(**request.param)
 
     @pytest.fixture
     def interpreter(self) -> ProboticsInterpreter:
         return ProboticsInterpreter()
 
+    @pytest.fixture(params=["ops", "closures"])
+    def backend(self, request: pytest.FixtureRequest) -> str:
+        return request.param
+
     def test_immediate(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("1")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
         interpreter.execute_next()
 
@@ -39,11 +76,11 @@ class TestInterpreter:
         assert results[0] == Primitive.of(1)
 
     def test_addition(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("1 + 2")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
         interpreter.execute_next()
 
@@ -51,11 +88,11 @@ class TestInterpreter:
         assert results[0] == Primitive.of(3)
 
     def test_arithmetic(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("1 + (2 - 3) / 4 * 5")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
         interpreter.execute_next()
 
@@ -80,10 +117,11 @@ class TestInterpreter:
         interpreter: ProboticsInterpreter,
         input: str,
         expected: Primitive,
+        backend: str,
     ):
         ops = compiler.compile(input)
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
         interpreter.execute_next()
 
@@ -91,11 +129,11 @@ class TestInterpreter:
         assert results[0] == expected
 
     def test_assignment(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("a := 1\n" "b := a + 2\n" "b")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
         interpreter.execute_next()
 
@@ -105,11 +143,11 @@ class TestInterpreter:
         assert context.get("b") == Primitive.of(3)
 
     def test_call_no_return(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("foo := { 2 * 3 }\n" "foo()")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -119,13 +157,13 @@ class TestInterpreter:
         assert results[0] == Primitive.of(6)
 
     def test_call_return(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile(
             "foo := {\n" "    if false { true }\n" "    else { return 5 }\n" "}\n" "foo()"
         )
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -134,7 +172,9 @@ class TestInterpreter:
         assert len(results) == 1
         assert results[0] == Primitive.of(5)
 
-    def test_native(self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter):
+    def test_native(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
         def do_native(frame: StackFrame) -> Primitive:
             return Primitive.of(1 + frame.get("arg1").value)
 
@@ -142,7 +182,7 @@ class TestInterpreter:
 
         ops = compiler.compile("native(1)")
         results = []
-        context = make_context(ops, results, builtins)
+        context = make_context(ops, results, builtins, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -151,12 +191,33 @@ class TestInterpreter:
         assert len(results) == 1
         assert results[0] == Primitive.of(2)
 
+    def test_native_direct(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        def add(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            return Primitive.of(sum(arg.value for arg in args))
+
+        builtins = {"add": Primitive.native(add, name="add", arg_names=["a", "b"])}
+
+        ops = compiler.compile("f := { (x) add(x, 1) }\nadd(f(1), 3)")
+        results = []
+        context = make_context(ops, results, builtins, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(5)]
+
+        # Only the outer frame and `f` had frames
+        assert context.total_frames == 2
+
     def test_if_else(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile("if 1 > 2 { 3 } else { 4 }")
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -166,7 +227,7 @@ class TestInterpreter:
         assert results[0] == Primitive.of(4)
 
     def test_while_break(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile(
             """
@@ -181,7 +242,7 @@ class TestInterpreter:
             """
         )
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -190,8 +251,64 @@ class TestInterpreter:
         assert len(results) == 1
         assert results[0] == Primitive.of(5)
 
+    def test_while_break_in_function(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile(
+            """
+            skip := { (n) if n == 1 { next } }
+            stop := { (n) if n == 3 { break } }
+            i := 0
+            total := 0
+            while true {
+                i := i + 1
+                skip(i)
+                stop(i)
+                total := total + i
+            }
+            total
+            """
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(2)]
+
+    def test_while_in_frame(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile(
+            """
+            i := 0
+            while i < 100 {
+                i := i + 1
+                if i > 50 { next }
+                i
+            }
+            """
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+            # The loop runs in the outer frame, and the values of its statements
+            # don't pile up
+            frame = context.current_frame
+            if frame is not None:
+                assert frame.parent is None
+                assert len(frame.results) <= 3
+
+        assert results == [Primitive.of(100)]
+
     def test_logicals(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         ops = compiler.compile(
             """
@@ -203,7 +320,7 @@ class TestInterpreter:
             """
         )
         results = []
-        context = make_context(ops, results)
+        context = make_context(ops, results, backend=backend)
         interpreter.add(context)
 
         while not interpreter.is_finished:
@@ -213,7 +330,7 @@ class TestInterpreter:
         assert results[0] == Primitive.of(False)
 
     def test_object_property(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         def new_object(frame: StackFrame) -> Primitive:
             return Primitive.of({})
@@ -233,7 +350,7 @@ class TestInterpreter:
         )
         results = []
 
-        context = make_context(ops, results, builtins)
+        context = make_context(ops, results, builtins, backend=backend)
         interpreter.add(context)
         while not interpreter.is_finished:
             interpreter.execute_next()
@@ -242,7 +359,7 @@ class TestInterpreter:
         assert results[0] == Primitive.of(2)
 
     def test_object_index(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         def new_object(frame: StackFrame) -> Primitive:
             return Primitive.of({})
@@ -266,7 +383,7 @@ class TestInterpreter:
         )
         results = []
 
-        context = make_context(ops, results, builtins)
+        context = make_context(ops, results, builtins, backend=backend)
         interpreter.add(context)
         while not interpreter.is_finished:
             interpreter.execute_next()
@@ -275,7 +392,7 @@ class TestInterpreter:
         assert results[0] == Primitive.of([Primitive.of(1)])
 
     def test_str_concat(
-        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
     ):
         def to_str(frame: StackFrame) -> Primitive:
             return Primitive.of(str(frame.get("value").value))
@@ -293,10 +410,523 @@ class TestInterpreter:
         )
         results = []
 
-        context = make_context(ops, results, builtins)
+        context = make_context(ops, results, builtins, backend=backend)
         interpreter.add(context)
         while not interpreter.is_finished:
             interpreter.execute_next()
 
         assert len(results) == 1
         assert results[0] == Primitive.of("hi joe your score is 10")
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            # Assigning to a global that exists updates it
+            ("x := 1\nf := { x := 2 }\nf()\nx", 2),
+            # Otherwise, the variable is local to the function
+            ("f := { y := 2 }\nf()\ny := 3\nf()\ny", 2),
+            # An argument that isn't passed is looked up as a global
+            ("x := 1\nf := { (x) x }\nf()", 1),
+            ("x := 1\nf := { (x) x }\nf(5)", 5),
+            # Extra arguments are passed by name
+            ("f := { (a) a + arg1 + arg2 }\nf(1, 2, 3)", 6),
+            # Recursion gets a separate set of locals for each call
+            (
+                "f := { (n) m := n\n if n > 0 { f(n - 1) }\n m }\nf(3)",
+                3,
+            ),
+        ],
+    )
+    def test_variables(
+        self,
+        compiler: ProboticsCompiler,
+        interpreter: ProboticsInterpreter,
+        input: str,
+        expected: int,
+        backend: str,
+    ):
+        ops = compiler.compile(input)
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results[-1] == Primitive.of(expected)
+
+    def test_assign_builtin(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile("f := { forward := 1 }\nf()")
+        errors = []
+        context = ExecutionContext(
+            operations=ops,
+            backend=backend,
+            builtins={"forward": Primitive.of("forward")},
+            on_exception=lambda ex, context, frame: errors.append(ex),
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert [str(ex) for ex in errors] == ["Cannot assign to builtin: forward"]
+
+    def test_error_location(self, interpreter: ProboticsInterpreter, backend: str):
+        compiler = ProboticsCompiler(backend="pratt", lean=True)
+        ops = compiler.compile("f := { (x)\n  x / 0 }\nf(1)")
+        errors = []
+        context = ExecutionContext(
+            operations=ops,
+            backend=backend,
+            on_exception=lambda ex, context, frame: errors.append(frame.describe()),
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert errors == ["<outer>.f at line 2, col 5"]
+
+    def test_calls_without_yielding(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile(
+            "fib := { (n) if n < 2 { return n }\n fib(n - 1) + fib(n - 2) }\nfib(10)"
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        # Calls and returns are handled in the context's loop, without going
+        # back to the interpreter
+        interpreter.execute_next()
+
+        assert interpreter.is_finished
+        assert results == [Primitive.of(55)]
+        assert context.latest_frames == 178
+
+    def test_native_stop(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        def pause(frame: StackFrame) -> None:
+            frame.context.stop()
+
+        builtins = {"pause": Primitive.block([Native(pause)], name="pause")}
+
+        ops = compiler.compile("x := 1\npause()\nx := 2\nx")
+        results = []
+        context = make_context(ops, results, builtins, backend=backend)
+        interpreter.add(context)
+        interpreter.execute_next()
+
+        assert context.stopped
+        assert context.get("x") == Primitive.of(1)
+
+        interpreter.resume(context)
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(2)]
+
+    def test_native_direct_stop(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        def pause(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            context.stop()
+            return Primitive.of(len(args))
+
+        builtins = {"pause": Primitive.native(pause, name="pause")}
+
+        ops = compiler.compile("x := 1\ny := pause(1, 2)\nx := 2\nx + y")
+        results = []
+        context = make_context(ops, results, builtins, backend=backend)
+        interpreter.add(context)
+        interpreter.execute_next()
+
+        assert context.stopped
+        assert context.get("x") == Primitive.of(1)
+
+        interpreter.resume(context)
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(4)]
+
+    def test_native_shared(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        def whoami(context: ExecutionContext, args: list[Primitive]) -> Primitive:
+            return Primitive.of(context.owner)
+
+        # The same builtins, for contexts with different owners
+        builtins = {"whoami": Primitive.native(whoami, name="whoami")}
+
+        results = []
+        for owner in ("alice", "bob"):
+            context = ExecutionContext(
+                operations=compiler.compile("whoami()"),
+                builtins=builtins,
+                owner=owner,
+                on_result=lambda result, context: results.append(result),
+                backend=backend,
+            )
+            interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert sorted(result.value for result in results) == ["alice", "bob"]
+
+    @pytest.mark.parametrize("resolve", [False, True], ids=["plain", "resolved"])
+    def test_tail_calls(
+        self, interpreter: ProboticsInterpreter, backend: str, resolve: bool
+    ):
+        compiler = ProboticsCompiler(resolve=resolve, tail_calls=True)
+        ops = compiler.compile(
+            """
+            count := { (n, total)
+                if n == 0 { return total }
+                count(n - 1, total + n)
+            }
+            even := { (n) if n == 0 { true } else { odd(n - 1) } }
+            odd := { (n) if n == 0 { false } else { even(n - 1) } }
+            total := count(2000, 0)
+            even(2001)
+            """
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(False)]
+        assert context.get("total") == Primitive.of(2001000)
+
+        # Each call reused its caller's frame, rather than allocating another
+        assert context.total_frames > 4000
+        assert context.frame_pool_misses <= 2
+
+    def test_tail_call_break(self, interpreter: ProboticsInterpreter, backend: str):
+        # A tail call still unwinds to the caller's caller, e.g. to break its loop
+        compiler = ProboticsCompiler(tail_calls=True)
+        ops = compiler.compile(
+            """
+            stop := { break }
+            maybe_stop := { (i) if i == 3 { stop() } }
+            i := 0
+            while true {
+                i := i + 1
+                maybe_stop(i)
+            }
+            i
+            """
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(3)]
+
+    def test_return_outside_function(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile("return 1")
+        errors = []
+        context = ExecutionContext(
+            operations=ops,
+            backend=backend,
+            on_exception=lambda ex, context, frame: errors.append(ex),
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert [str(ex) for ex in errors] == ["Nothing to return from"]
+
+    def test_quantum(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile(
+            "fib := { (n) if n < 2 { return n }\n fib(n - 1) + fib(n - 2) }\nfib(10)"
+        )
+        results = []
+        context = ExecutionContext(
+            operations=ops,
+            backend=backend,
+            on_result=lambda result, context: results.append(result),
+            quantum=100,
+        )
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+            assert context.latest_operations <= 100
+
+        assert results == [Primitive.of(55)]
+        stats = context.stats()
+        assert stats["quantum"] == 100
+        assert stats["preemptions"] > 0
+        if backend == "ops":
+            assert stats["preemptions"] == stats["total_operations"] // 100
+        else:
+            # Generated runs aren't split between slices
+            assert stats["preemptions"] >= stats["total_operations"] // 100
+        assert stats["total_slices"] == stats["preemptions"] + 1
+
+    def test_invalid_quantum(self):
+        with pytest.raises(ValueError):
+            ExecutionContext(operations=[], quantum=0)
+
+    def test_weighted_turns(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter
+    ):
+        ops = compiler.compile("x := 0\nwhile true { x := x + 1 }")
+        contexts = [
+            ExecutionContext(operations=ops, name=name, weight=weight)
+            for name, weight in [("a", 1), ("b", 3), ("c", 0.5)]
+        ]
+        for context in contexts:
+            interpreter.add(context)
+
+        for _ in range(900):
+            interpreter.execute_next()
+
+        # Slices that yield early are each charged SLICE_OPERATIONS
+        assert [context.total_slices for context in contexts] == [200, 600, 100]
+        shares = interpreter.shares()
+        assert [round(shares[context], 3) for context in contexts] == [
+            0.222,
+            0.667,
+            0.111,
+        ]
+
+    def test_debt(self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter):
+        light = ExecutionContext(
+            operations=compiler.compile("x := 0\nwhile true { x := x + 1 }")
+        )
+        # A call that never yields within the heavy context's quantum
+        heavy = ExecutionContext(
+            operations=compiler.compile(
+                "f := { (n) if n < 2 { return n }\n f(n - 1) + f(n - 2) }\nf(30)"
+            ),
+            quantum=5 * SLICE_OPERATIONS,
+        )
+        interpreter.add(light)
+        interpreter.add(heavy)
+
+        for _ in range(60):
+            interpreter.execute_next()
+
+        # Each of the heavy context's slices uses its whole quantum, so it sits
+        # out its turns until the light one has had as many
+        assert light.total_slices == 50
+        assert heavy.total_slices == 10
+        assert heavy.preemptions == 10
+
+    def test_remove(self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter):
+        ops = compiler.compile("x := 0\nwhile true { x := x + 1 }")
+        running = ExecutionContext(operations=ops, name="player:a")
+        stopped = ExecutionContext(operations=ops, name="player:a")
+        other = ExecutionContext(operations=ops, name="player:b")
+        for context in (running, stopped, other):
+            interpreter.add(context)
+        interpreter.stop(stopped)
+
+        interpreter.remove("player:a")
+        for _ in range(10):
+            interpreter.execute_next()
+
+        assert running.total_slices == 0
+        assert other.total_slices == 10
+        interpreter.resume(stopped)
+        assert not stopped.total_slices
+        assert interpreter.shares().keys() == {other}
+
+    def test_invalid_weight(self):
+        with pytest.raises(ValueError):
+            ExecutionContext(operations=[], weight=0)
+
+    @pytest.mark.parametrize("on_park", [True, False], ids=["parked", "not_parked"])
+    def test_park(self, interpreter: ProboticsInterpreter, backend: str, on_park: bool):
+        ready = [False]
+        builtins = {
+            "ready": Primitive.block(
+                [Native(lambda frame: Primitive.of(ready[0]))], name="ready"
+            )
+        }
+        compiler = ProboticsCompiler(
+            optimizer=PeepholeOptimizer(state_builtins=("ready",))
+        )
+        ops = compiler.compile("while not ready() { }\n5")
+
+        parked = []
+        results = []
+        context = ExecutionContext(
+            operations=ops,
+            builtins=builtins,
+            backend=backend,
+            on_result=lambda result, context: results.append(result),
+            on_park=(lambda context, until: parked.append(context)) if on_park else None,
+        )
+        interpreter.add(context)
+        interpreter.execute_next()
+
+        if on_park:
+            # Parked until its owner resumes it
+            assert context.stopped
+            assert parked == [context]
+            assert context.stats()["parks"] == 1
+            interpreter.resume(context)
+        else:
+            # Only yields, and checks again on its next turn
+            assert not context.stopped
+            assert context.parks == 0
+
+        ready[0] = True
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(5)]
+
+    @staticmethod
+    def wait_until() -> Primitive:
+        """A builtin like the game's `wait_until`: checks the condition (a block)
+        until it returns true, parking the context in between"""
+
+        def check(frame: StackFrame) -> Primitive:
+            if frame.pop().is_true:
+                return Primitive.of(True)
+            frame.context.park()
+            return Primitive.of(False)
+
+        return Primitive.block(
+            operations=waiting_loop(
+                WaitingCheck(check),
+                GetValue("condition"),
+                *ProboticsCodeGenerator.call_operations(0),
+            ),
+            name="wait_until",
+            arg_names=["condition"],
+        )
+
+    @pytest.mark.parametrize("on_park", [True, False], ids=["parked", "not_parked"])
+    def test_waiting_check(
+        self, interpreter: ProboticsInterpreter, backend: str, on_park: bool
+    ):
+        ops = ProboticsCompiler().compile(
+            "checks := 0\n"
+            "ready := { checks := checks + 1\n checks >= 3 }\n"
+            "wait_until(ready)\n"
+            "checks"
+        )
+        parked = []
+        results = []
+        context = ExecutionContext(
+            operations=ops,
+            builtins={"wait_until": self.wait_until()},
+            backend=backend,
+            quantum=10_000,
+            on_result=lambda result, context: results.append(result),
+            on_park=(lambda context, until: parked.append(context)) if on_park else None,
+        )
+        interpreter.add(context)
+
+        for checks in (1, 2):
+            interpreter.execute_next()
+
+            # One check per turn, rather than checking for the whole quantum
+            assert context.get("checks") == Primitive.of(checks)
+            assert context.latest_operations < 100
+            assert not context.is_finished
+
+            if on_park:
+                # Parked until its owner resumes it
+                assert context.stopped
+                assert parked == [context] * checks
+                interpreter.resume(context)
+            else:
+                assert not context.stopped
+                assert context.parks == 0
+
+        # The condition turns true on the third check, which ends the wait
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(3)]
+        assert context.parks == (2 if on_park else 0)
+
+    def test_frame_pool(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        ops = compiler.compile(
+            "fib := { (n) if n < 2 { return n }\n fib(n - 1) + fib(n - 2) }\nfib(10)"
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        # Only as many frames as the deepest the calls go are ever created
+        assert results == [Primitive.of(55)]
+        stats = context.stats()
+        assert stats["frame_pool_misses"] == 10
+        assert stats["frame_pool_hits"] == 177 - 10
+        assert stats["frame_pool_hit_rate"] == pytest.approx(167 / 177)
+        assert len(context.frame_pool) == 10
+        for frame in context.frame_pool:
+            assert frame.parent is None and frame.block is None
+            assert not frame.results and not frame.args and not frame.slots
+
+    def test_frame_pool_local_call(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        # The frames of the local calls share the scope of the frame of f
+        ops = compiler.compile(
+            "f := { (a) x := 1\n while x < 3 { x := x + 1 }\n if a { g(a) }\n x + a }\n"
+            "g := { (b) b }\n"
+            "f(2) + f(3)"
+        )
+        results = []
+        context = make_context(ops, results, backend=backend)
+        interpreter.add(context)
+
+        while not interpreter.is_finished:
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(11)]
+        assert context.frame_pool_hits > 0
+
+    def test_frame_pool_stopped(
+        self, compiler: ProboticsCompiler, interpreter: ProboticsInterpreter, backend: str
+    ):
+        def pause(frame: StackFrame) -> None:
+            frame.context.stop()
+
+        builtins = {"pause": Primitive.block([Native(pause)], name="pause")}
+        ops = compiler.compile("f := { (n) pause()\n n }\nf(1) + f(2)")
+        results = []
+        context = make_context(ops, results, builtins, backend=backend)
+        interpreter.add(context)
+        interpreter.execute_next()
+
+        # Stopped in pause(), called from f()
+        frame = context.current_frame
+        assert frame.name == "<outer>.f.pause"
+        assert frame.parent.name == "<outer>.f"
+        assert not context.frame_pool
+
+        while not interpreter.is_finished:
+            interpreter.resume(context)
+            interpreter.execute_next()
+
+        assert results == [Primitive.of(3)]
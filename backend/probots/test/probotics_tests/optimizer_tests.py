@@ -0,0 +1,352 @@
+from pathlib import Path
+
+import pytest
+
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext, ProboticsInterpreter
+from probots.probotics.ops.all import (
+    Addition,
+    Assignment,
+    Call,
+    CallNamed,
+    Catch,
+    CompareJump,
+    CompareLessThan,
+    Division,
+    EndIteration,
+    EnterLoop,
+    ExitLoop,
+    GetGlobal,
+    GetValue,
+    Immediate,
+    Jump,
+    JumpIf,
+    LoadProperty,
+    Operation,
+    ParkIteration,
+    Primitive,
+    Return,
+    source_map_of,
+)
+from probots.probotics.optimizer import PeepholeOptimizer
+
+
+def run(ops, builtins=None) -> list[Primitive]:
+    results = []
+    interpreter = ProboticsInterpreter()
+    interpreter.add(
+        ExecutionContext(
+            operations=ops,
+            builtins=builtins,
+            on_result=lambda result, context: results.append(result),
+        )
+    )
+    while not interpreter.is_finished:
+        interpreter.execute_next()
+    return results
+
+
+class TestPeepholeOptimizer:
+    CONSTANTS = {name: Primitive.of(name) for name in ("forward", "left", "right")}
+
+    @pytest.fixture
+    def optimizer(self) -> PeepholeOptimizer:
+        return PeepholeOptimizer(constants=self.CONSTANTS)
+
+    @pytest.fixture
+    def compiler(self, optimizer: PeepholeOptimizer) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="pratt", optimizer=optimizer)
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            ("1 + 2 * 3", [Immediate(Primitive.of(7))]),
+            ('"a" + "b"', [Immediate(Primitive.of("ab"))]),
+            ("not (1 < 2)", [Immediate(Primitive.of(False))]),
+            ("true and (false or true)", [Immediate(Primitive.of(True))]),
+            ("forward", [Immediate(Primitive.of("forward"))]),
+            # Not folded: fails at runtime
+            (
+                "1 / 0",
+                [
+                    Immediate(Primitive.of(1)),
+                    Immediate(Primitive.of(0)),
+                    *ProboticsCompiler().compile("1 / 0")[2:],
+                ],
+            ),
+        ],
+    )
+    def test_fold_constants(
+        self, compiler: ProboticsCompiler, input: str, expected: list[Operation]
+    ):
+        assert compiler.compile(input) == expected
+
+    def test_shadowed_constant(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("f := { (forward) forward }")
+        block = ops[1].value.value
+        assert block.operations == [GetValue("forward")]
+
+    def test_fold_branches(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("if 1 > 2 { 3 } else { 4 }")
+
+        # The if body is gone, and only the else body is left
+        assert ops == [Immediate(Primitive.of(4))]
+
+    def test_not_folded_into_jump(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("if not x { 1 }")
+        assert ops == [
+            GetValue("x"),
+            JumpIf(jump=1, sense=True),
+            Immediate(Primitive.of(1)),
+        ]
+
+    def test_jump_folded_into_jump(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("while x { if y { break } }")
+
+        # The break jumps directly out of the loop when y is true
+        assert ops == [
+            EnterLoop(),
+            GetValue("x"),
+            JumpIf(jump=4, sense=False),
+            GetValue("y"),
+            JumpIf(jump=2, sense=True),
+            EndIteration(),
+            Jump(jump=-6),
+            ExitLoop(),
+        ]
+
+    def test_while_true(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("while true { x := x + 1 }\n5")
+
+        # No condition, and the loop never exits
+        assert ops == [
+            EnterLoop(),
+            Immediate(Primitive.symbol("x")),
+            GetValue("x"),
+            Immediate(Primitive.of(1)),
+            Addition(),
+            Assignment(),
+            EndIteration(),
+            Jump(jump=-7),
+        ]
+
+    def test_while_true_break(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("while true { break }\n5")
+        assert ops == [EnterLoop(), ExitLoop(), Immediate(Primitive.of(5))]
+
+    def test_dead_code(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("f := { return 1\n 2\n 3 }")
+        block = ops[1].value.value
+        assert block.operations == [Immediate(Primitive.of(1)), Return(with_value=True)]
+
+    @pytest.mark.parametrize(
+        "input,expected",
+        [
+            ('f := { "about f"\n 2 }', [Immediate(Primitive.of(2))]),
+            ('f := { "about f"\n return }', [Return(with_value=False)]),
+            (
+                "f := { (a) if a { 1\n return a } }",
+                [
+                    GetValue("a"),
+                    JumpIf(jump=2, sense=False),
+                    GetValue("a"),
+                    Return(with_value=True),
+                ],
+            ),
+            (
+                "f := { while x { 1\n y } }",
+                [
+                    EnterLoop(),
+                    GetValue("x"),
+                    JumpIf(jump=3, sense=False),
+                    GetValue("y"),
+                    EndIteration(),
+                    Jump(jump=-5),
+                    ExitLoop(),
+                ],
+            ),
+            # Kept: the value of the block
+            ("f := { 1 }", [Immediate(Primitive.of(1))]),
+            ("f := { (a) a\n 2 }", [GetValue("a"), Immediate(Primitive.of(2))]),
+        ],
+    )
+    def test_unused_pushes(
+        self, compiler: ProboticsCompiler, input: str, expected: list[Operation]
+    ):
+        block = compiler.compile(input)[1].value.value
+        assert block.operations == expected
+
+    def test_thread_jumps(self, optimizer: PeepholeOptimizer):
+        x = Immediate(Primitive.of(1))
+        y = Immediate(Primitive.of(2))
+        ops = [
+            GetValue("a"),
+            JumpIf(jump=1),  # to the Jump, which goes to y
+            x,
+            Jump(jump=1),
+            Assignment(),
+            y,
+        ]
+
+        assert optimizer.optimize(ops) == [
+            GetValue("a"),
+            JumpIf(jump=1),
+            x,
+            y,
+        ]
+
+    def test_source_map(self):
+        compiler = ProboticsCompiler(
+            backend="pratt", optimizer=PeepholeOptimizer(), lean=True
+        )
+        ops = compiler.compile("x := 1 + 2\ny := x / 0")
+        source_map = source_map_of(ops)
+
+        # The folded constant is where the addition was, and the operations
+        # after it keep their positions
+        assert ops[1] == Immediate(Primitive.of(3))
+        assert source_map.lookup(1) == (0, 5)
+        assert ops[6] == Division()
+        assert source_map.lookup(6) == (1, 7)
+
+    STATE_PROPERTIES = {"me": ("state", "x", "y", "orientation", "energy", "crystals")}
+
+    def test_park_spin_loop(self):
+        optimizer = PeepholeOptimizer(
+            state_builtins=("is_idle", "me"),
+            wait_builtins=("wait",),
+            state_properties=self.STATE_PROPERTIES,
+        )
+        compiler = ProboticsCompiler(backend="pratt", optimizer=optimizer)
+
+        ops = compiler.compile("while not is_idle() { wait() }\nwhile me.energy < 10 { }")
+        assert [op for op in ops if isinstance(op, EndIteration)] == [
+            ParkIteration(),
+            ParkIteration(),
+        ]
+
+    @pytest.mark.parametrize(
+        "input",
+        [
+            # Depends on a global, which some other handler could change
+            "while not done { }",
+            # Changes something itself
+            "while not is_idle() { x := 1 }",
+            # Not known to depend only on the probot
+            "while not ready() { }",
+            # The player's, not the probot's: they change without it changing
+            "while not me.globals.hit { }",
+            "while me.score < 100 { }",
+            'while me.name == "bot" { }',
+            "while not me { }",
+        ],
+    )
+    def test_spin_loop_not_parked(self, input: str):
+        optimizer = PeepholeOptimizer(
+            state_builtins=("is_idle", "me"), state_properties=self.STATE_PROPERTIES
+        )
+        compiler = ProboticsCompiler(backend="pratt", optimizer=optimizer)
+
+        ops = compiler.compile(input)
+        assert not any(isinstance(op, ParkIteration) for op in ops)
+
+    def test_superinstructions(self):
+        optimizer = PeepholeOptimizer(constants=self.CONSTANTS, superinstructions=True)
+        compiler = ProboticsCompiler(backend="pratt", optimizer=optimizer, resolve=True)
+
+        ops = compiler.compile("if me.energy < 10 { move(forward, 2) }")
+        assert ops == [
+            LoadProperty("me", "energy"),
+            Immediate(Primitive.of(10)),
+            CompareJump("<", jump=4, sense=False),
+            Immediate(Primitive.of("forward")),
+            Immediate(Primitive.of(2)),
+            CallNamed("move", num_args=2),
+            Catch({"return": 1, "wait": 1}),
+        ]
+
+    @pytest.mark.parametrize(
+        "input",
+        [
+            # Only the inner call: the outer one's argument is pushed by a call
+            "f(g())",
+            "f(x + 1)",
+        ],
+    )
+    def test_call_not_fused(self, input: str):
+        optimizer = PeepholeOptimizer(superinstructions=True)
+        compiler = ProboticsCompiler(backend="pratt", optimizer=optimizer, resolve=True)
+
+        assert Call(num_args=1) in compiler.compile(input)
+
+    def test_jump_target_not_fused(self):
+        optimizer = PeepholeOptimizer(superinstructions=True)
+        ops = [
+            GetGlobal("a"),
+            JumpIf(jump=2),  # to the second JumpIf
+            GetGlobal("b"),
+            CompareLessThan(),
+            JumpIf(jump=1),
+            Immediate(Primitive.of(1)),
+            Immediate(Primitive.of(2)),
+        ]
+
+        assert optimizer.optimize(ops) == ops
+
+
+class TestOptimizedPrograms:
+    """Optimized programs produce the same results"""
+
+    PROGRAMS = [
+        "1 + (2 - 3) / 4 * 5",
+        "x := 0\nwhile x < 10 { x := x + 1\n if x == 3 + 2 { break } }\nx",
+        "f := { (n) if n < 2 { return 1 } else { return n * f(n - 1) } }\nf(6)",
+        "x := 0\nwhile not (x >= 4) { x := x + 1 }\nx",
+        "i := 0\nt := 0\nwhile true { i := i + 1\n if i > 5 { break }\n"
+        " if i == 2 { next }\n t := t + i }\nt",
+        "if false { 1 } else if 1 == 1 { 2 } else { 3 }",
+        "f := { return\n 5 }\nf()",
+        "f := { (a) if a { 1\n return a }\n 3 }\nf(5) + f(false)",
+        "x := 0\nwhile x < 3 { 7\n x := x + 1 }\nx",
+    ]
+
+    @pytest.mark.parametrize("input", PROGRAMS)
+    def test_same_result(self, input: str):
+        plain = ProboticsCompiler(backend="pratt")
+        optimized = ProboticsCompiler(backend="pratt", optimizer=PeepholeOptimizer())
+
+        ops = optimized.compile(input)
+        assert run(ops) == run(plain.compile(input))
+        assert len(ops) <= len(plain.compile(input))
+
+    @pytest.mark.parametrize("input", PROGRAMS)
+    def test_same_result_fused(self, input: str):
+        plain = ProboticsCompiler(backend="pratt", resolve=True)
+        fused = ProboticsCompiler(
+            backend="pratt",
+            resolve=True,
+            optimizer=PeepholeOptimizer(superinstructions=True),
+        )
+
+        assert run(fused.compile(input)) == run(plain.compile(input))
+
+    def test_fixtures_smaller(self):
+        plain = ProboticsCompiler(backend="pratt")
+        optimized = ProboticsCompiler(
+            backend="pratt",
+            optimizer=PeepholeOptimizer(constants=TestPeepholeOptimizer.CONSTANTS),
+        )
+
+        fixtures = Path(__file__).parents[3].joinpath("fixtures").glob("*.probot")
+        sources = [path.read_text() for path in fixtures]
+        assert sum(count_ops(optimized.compile(source)) for source in sources) < sum(
+            count_ops(plain.compile(source)) for source in sources
+        )
+
+
+def count_ops(ops) -> int:
+    total = len(ops)
+    for op in ops:
+        if isinstance(op, Immediate) and op.value.is_block:
+            total += count_ops(op.value.value.operations)
+    return total
@@ -0,0 +1,57 @@
+import pytest
+
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext
+from probots.probotics.ops.all import (
+    FALSE,
+    NULL,
+    TRUE,
+    CompareLessThan,
+    Immediate,
+    JumpIf,
+    LogicalNot,
+    Primitive,
+    PrimitiveType,
+    StackFrame,
+)
+from probots.probotics.ops.primitive import SMALL_INT_MAX, SMALL_INT_MIN
+
+
+class TestPrimitive:
+    @pytest.mark.parametrize(
+        "value,expected",
+        [(None, NULL), (True, TRUE), (False, FALSE)],
+    )
+    def test_singletons(self, value: object, expected: Primitive):
+        assert Primitive.of(value) is expected
+
+    @pytest.mark.parametrize("value", [SMALL_INT_MIN, -1, 0, 1, 100, SMALL_INT_MAX])
+    def test_small_ints_shared(self, value: int):
+        assert Primitive.of(value) is Primitive.of(value)
+        assert Primitive.of(value) == Primitive(PrimitiveType.INT, value)
+
+    @pytest.mark.parametrize("value", [SMALL_INT_MIN - 1, SMALL_INT_MAX + 1, 1.0])
+    def test_other_numbers_not_shared(self, value: int | float):
+        assert Primitive.of(value) is not Primitive.of(value)
+        assert Primitive.of(value) == Primitive.of(value)
+
+    def test_bool_is_not_int(self):
+        assert Primitive.of(1) is not TRUE
+        assert Primitive.of(0).type == PrimitiveType.INT
+
+    def test_comparisons_shared(self):
+        frame = StackFrame.make_outer(ExecutionContext(operations=[]))
+        frame.push(Primitive.of(1))
+        frame.push(Primitive.of(2))
+        CompareLessThan().execute(frame)
+        assert frame.peek() is TRUE
+
+        LogicalNot().execute(frame)
+        assert frame.pop() is FALSE
+
+    def test_no_instance_dicts(self):
+        ops = ProboticsCompiler(resolve=True).compile("f := { (x) x + 1 }\nf(2)")
+        frame = StackFrame.make_outer(ExecutionContext(operations=ops))
+
+        for obj in [*ops, JumpIf(jump=1), Immediate(NULL), Primitive.of(5000), frame]:
+            assert not hasattr(obj, "__dict__"), type(obj).__name__
@@ -0,0 +1,113 @@
+from typing import Optional
+
+import pytest
+
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext
+from probots.probotics.ops.all import Operation, Primitive, ScopeVars
+from probots.probotics.profiler import Profiler
+
+PROGRAM = """
+f := { (n)
+    total := 0
+    while n > 0 {
+        total := total + n
+        n := n - 1
+    }
+    total
+}
+f(10) + f(20)
+"""
+
+
+def run(
+    ops: list[Operation],
+    backend: str = "ops",
+    profiler: Optional[Profiler] = None,
+    globals: Optional[ScopeVars] = None,
+) -> tuple[ExecutionContext, list[Primitive]]:
+    results = []
+    context = ExecutionContext(
+        operations=ops,
+        globals=globals,
+        quantum=None,
+        backend=backend,
+        on_result=lambda result, context: results.append(result),
+    )
+    if profiler is not None:
+        context.start_profiling(profiler)
+    while not context.execute_next():
+        pass
+    return context, results
+
+
+class TestProfiler:
+    @pytest.fixture
+    def compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="pratt", resolve=True, lean=True)
+
+    @pytest.mark.parametrize("backend", ["ops", "closures"])
+    def test_profile(self, compiler: ProboticsCompiler, backend: str):
+        profiler = Profiler()
+        context, results = run(compiler.compile(PROGRAM), backend, profiler)
+
+        assert results == [Primitive.of(265)]
+        assert profiler.total == context.total_operations
+
+        hottest = profiler.hottest()
+        assert [profile.name for profile in hottest] == ["f", "<outer>"]
+
+        # Most of f is its loop, on lines 4-6
+        lines = hottest[0].lines()
+        assert max(lines, key=lines.get) in (3, 4, 5)
+        assert sum(lines.values()) == hottest[0].total
+
+    def test_same_results(self, compiler: ProboticsCompiler):
+        _, plain = run(compiler.compile(PROGRAM))
+        _, profiled = run(compiler.compile(PROGRAM), profiler=Profiler())
+
+        assert profiled == plain
+
+    def test_off(self, compiler: ProboticsCompiler):
+        ops = compiler.compile(PROGRAM)
+        context = ExecutionContext(operations=ops, quantum=None)
+        run_operations = context.run
+
+        profiler = context.start_profiling()
+        assert context.run != run_operations
+
+        assert context.stop_profiling() is profiler
+        assert context.run == run_operations
+        assert context.profiler is None
+
+        while not context.execute_next():
+            pass
+        assert profiler.total == 0
+
+    def test_contexts(self, compiler: ProboticsCompiler):
+        # A profiler can add up what several contexts executed
+        profiler = Profiler()
+        globals = ScopeVars()
+        run(compiler.compile("g := { (x) x * 2 }"), globals=globals)
+        block = globals["g"].value
+
+        call = compiler.compile("g(1) + g(2)")
+        for _ in range(3):
+            run(call, profiler=profiler, globals=globals)
+
+        (profile,) = [
+            p for p in profiler.blocks.values() if p.operations is block.operations
+        ]
+        assert profile.name == "g"
+        assert profile.total == 6 * len(block.operations)
+
+    def test_report(self, compiler: ProboticsCompiler):
+        assert "nothing profiled" in Profiler().report()
+
+        profiler = Profiler()
+        run(compiler.compile(PROGRAM), profiler=profiler)
+
+        report = profiler.report(top=1).splitlines()
+        assert report[0].split() == ["ops", "share", "ms", "block"]
+        assert report[1].split()[-1] == "f"
+        assert "line" in report[2]
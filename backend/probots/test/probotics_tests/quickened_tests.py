@@ -0,0 +1,148 @@
+from typing import Sequence
+
+import pytest
+
+from probots.probotics import serialize
+from probots.probotics.cache import CompiledProgramCache
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.interpreter import ExecutionContext
+from probots.probotics.ops.all import (
+    Addition,
+    BinaryOperator,
+    Division,
+    Operation,
+    Primitive,
+)
+from probots.probotics.ops.base import QUICKEN_AFTER
+from probots.probotics.ops.quickened import (
+    IntArithmetic,
+    IntComparison,
+    NumberArithmetic,
+    Quickened,
+    StrComparison,
+    StrConcatenation,
+)
+
+
+def run(ops: list[Operation]) -> list[Primitive]:
+    results = []
+    context = ExecutionContext(
+        operations=ops,
+        quantum=None,
+        on_result=lambda result, context: results.append(result),
+    )
+    while not context.execute_next():
+        pass
+    return results
+
+
+def quickened(ops: Sequence[Operation]) -> list[Quickened]:
+    return [
+        op.quickened
+        for op in ops
+        if isinstance(op, BinaryOperator) and op.quickened is not None
+    ]
+
+
+class TestQuickened:
+    @pytest.fixture
+    def compiler(self) -> ProboticsCompiler:
+        return ProboticsCompiler(resolve=True)
+
+    def test_quicken(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("i := 0\nwhile i < 20 { i := i + 1 }\ni")
+        assert run(ops) == [Primitive.of(20)]
+
+        assert [type(op) for op in quickened(ops)] == [IntComparison, IntArithmetic]
+
+    def test_not_yet(self, compiler: ProboticsCompiler):
+        ops = compiler.compile(f"i := 0\nwhile i < {QUICKEN_AFTER - 1} {{ i := i + 1 }}")
+        run(ops)
+
+        # The comparison executes once more than the addition
+        assert [type(op) for op in quickened(ops)] == [IntComparison]
+
+    @pytest.mark.parametrize(
+        "a,b,specialized",
+        [
+            ("1", "2.5", NumberArithmetic),
+            ('"a"', '"b"', StrConcatenation),
+        ],
+    )
+    def test_types(
+        self, compiler: ProboticsCompiler, a: str, b: str, specialized: type[Quickened]
+    ):
+        ops = compiler.compile(f"x := 0\nwhile x < 10 {{ y := {a} + {b}\n x := x + 1 }}")
+        run(ops)
+
+        assert specialized in [type(op) for op in quickened(ops)]
+
+    def test_division(self, compiler: ProboticsCompiler):
+        ops = compiler.compile(
+            "x := 0\ni := 0\nwhile i < 10 { x := 6 / 3\n i := i + 1 }\nx"
+        )
+
+        assert run(ops) == [Primitive.of(2.0)]
+        division = [op for op in quickened(ops) if type(op.generic) is Division]
+        assert [type(op) for op in division] == [NumberArithmetic]
+
+    def test_str_comparison(self, compiler: ProboticsCompiler):
+        ops = compiler.compile(
+            'n := 0\ni := 0\nwhile i < 10 { if "a" < "b" { n := n + 1 }\n i := i + 1 }\nn'
+        )
+
+        assert run(ops) == [Primitive.of(10)]
+        assert StrComparison in [type(op) for op in quickened(ops)]
+
+    @pytest.mark.parametrize(
+        "other,expected",
+        [
+            ('"a", "b"', Primitive.of("ab")),
+            ("1.5, 1", Primitive.of(2.5)),
+            # Bools aren't ints, even though they add up like them
+            ("true, 1", Primitive.of(2)),
+        ],
+    )
+    def test_deoptimize(
+        self, compiler: ProboticsCompiler, other: str, expected: Primitive
+    ):
+        ops = compiler.compile(
+            "add := { (a, b) a + b }\n"
+            f"i := 0\nwhile i < {QUICKEN_AFTER} {{ add(i, 1)\n i := i + 1 }}"
+        )
+        run(ops)
+        addition = ops[0].value.value.operations[2]
+        assert type(addition) is Addition
+        assert type(addition.quickened) is IntArithmetic
+
+        ops.extend(compiler.compile(f"add({other})"))
+        assert run(ops) == [expected]
+
+        # The generic operation is back, and isn't specialized again right away
+        assert addition.quickened is None
+        assert addition.executions < 0
+
+    def test_serialize(self, compiler: ProboticsCompiler):
+        ops = compiler.compile("i := 0\nwhile i < 20 { i := i + 1 }\ni")
+        plain = serialize.dumps(ops)
+        run(ops)
+
+        assert quickened(ops)
+        assert serialize.dumps(ops) == plain
+
+    def test_frozen(self):
+        # Programs loaded through the cache are frozen, and shared by everyone
+        # who compiles the same source
+        compiler = ProboticsCompiler(resolve=True, cache=CompiledProgramCache())
+        source = "i := 0\nwhile i < 20 { i := i + 1 }\ni"
+        ops = compiler.compile(source)
+        assert isinstance(ops, tuple)
+
+        assert run(ops) == [Primitive.of(20)]
+        assert [type(op) for op in quickened(ops)] == [IntComparison, IntArithmetic]
+
+        # The next program loaded from the cache runs the specialized operations
+        again = compiler.compile(source)
+        assert again is ops
+        assert run(again) == [Primitive.of(20)]
+        assert all(op.generic.executions == QUICKEN_AFTER for op in quickened(again))
@@ -0,0 +1,81 @@
+import json
+import zlib
+from pathlib import Path
+
+import pytest
+
+from probots.probotics.cache import CompiledProgramCache, freeze
+from probots.probotics.compiler import ProboticsCompiler
+from probots.probotics.ops.all import Immediate, Native, Primitive, source_map_of
+from probots.probotics.optimizer import PeepholeOptimizer
+from probots.probotics.serialize import BYTECODE_FORMAT, BytecodeError, dumps, loads
+
+
+class TestSerialize:
+    FIXTURES = sorted(Path(__file__).parents[3].joinpath("fixtures").glob("*.probot"))
+    SAMPLE = Path(__file__).parent.joinpath("sample.probot")
+
+    @pytest.fixture(
+        params=[
+            {},
+            {"optimizer": PeepholeOptimizer(), "resolve": True},
+            {"optimizer": PeepholeOptimizer(superinstructions=True), "resolve": True},
+            {"resolve": True, "tail_calls": True},
+        ],
+        ids=["plain", "resolved", "fused", "tail"],
+    )
+    def compiler(self, request: pytest.FixtureRequest) -> ProboticsCompiler:
+        return ProboticsCompiler(backend="pratt", **request.param)
+
+    @pytest.mark.parametrize("path", [SAMPLE, *FIXTURES], ids=lambda p: p.name)
+    def test_round_trip(self, compiler: ProboticsCompiler, path: Path):
+        operations = compiler.compile_uncached(path.read_text())
+
+        assert loads(dumps(operations)) == operations
+
+    def test_round_trip_frozen(self, compiler: ProboticsCompiler):
+        compiler.cache = CompiledProgramCache()
+        operations = compiler.compile(self.SAMPLE.read_text())
+
+        assert freeze(loads(dumps(operations))) == operations
+
+    def test_source_maps(self, compiler: ProboticsCompiler):
+        compiler.lean = True
+        operations = compiler.compile_uncached("f := { (x)\n  x / 0 }\nf(1)")
+        loaded = loads(dumps(operations))
+
+        assert source_map_of(loaded) == source_map_of(operations)
+        i, block = next(
+            (i, op.value.value)
+            for i, op in enumerate(operations)
+            if type(op) is Immediate and op.value.is_block
+        )
+        assert block.source_map
+        assert loaded[i].value.value.source_map == block.source_map
+
+    def test_values(self):
+        operations = [
+            Immediate(Primitive.of(value))
+            for value in (None, 1, 2.5, "text", True, False)
+        ]
+
+        assert loads(dumps(operations)) == operations
+
+    def test_native_not_serialized(self):
+        native = Primitive.block([Native(lambda frame: None)], name="native")
+
+        with pytest.raises(BytecodeError):
+            dumps([Immediate(native)])
+
+    def test_other_format_not_loaded(self):
+        bytecode = zlib.compress(json.dumps([BYTECODE_FORMAT + 1, []]).encode())
+
+        with pytest.raises(BytecodeError):
+            loads(bytecode)
+
+    @pytest.mark.parametrize(
+        "bytecode", [b"", b"garbage", zlib.compress(b"[1, [[999]]]")]
+    )
+    def test_invalid(self, bytecode: bytes):
+        with pytest.raises(BytecodeError):
+            loads(bytecode)